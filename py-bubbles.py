@@ -1,98 +1,386 @@
-import pygame, os
-from src.playfield import Playfield
-from src.bubble import Bubble
-from src.constants import *
-from pygame.locals import *
+import pygame, os, argparse, random, struct, time
+from src import constants
+from src.memprofile import MemoryProfiler, GCMonitor, freeze_heap, thaw_heap, tune_gc, parse_thresholds
+from src.capture import FrameCapture, CAPTURE_FORMATS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Py-Bubbles')
+    parser.add_argument('--seed', type=int, help='seed for all game RNGs, random if not given')
+    parser.add_argument('--record', metavar='FILE', help='record the session inputs to a replay file')
+    parser.add_argument('--replay', metavar='FILE', help='play back a replay file instead of reading input')
+    parser.add_argument('--seek', type=int, default=0, metavar='TICK', help='start replay playback at this tick')
+    parser.add_argument('--latency', action='store_true', help='print input-to-display latency on exit')
+    parser.add_argument('--memprofile', action='store_true',
+                        help='print top allocators per phase and gc pauses per frame on exit')
+    parser.add_argument('--endless', action='store_true', help='play the endless mode')
+    parser.add_argument('--chunks', metavar='FILE',
+                        help='endless mode board chunks as JSON lines, generated if not given')
+    parser.add_argument('--pack', metavar='FILE', help='play the levels of a level pack, see src.levelpack')
+    parser.add_argument('--level', default='0', help='level of the pack to start at, by index or name')
+    parser.add_argument('--aim-guide', action='store_true',
+                        help='show the path and landing cell of the next shot')
+    parser.add_argument('--watch-maps', action='store_true',
+                        help='reload the map whenever its file in maps/ changes, for level design')
+    parser.add_argument('--capture', metavar='PATH',
+                        help='record the displayed frames, to a directory of images or a raw file')
+    parser.add_argument('--capture-format', default='png', choices=CAPTURE_FORMATS,
+                        help='image format of the captured frames, raw writes one file of pixels')
+    parser.add_argument('--capture-pool', type=int, default=8, metavar='FRAMES',
+                        help='frames that may wait for the capture writer before frames are dropped')
+    args = parser.parse_args()
+
+    if args.endless and (args.record or args.replay):
+        parser.error('the endless mode can not be recorded or replayed')
+
+    if args.watch_maps and (args.endless or args.record or args.replay):
+        parser.error('--watch-maps only works with a regular, unrecorded game')
+
+    if args.pack and (args.endless or args.record or args.replay or args.watch_maps):
+        parser.error('--pack can not be combined with the endless mode, replays or --watch-maps')
+
+    # resolve --level to an index now, so a bad one is reported like any other argument
+    if args.pack:
+        from src.levelpack import LevelPack
+
+        try:
+            with LevelPack(args.pack) as pack:
+                if args.level.isdigit():
+                    args.level = int(args.level)
+
+                    if args.level >= len(pack):
+                        parser.error('--level {0} is out of range, {1} has {2} levels'.format(
+                            args.level, args.pack, len(pack)))
+
+                else:
+                    args.level = pack.find(args.level)
+
+        except KeyError as exc:
+            parser.error(exc.args[0])
+
+        except (OSError, struct.error) as exc:
+            parser.error('unable to read {0}: {1}'.format(args.pack, exc))
+
+    return args
+
+
+def freeze_board():
+    """
+    Freezes the objects of a freshly loaded board when gc_freeze is set.  The board, its cells and sprites live
+    until the next load, so the collector doesn't need to walk them every pass.  Every load path calls this once the
+    new board is built, and thaw_board() before the old one is dropped.
+
+    :return: None
+    """
+    if constants.GC_FREEZE:
+        freeze_heap()
+
+
+def thaw_board():
+    """
+    Unfreezes the current board before a load replaces it, so the old board can be collected, see freeze_board().
+
+    :return: None
+    """
+    if constants.GC_FREEZE:
+        thaw_heap()
+
+
+def place_playfield(playfield, background):
+    """
+    Centers the playfield on the screen and returns its position and screen Rect.
+
+    :return: Tuple(Tuple(float, float), pygame.Rect)
+    """
+    playfield_pos = (
+        constants.DISP_SIZE[0] / 2 - (playfield.rect.width / 2),
+        constants.DISP_SIZE[1] / 2 - playfield.rect.height / 2
+    )
+    # playfield.rect.center = screen.get_rect().center
+
+    playfield_rect = pygame.Rect(playfield_pos, playfield.rect.size)
+
+    # pre-composite the playfield tint onto its part of the background so every frame is opaque blits only
+    if constants.COMPOSITING == 'opaque':
+        playfield.set_backdrop(background, playfield_rect.topleft)
+
+    return playfield_pos, playfield_rect
 
 
 def main():
+    args = parse_args()
+
+    # trace from the very start, so the startup phase includes pygame's own setup
+    profiler = None
+    gc_monitor = None
+
+    if args.memprofile:
+        profiler = MemoryProfiler()
+        profiler.start()
+        gc_monitor = GCMonitor()
+        gc_monitor.install()
+
     # initialize pygame
     pygame.init()
 
     # set up the main window
-    screen = pygame.display.set_mode(DISP_SIZE)
+    screen = pygame.display.set_mode(constants.DISP_SIZE)
     pygame.display.set_caption('Py-Bubbles')
     screen.set_colorkey(pygame.Color('MAGENTA'))
 
     # set up the background
     # test background for now
     # later, src.Playfield will handle this part
-    test_bkg = pygame.image.load(os.path.join(BGI_PATH, 'test_bkg.jpg'))
+    test_bkg = pygame.image.load(os.path.join(constants.BGI_PATH, 'test_bkg.jpg'))
 
     # background = pygame.Surface(screen.get_size()).convert()
     # background.fill(pygame.Color('blue'))
-    background = pygame.transform.scale(test_bkg, DISP_SIZE).convert_alpha()
+    background = pygame.transform.scale(test_bkg, constants.DISP_SIZE).convert()
+
+    # show the window right away, everything below happens behind the background
+    screen.blit(background, (0, 0))
+    pygame.display.update()
+
+    # the game modules are imported only now, so the window doesn't wait on them
+    from src.playfield import Playfield
+    from src.replay import ReplayRecorder, ReplayPlayer
+    from src.governor import QualityGovernor
+    from src.control import InputHandler
 
     # load music
     # this may need to move or use a variable to integrate level music later
-    pygame.mixer.music.load(os.path.join(BGM_PATH, 'test_music_drums.wav'))
+    pygame.mixer.music.load(os.path.join(constants.BGM_PATH, 'test_music_drums.wav'))
 
     # start playing the music
-    if BGM_ENABLED:
-        pygame.mixer.music.set_volume(BGM_VOLUME)
+    if constants.BGM_ENABLED:
+        pygame.mixer.music.set_volume(constants.BGM_VOLUME)
         pygame.mixer.music.play(loops=-1, start=0.0)
 
-    playfield = Playfield(os.path.join(os.curdir, 'maps', 'TEST_MAP1.JSON'), CELL_SIZE)
-    playfield_pos = (
-        DISP_SIZE[0] / 2 - (playfield.rect.width / 2),
-        DISP_SIZE[1] / 2 - playfield.rect.height / 2
-    )
-    # playfield.rect.center = screen.get_rect().center
+    if profiler:
+        profiler.phase('startup')
+
+    map_file_path = os.path.join(os.curdir, 'maps', 'TEST_MAP1.JSON')
+    recorder = None
+    player = None
+    pack = None
+    prefetcher = None
+    level_index = 0
+
+    if args.replay:
+        player = ReplayPlayer(args.replay, constants.CELL_SIZE)
+        player.seek(args.seek)
+        playfield = player.playfield
+
+    elif args.endless:
+        from src.endless import EndlessPlayfield, RandomChunkSource, StreamChunkSource
+
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        source = StreamChunkSource(open(args.chunks)) if args.chunks else RandomChunkSource(seed)
+        playfield = EndlessPlayfield(source, constants.PFLD_SIZE, constants.CELL_SIZE, seed=seed)
+
+    elif args.pack:
+        from src.levelpack import LevelPack, LevelPrefetcher
+
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        pack = LevelPack(args.pack)
+        level_index = args.level
+        playfield = Playfield(pack.read(level_index), constants.CELL_SIZE, seed=seed)
+
+        # the next level decodes in the background while this one is played
+        prefetcher = LevelPrefetcher(pack)
+        prefetcher.prefetch(level_index + 1)
+
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        playfield = Playfield(map_file_path, constants.CELL_SIZE, seed=seed)
+
+        if args.record:
+            recorder = ReplayRecorder(args.record, map_file_path, seed)
+
+    if profiler:
+        profiler.phase('load_map')
+
+    freeze_board()
+    tune_gc(parse_thresholds(constants.GC_THRESHOLDS))
+
+    playfield_pos, playfield_rect = place_playfield(playfield, background)
+
+    debug_rect = pygame.Rect(0, 0, 0, 0)
 
     ball_angle = 20
 
+    # draw the playfield in bands on a thread pool, pays off on big surfaces with cores to spare
+    if constants.RENDER_THREADS:
+        from src.bandrender import BandRenderer
+
+        playfield.renderer = BandRenderer(constants.RENDER_THREADS)
+
+    # traced once per angle now, afterwards only when the board changes near a path
+    if args.aim_guide:
+        from src.aimguide import AimGuide
+
+        playfield.aim_guide = AimGuide(playfield)
+        playfield.aim_guide.rebuild()
+
+    # scales optional work to the frame budget
+    governor = QualityGovernor()
+    governor.apply(playfield)
+
+    # keyboard input, using the configured bindings
+    controls = InputHandler()
+    controls.install()
+
+    watcher = None
+
+    if args.watch_maps:
+        from src.hotreload import MapWatcher
+
+        watcher = MapWatcher(os.path.dirname(map_file_path))
+        # compared as strings, editors' temp files may be gone again by the time they are reported
+        watched_path = os.path.normcase(os.path.abspath(map_file_path))
+
+    capture = None
+
+    if args.capture:
+        capture = FrameCapture(args.capture, screen, args.capture_format, args.capture_pool, constants.TARGET_FPS)
+
     clock = pygame.time.Clock()
+    frame = 0
 
     while True:
-        # paste the background
-        screen.blit(background, (0, 0))
+        # read input as late as possible before simulating the tick
+        controls.poll()
+        flags = controls.tick_flags()
+
+        if controls.quit_requested:
+            # stop music playback
+            # this will need to move later to the appropriate place based on design
+            pygame.mixer.music.stop()
+
+            if recorder:
+                recorder.close(playfield)
+
+            if args.latency:
+                print("Input latency (ms): {0}".format(controls.latency.report()))
 
-        # update the playfield and blit it
-        playfield.update()
+            if capture:
+                capture.close()
+                print("Capture: {0}".format(capture.report()))
+
+            if pack:
+                prefetcher.close()
+                pack.close()
+
+            if profiler:
+                profiler.phase('steady')
+                gc_monitor.uninstall()
+                print(profiler.report())
+                print(gc_monitor.report())
+
+            return
+
+        # pick up map edits between ticks
+        if watcher and watched_path in (os.path.normcase(os.path.abspath(path)) for path in watcher.poll()):
+            start = time.perf_counter()
+            thaw_board()
+
+            try:
+                changes = playfield.reload_map(map_file_path)
+
+            except (IOError, ValueError) as exc:
+                # most likely caught the file half written, the next change brings it back
+                print("Map reload failed: {0}".format(exc))
+
+            else:
+                if changes is None:
+                    # new size, so a new spot on the screen
+                    playfield_pos, playfield_rect = place_playfield(playfield, background)
+                    governor.apply(playfield)
+                    screen.blit(background, (0, 0))
+                    pygame.display.update()
+                    print("Map reloaded in {0:.1f} ms".format((time.perf_counter() - start) * 1000))
+
+                else:
+                    print("Map reloaded in {0:.1f} ms: {1} added, {2} removed, {3} changed".format(
+                        (time.perf_counter() - start) * 1000, *changes))
+
+            freeze_board()
+
+        # one simulation tick; a replay supplies its own inputs
+        if player:
+            player.step()
+
+        else:
+            if recorder:
+                recorder.record(flags)
+
+            playfield.apply_input(flags)
+            playfield.update()
+
+        # a cleared board moves on to the next level of the pack
+        if pack and not playfield.bubble_map.count and level_index + 1 < len(pack):
+            level_index += 1
+            thaw_board()
+            playfield.load_map(prefetcher.get(level_index))
+            freeze_board()
+            prefetcher.prefetch(level_index + 1)
+
+            playfield_pos, playfield_rect = place_playfield(playfield, background)
+            governor.apply(playfield)
+            screen.blit(background, (0, 0))
+
+        quality = governor.quality
+
+        # paste the background.  only the playfield area has to be redrawn every frame, the rest of the screen
+        # is static apart from the debug text
+        if frame % quality.background_interval == 0:
+            screen.blit(background, (0, 0))
+            dirty = [screen.get_rect()]
+
+        else:
+            screen.blit(background, playfield_rect, playfield_rect)
+            screen.blit(background, debug_rect, debug_rect)
+            dirty = [playfield_rect, debug_rect]
+
+        # blit the playfield
         screen.blit(playfield.image, playfield_pos)
 
         # write to screen
-        if DEBUG:
+        if constants.DEBUG and quality.debug_overlay:
             pos_text = pygame.font.Font(pygame.font.get_default_font(), 12).render(
                 "Cursor POS: {0}".format(pygame.mouse.get_pos()), True, pygame.Color("WHITE"))
 
-            screen.blit(
+            debug_rect = screen.blit(
                 pos_text,
                 (
                     20,
-                    (DISP_SIZE[1] - pos_text.get_rect().size[1]) - 20
+                    (constants.DISP_SIZE[1] - pos_text.get_rect().size[1]) - 20
                 )
             )
+            dirty.append(debug_rect)
 
-        # handle controls for debugging
-        keys = pygame.key.get_pressed()
-        if keys[K_a]:
-            playfield.shooter.rotate(1)
+        # update the display to show changes
+        if quality.dirty_rects:
+            pygame.display.update(dirty)
 
-        elif keys[K_d]:
-            playfield.shooter.rotate(-1)
+        else:
+            pygame.display.update()
 
-        # this is the event handler, which we should move to src.Control
-        # this is where any graphical updates are blitted to the display
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                # stop music playback
-                # this will need to move later to the appropriate place based on design
-                pygame.mixer.music.stop()
-                return
+        controls.frame_presented()
 
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    playfield.shooter.fire(10, playfield.active_bubble)
+        # copies the frame into a pooled buffer, encoding and disk writes happen on the capture thread
+        if capture:
+            capture.capture(screen)
 
-        # update the display to show changes
-        # in production, we will use "dirty rect" updating to improve performance
-        pygame.display.update()
+        # cap the framerate, then let the governor know how long the frame took without the wait
+        clock.tick(constants.TARGET_FPS)
+        frame += 1
 
-        pygame.event.pump()
+        if gc_monitor:
+            gc_monitor.next_frame()
 
-        # set framerate to no more than 60FPS
-        clock.tick(60)
+        if governor.frame(clock.get_rawtime()):
+            governor.apply(playfield)
 
     pygame.quit()
 
@@ -0,0 +1,172 @@
+import collections
+import pygame
+from src.bubble import Bubble
+
+__all__ = ["AimGuide", "Trajectory"]
+
+# path: pixel positions where the shot starts, bounces and stops.  cell_id: HexMap id of the cell it settles in,
+# None if it falls out of the board.  near: ids of the cells whose contents could change the path
+Trajectory = collections.namedtuple("Trajectory", ["path", "cell_id", "near"])
+
+# a shot that hasn't settled after this many ticks is given up on
+MAX_TICKS = 2000
+
+
+class AimGuide:
+
+    def __init__(self, playfield, speed=10, color='WHITE'):
+        """
+        Predicts where a shot fired at each Shooter.angle goes: its bounce path and the cell it settles in.
+        Trajectories are traced once per angle by stepping a probe bubble exactly like Playfield.update() steps
+        a fired one, and kept until a cell near their path changes on the board, see sync().
+
+        :type playfield: src.playfield.Playfield
+        :param speed: Velocity shots are fired at, as passed to Shooter.fire().
+        :type speed: int
+        :param color: Color the guide is drawn in.
+        :type color: str
+        """
+        self.playfield = playfield
+        self.speed = speed
+        self.color = pygame.Color(color)
+
+        self._trajectories = dict()  # angle -> Trajectory
+        self._angles_near = collections.defaultdict(set)  # cell id -> angles whose trajectory passes near it
+
+    def rebuild(self):
+        """
+        Traces every angle the shooter can be turned to.  Called after a map load.
+
+        :return: None
+        """
+        self.invalidate()
+        self.playfield.bubble_map.dirty_ids.clear()
+
+        low, high = self.playfield.shooter.limits
+
+        for angle in range(low, high + 1):
+            self.get(angle)
+
+    def invalidate(self, angles=None):
+        """
+        Drops the trajectories of the given angles, or all of them, so they are traced again on next use.
+
+        :type angles: Iterable
+        :return: None
+        """
+        if angles is None:
+            self._trajectories.clear()
+            self._angles_near.clear()
+            return
+
+        for angle in angles:
+            trajectory = self._trajectories.pop(angle, None)
+
+            if trajectory is None:
+                continue
+
+            for cell_id in trajectory.near:
+                self._angles_near[cell_id].discard(angle)
+
+    def sync(self):
+        """
+        Drops the trajectories that pass near cells added or removed on the board since the last call.  This is
+        one set lookup per changed cell, nothing at all on frames where the board didn't change.
+
+        :return: None
+        """
+        dirty = self.playfield.bubble_map.dirty_ids
+
+        if not dirty:
+            return
+
+        stale = set()
+
+        for cell_id in dirty:
+            stale.update(self._angles_near.get(cell_id, ()))
+
+        dirty.clear()
+        self.invalidate(stale)
+
+    def get(self, angle):
+        """
+        Returns the Trajectory of a shot fired at angle, tracing it if it isn't cached.
+
+        :type angle: int
+        :return: Trajectory
+        """
+        trajectory = self._trajectories.get(angle)
+
+        if trajectory is None:
+            trajectory = self._trajectories[angle] = self._trace(angle)
+
+            for cell_id in trajectory.near:
+                self._angles_near[cell_id].add(angle)
+
+        return trajectory
+
+    def _trace(self, angle):
+        playfield = self.playfield
+        hexmap = playfield.hexmap
+        shooter = playfield.shooter
+
+        # same start, angle and velocity as Shooter.fire() gives the real bubble, but in no sprite group
+        probe = Bubble(shooter._bubble_origin_addr, shooter.rect.center, playfield.cell_radius, 'WHITE', 'BLACK',
+                       angle, self.speed)
+        reach = probe.radius + playfield.cell_radius
+        path = [tuple(probe.rect.center)]
+        near = set()
+        cell_id = None
+
+        for _ in range(MAX_TICKS):
+            probe.update()
+            center = probe.rect.center
+
+            # the cells touching() and _landing_cell() look at from here
+            near.update(hexmap.hex_range(hexmap.get_celladdressbypixel(center), 2))
+
+            velocity = tuple(probe.velocity)
+
+            if playfield._check_bounds(probe):
+                if probe.rect.top > playfield.rect.bottom:
+                    path.append(tuple(center))
+                    break
+
+                if tuple(probe.velocity) != velocity:
+                    path.append(tuple(center))
+
+                continue
+
+            if playfield.bubble_map.touching(center, reach):
+                try:
+                    cell = playfield._landing_cell(probe)
+
+                except AssertionError:
+                    cell = None
+
+                path.append(tuple(center))
+
+                if cell is not None:
+                    cell_id = hexmap.get_cell_id(cell.axialpos)
+                    path.append(tuple(cell.get_pixelpos()))
+
+                break
+
+        return Trajectory(tuple(path), cell_id, frozenset(near))
+
+    def draw(self, surface, angle):
+        """
+        Draws the path of a shot at angle and circles the cell it settles in.
+
+        :type surface: pygame.Surface
+        :type angle: int
+        :return: None
+        """
+        trajectory = self.get(angle)
+
+        if len(trajectory.path) > 1:
+            pygame.draw.lines(surface, self.color, False, trajectory.path, 1)
+
+        if trajectory.cell_id is not None:
+            center = self.playfield.hexmap.cells[trajectory.cell_id].get_pixelpos()
+            pygame.draw.circle(surface, self.color, center, self.playfield.cell_radius, 1)
@@ -0,0 +1,317 @@
+import os
+import itertools
+import numpy
+from src.headless import init_display
+from src.replay import ReplayPlayer, REPLAY_MAGIC
+
+__all__ = ["ShotStats", "iter_replay_files", "iter_shots", "iter_batches", "analyze", "render_heatmap"]
+
+# shots are aggregated in batches of this many, one bincount per array per batch instead of work per shot
+BATCH_SIZE = 8192
+
+# match group sizes above this land in the last histogram bin
+MAX_MATCH_SIZE = 32
+
+
+class ShotStats:
+
+    def __init__(self, cell_count, angle_limits):
+        """
+        Landing statistics for one board.  Per-cell arrays are indexed by HexMap cell id, the angle histogram by
+        Shooter.angle - angle_limits[0].  Stats of the same board merge by adding them, see merge().
+
+        :param cell_count: Number of cells on the board, len(HexMap.cells).
+        :type cell_count: int
+        :param angle_limits: Shooter.limits, the lowest and highest angle a shot can be fired at.
+        :type angle_limits: Tuple(int, int)
+        """
+        self.angle_limits = tuple(angle_limits)
+        self.shots = 0
+
+        self.landings = numpy.zeros(cell_count, dtype=numpy.int64)  # shots settled per cell
+        self.matched = numpy.zeros(cell_count, dtype=numpy.int64)  # bubbles popped by shots settling per cell
+        self.dropped = numpy.zeros(cell_count, dtype=numpy.int64)  # bubbles dropped by shots settling per cell
+        self.match_sizes = numpy.zeros(MAX_MATCH_SIZE + 1, dtype=numpy.int64)  # shots per popped group size
+        self.angles = numpy.zeros(angle_limits[1] - angle_limits[0] + 1, dtype=numpy.int64)  # shots per angle
+
+    def add_batch(self, cell_ids, angles, matched, dropped):
+        """
+        Adds a batch of shots, given as equally long integer arrays.
+
+        :type cell_ids: numpy.ndarray
+        :type angles: numpy.ndarray
+        :type matched: numpy.ndarray
+        :type dropped: numpy.ndarray
+        :return: None
+        """
+        cells = len(self.landings)
+
+        self.shots += len(cell_ids)
+        self.landings += numpy.bincount(cell_ids, minlength=cells)
+        self.matched += numpy.bincount(cell_ids, weights=matched, minlength=cells).astype(numpy.int64)
+        self.dropped += numpy.bincount(cell_ids, weights=dropped, minlength=cells).astype(numpy.int64)
+        self.match_sizes += numpy.bincount(numpy.minimum(matched, MAX_MATCH_SIZE), minlength=MAX_MATCH_SIZE + 1)
+
+        angle_bins = numpy.clip(angles - self.angle_limits[0], 0, len(self.angles) - 1)
+        self.angles += numpy.bincount(angle_bins, minlength=len(self.angles))
+
+    def merge(self, other):
+        """
+        Adds the stats of another ShotStats of the same board to these.
+
+        :type other: ShotStats
+        :return: ShotStats self
+        """
+        if len(other.landings) != len(self.landings) or other.angle_limits != self.angle_limits:
+            raise ValueError('Can only merge stats of the same board and shooter limits.')
+
+        self.shots += other.shots
+        self.landings += other.landings
+        self.matched += other.matched
+        self.dropped += other.dropped
+        self.match_sizes += other.match_sizes
+        self.angles += other.angles
+
+        return self
+
+    def top_cells(self, count=10, by='landings'):
+        """
+        Returns (cell id, value) of the count cells with the highest value of the given per-cell array.
+
+        :param by: One of landings, matched or dropped.
+        :type by: str
+        :return: List
+        """
+        values = getattr(self, by)
+        order = numpy.argsort(values, kind='stable')[::-1][:count]
+
+        return [(int(cell_id), int(values[cell_id])) for cell_id in order if values[cell_id]]
+
+    def save(self, filepath):
+        """
+        Writes the arrays to a .npz file.
+
+        :type filepath: str
+        :return: None
+        """
+        numpy.savez_compressed(
+            filepath, shots=self.shots, angle_limits=self.angle_limits, landings=self.landings,
+            matched=self.matched, dropped=self.dropped, match_sizes=self.match_sizes, angles=self.angles
+        )
+
+
+def iter_replay_files(paths):
+    """
+    Yields the replay files among the given paths.  Directories are walked for files that start with the replay
+    magic, whatever they are named.
+
+    :type paths: Iterable
+    :return: generator of str
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for dirpath, _, filenames in os.walk(path):
+            for filename in sorted(filenames):
+                filepath = os.path.join(dirpath, filename)
+
+                with open(filepath, 'rb') as fp:
+                    if fp.read(len(REPLAY_MAGIC)) == REPLAY_MAGIC:
+                        yield filepath
+
+
+def iter_shots(replay_files, cell_size):
+    """
+    Plays each replay back headless and yields (map file path, cell count, angle limits) once per replay,
+    followed by (cell id, angle, matched, dropped) for every shot that settles in it.  Only one replay is held
+    in memory at a time.
+
+    :type replay_files: Iterable
+    :type cell_size: Tuple(float, float)
+    :return: generator of Tuple
+    """
+    for filepath in replay_files:
+        # no keyframes, playback never seeks
+        player = ReplayPlayer(filepath, cell_size, keyframe_interval=2 ** 62)
+        playfield = player.playfield
+        playfield.headless = True
+
+        shots = []
+        playfield.on_shot = lambda *shot: shots.append(shot)
+
+        yield player.map_file_path, len(playfield.hexmap.cells), playfield.shooter.limits
+
+        while player.step():
+            if shots:
+                yield from shots
+                shots.clear()
+
+
+def iter_batches(shots, batch_size=BATCH_SIZE):
+    """
+    Groups the output of iter_shots into (map file path, cell count, angle limits, shot array) batches, where
+    the shot array is an int64 array of shape (n, 4) holding cell id, angle, matched and dropped columns.
+
+    :type shots: Iterable
+    :type batch_size: int
+    :return: generator of Tuple
+    """
+    header = None
+    buffer = []
+
+    for item in itertools.chain(shots, (None,)):
+        # a 3-tuple starts the next replay, None ends the stream
+        if item is not None and len(item) == 4:
+            buffer.append(item)
+
+            if len(buffer) < batch_size:
+                continue
+
+        if buffer:
+            yield header + (numpy.array(buffer, dtype=numpy.int64),)
+            buffer = []
+
+        if item is not None and len(item) == 3:
+            header = item
+
+
+def _analyze_files(job):
+    replay_files, cell_size = job
+    results = dict()
+
+    for map_file_path, cell_count, limits, batch in iter_batches(iter_shots(replay_files, cell_size)):
+        stats = results.get(map_file_path)
+
+        if stats is None:
+            stats = results[map_file_path] = ShotStats(cell_count, limits)
+
+        stats.add_batch(batch[:, 0], batch[:, 1], batch[:, 2], batch[:, 3])
+
+    return results
+
+
+def analyze(paths, cell_size, workers=None, files_per_job=16):
+    """
+    Aggregates the shots of every replay under paths into one ShotStats per map.  Replays are played back
+    across a process pool in jobs of files_per_job files, and the per-job results are merged here.
+
+    :type paths: Iterable
+    :type cell_size: Tuple(float, float)
+    :param workers: Number of worker processes, defaults to the CPU count.  0 plays back in this process.
+    :type workers: int
+    :type files_per_job: int
+    :return: dict of map file path -> ShotStats
+    """
+    files = iter_replay_files(paths)
+    jobs = iter(lambda: (list(itertools.islice(files, files_per_job)), cell_size), ([], cell_size))
+    merged = dict()
+
+    if workers == 0:
+        init_display()
+        results = map(_analyze_files, jobs)
+
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_display)
+        results = pool.map(_analyze_files, jobs)
+
+    try:
+        for result in results:
+            for map_file_path, stats in result.items():
+                if map_file_path in merged:
+                    merged[map_file_path].merge(stats)
+
+                else:
+                    merged[map_file_path] = stats
+
+    finally:
+        if workers != 0:
+            pool.shutdown()
+
+    return merged
+
+
+def render_heatmap(stats, hexmap, by='landings', surface=None):
+    """
+    Renders a per-cell array of stats as a heatmap over the HexCell.paint grid: every cell is filled from dark
+    blue (none) to red (the highest value), then painted with its outline and address on top.
+
+    :type stats: ShotStats
+    :type hexmap: src.hexamaplib.hex_map.HexMap
+    :param by: One of landings, matched or dropped.
+    :type by: str
+    :param surface: Surface to draw on, a new one the size of the board if not given.
+    :type surface: pygame.Surface
+    :return: pygame.Surface
+    """
+    import pygame
+
+    if surface is None:
+        surface = pygame.Surface(hexmap.surface_size)
+        surface.fill(pygame.Color('BLACK'))
+
+    values = getattr(stats, by)
+    scale = values.max() or 1
+
+    for cell_id, cell in enumerate(hexmap.cells):
+        t = values[cell_id] / scale
+        color = (int(255 * t), int(64 * (1 - abs(2 * t - 1))), int(160 * (1 - t)))
+
+        pygame.draw.polygon(surface, color, cell.get_polygon_corners(cell.layout, cell.cubepos))
+        cell.paint(surface, color='grey', width=1)
+
+    return surface
+
+
+def main():
+    import argparse
+    import time
+    import pygame
+    from src import constants
+    from src.playfield import Playfield
+
+    parser = argparse.ArgumentParser(description='Aggregates where shots land over replay logs.')
+    parser.add_argument('replays', nargs='+', help='replay files, or directories searched for them')
+    parser.add_argument('--workers', type=int, help='worker processes, 0 for none, default one per CPU')
+    parser.add_argument('--out', metavar='DIR', help='write a heatmap image and the .npz arrays per map here')
+    parser.add_argument('--by', default='landings', choices=('landings', 'matched', 'dropped'),
+                        help='per-cell value the heatmap shows')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = analyze(args.replays, constants.CELL_SIZE, args.workers)
+    elapsed = time.perf_counter() - start
+    shots = sum(stats.shots for stats in results.values())
+
+    print('{0} shots in {1:.2f}s ({2:.0f} shots/s)'.format(shots, elapsed, shots / max(elapsed, 1e-9)))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        init_display()
+
+    for map_file_path, stats in sorted(results.items()):
+        low = stats.angle_limits[0]
+        top_angles = numpy.argsort(stats.angles, kind='stable')[::-1][:5]
+
+        print('{0}: {1} shots'.format(map_file_path, stats.shots))
+        print('  most landings: {0}'.format(stats.top_cells(5, 'landings')))
+        print('  most popped:   {0}'.format(stats.top_cells(5, 'matched')))
+        print('  top angles:    {0}'.format([(int(a) + low, int(stats.angles[a])) for a in top_angles]))
+
+        if args.out:
+            # the playfield is only loaded for its HexMap, which is what the cell ids refer to
+            hexmap = Playfield(map_file_path, constants.CELL_SIZE).hexmap
+            name = os.path.splitext(os.path.basename(map_file_path))[0]
+
+            pygame.image.save(render_heatmap(stats, hexmap, args.by), os.path.join(args.out, name + '.png'))
+            stats.save(os.path.join(args.out, name + '.npz'))
+
+    if args.out:
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
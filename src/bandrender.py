@@ -0,0 +1,85 @@
+import os
+import pygame
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ["BandRenderer", "row_bands"]
+
+
+def row_bands(hexmap, area, count):
+    """
+    Splits area into up to count horizontal bands whose edges fall halfway between two hex rows, so every band
+    holds whole rows of cells.
+
+    :type hexmap: src.hexamaplib.hex_map.HexMap
+    :type area: pygame.Rect
+    :type count: int
+    :return: List of pygame.Rect, top to bottom, covering area exactly
+    """
+    row_height = hexmap.hex_orientation.f3 * hexmap.cellsize.y
+    origin_y = hexmap.origin[1]
+
+    # edges between the rows inside area
+    first = int((area.top - origin_y) // row_height)
+    last = int((area.bottom - origin_y) // row_height)
+    edges = [int(origin_y + (r + 0.5) * row_height) for r in range(first, last + 1)]
+    edges = [y for y in edges if area.top < y < area.bottom]
+
+    # spread the rows evenly over the bands
+    picked = sorted(set(edges[i * len(edges) // count] for i in range(1, count))) if edges else []
+    tops = [area.top] + picked
+    bottoms = picked + [area.bottom]
+
+    return [pygame.Rect(area.left, top, area.width, bottom - top) for top, bottom in zip(tops, bottoms)]
+
+
+class BandRenderer:
+
+    def __init__(self, workers=None, bands=None):
+        """
+        Draws a surface in horizontal bands on a thread pool.  Each band is a subsurface of the target, so the
+        threads write disjoint pixels and never share a clip rect, and pygame releases the GIL during blits and
+        fills, so bands really do draw at the same time.  Every band runs the same drawing code over its own
+        area, in the same order as a single pass over the whole area would, so the result is pixel identical.
+
+        :param workers: Number of threads, defaults to the CPU count.
+        :type workers: int
+        :param bands: Number of bands, defaults to the number of workers.
+        :type bands: int
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.bands = bands or self.workers
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='band-render')
+
+    def run(self, surface, area, hexmap, draw):
+        """
+        Calls draw(band_surface, band_area) for every band of area and waits for all of them.  band_surface is
+        the subsurface of surface covering band_area, so draw has to offset its blits by band_area.topleft.
+
+        :type surface: pygame.Surface
+        :type area: pygame.Rect
+        :param hexmap: Board the bands follow the rows of.
+        :type hexmap: src.hexamaplib.hex_map.HexMap
+        :param draw: Callable taking (pygame.Surface, pygame.Rect).
+        :return: None
+        """
+        area = area.clip(surface.get_rect())
+
+        if not area:
+            return
+
+        jobs = [
+            self._pool.submit(draw, surface.subsurface(band), band)
+            for band in row_bands(hexmap, area, self.bands)
+        ]
+
+        # join before anyone touches surface again, and re-raise whatever a band raised
+        for job in jobs:
+            job.result()
+
+    def close(self):
+        """
+        Shuts the thread pool down.
+
+        :return: None
+        """
+        self._pool.shutdown()
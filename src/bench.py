@@ -0,0 +1,189 @@
+import os
+import timeit
+
+__all__ = ["bench_coords", "bench_render"]
+
+# the hand written maps' surface and cell size, see levelgen.DEFAULT_MAP_SIZE and constants.CELL_SIZE
+BOARD_SIZE = (338, 588)
+CELL_SIZE = (338 / 23, 338 / 23)
+
+
+def _best_us(stmt, number, repeat=5):
+    # fastest of a few runs, per call
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_coords(number=200):
+    """
+    Times neighbor lookups, hashing and board scans with axial address tuples against packed coordinate keys,
+    on a HexMap the size of the regular board.  Returns a list of (name, tuple us, packed us) rows.
+
+    :param number: Calls per timing run.
+    :type number: int
+    :return: List
+    """
+    from src.hexamaplib.hex_map import HexMap
+    from src.hexamaplib.hex_tables import AXIAL_DIRECTIONS, KEY_DIRECTIONS, pack
+
+    hexmap = HexMap(BOARD_SIZE, CELL_SIZE, hex_orientation='pointy')
+    addresses = [tuple(addr) for addr in hexmap.board]
+    keys = [pack(q, r) for q, r in addresses]
+    cell_index = hexmap.cell_index
+    key_index = hexmap.key_index
+
+    def tuple_neighbors():
+        get = cell_index.get
+        return [get((q + dq, r + dr)) for q, r in addresses for dq, dr in AXIAL_DIRECTIONS]
+
+    def packed_neighbors():
+        get = key_index.get
+        return [get(key + offset) for key in keys for offset in KEY_DIRECTIONS]
+
+    def tuple_hash():
+        return [hash((q, r)) for q, r in addresses]
+
+    def packed_hash():
+        return [hash(key) for key in keys]
+
+    def tuple_flood():
+        # connected component of the whole board, the shape of match and orphan searches
+        get = cell_index.get
+        seen = {addresses[0]}
+        stack = [addresses[0]]
+
+        while stack:
+            q, r = stack.pop()
+
+            for dq, dr in AXIAL_DIRECTIONS:
+                nbr = (q + dq, r + dr)
+
+                if nbr not in seen and get(nbr) is not None:
+                    seen.add(nbr)
+                    stack.append(nbr)
+
+        return seen
+
+    def packed_flood():
+        # neighbors computed on every step like tuple_flood does, not the memoized HexMap.neighbor_ids, so only
+        # the address representation differs
+        get = key_index.get
+        seen = {keys[0]}
+        stack = [keys[0]]
+
+        while stack:
+            key = stack.pop()
+
+            for offset in KEY_DIRECTIONS:
+                nbr = key + offset
+
+                if nbr not in seen and get(nbr) is not None:
+                    seen.add(nbr)
+                    stack.append(nbr)
+
+        return seen
+
+    assert len(tuple_flood()) == len(packed_flood())
+
+    return [
+        ('neighbor lookups, whole board', _best_us(tuple_neighbors, number), _best_us(packed_neighbors, number)),
+        ('hashing, whole board', _best_us(tuple_hash, number), _best_us(packed_hash, number)),
+        ('flood fill, whole board', _best_us(tuple_flood, number), _best_us(packed_flood, number)),
+    ]
+
+
+def bench_render(size=(1920, 1080), number=20, workers=None):
+    """
+    Times full board renders (board layer plus frame composition) of a filled board of the given surface size,
+    on one thread and with BandRenderer at 1, 2, 4, ... threads up to the CPU count.  Every threaded result is
+    checked to be pixel identical to the single threaded one.  Returns a list of (threads, ms per render) rows,
+    threads 0 being the plain single threaded path.
+
+    :type size: Tuple(int, int)
+    :param number: Renders per timing run.
+    :type number: int
+    :param workers: List of thread counts to time, defaults to powers of two up to the CPU count.
+    :type workers: List
+    :return: List
+    """
+    import json
+    import tempfile
+    import pygame
+    from src.bandrender import BandRenderer
+    from src.headless import init_display
+    from src.levelgen import LevelParams, generate_map
+    from src.playfield import Playfield
+
+    init_display()
+
+    # cells as big as on the regular board relative to its width, every row filled
+    cell_size = (size[0] / 23, size[0] / 23)
+    params = LevelParams(size[0], size[1], cell_size, rows=1000, density=1.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.json')
+
+        with open(path, 'w') as fp:
+            json.dump(generate_map(params, 0), fp)
+
+        playfield = Playfield(path, cell_size, seed=0)
+
+    def render():
+        playfield.render_board_layer()
+        playfield.update()
+
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = sorted(set([2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus] + [cpus]))
+
+    render()
+    reference = pygame.image.tostring(playfield.image, 'RGBA')
+    rows = [(0, _best_us(render, number) / 1000)]
+
+    for count in workers:
+        playfield.renderer = BandRenderer(count)
+        render()
+
+        if pygame.image.tostring(playfield.image, 'RGBA') != reference:
+            raise AssertionError('Band rendering with {0} threads is not pixel identical.'.format(count))
+
+        rows.append((count, _best_us(render, number) / 1000))
+        playfield.renderer.close()
+
+    playfield.renderer = None
+
+    return rows
+
+
+def _print_rows(title, rows):
+    print(title)
+
+    for name, old_us, new_us in rows:
+        print('  {0:32} {1:9.1f} us {2:9.1f} us  {3:5.2f}x'.format(name, old_us, new_us, old_us / new_us))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Micro benchmarks for the board code.')
+    parser.add_argument('benchmark', choices=('coords', 'render'))
+    parser.add_argument('--number', type=int, help='calls per timing run')
+    parser.add_argument('--size', type=int, nargs=2, default=(1920, 1080), metavar=('WIDTH', 'HEIGHT'),
+                        help='playfield surface size for the render benchmark')
+    parser.add_argument('--threads', type=int, nargs='+', help='thread counts for the render benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark == 'coords':
+        _print_rows('tuple keys vs packed keys, {0}x{1} board:'.format(*BOARD_SIZE), bench_coords(args.number or 200))
+
+    elif args.benchmark == 'render':
+        rows = bench_render(tuple(args.size), args.number or 20, args.threads)
+        single_ms = rows[0][1]
+        print('full board renders, {0}x{1} surface, {2} cpus:'.format(args.size[0], args.size[1], os.cpu_count()))
+
+        for threads, ms in rows:
+            print('  {0:12} {1:8.2f} ms  {2:5.2f}x'.format(
+                '{0} threads'.format(threads) if threads else 'single pass', ms, single_ms / ms))
+
+
+if __name__ == "__main__":
+    main()
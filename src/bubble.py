@@ -1,15 +1,51 @@
 import pygame
 from pygame.math import Vector2
+from src.spritecache import get_sprite_cache, find_art
+from src.constants import TYPE_IDS
+
+# shared bubble imagery, keyed by (fill_color, stroke_color, radius)
+_image_cache = dict()
+
+
+def get_bubble_image(fill_color, stroke_color, radius):
+    """
+    Returns the shared image Surface for a bubble of the given colors and radius, rendering it on first use.
+    Every Bubble (and anything else drawing bubbles, like particles) of the same look shares one Surface.
+
+    :type fill_color: str
+    :type stroke_color: str
+    :type radius: int
+    :return: pygame.Surface
+    """
+    key = (fill_color, stroke_color, radius)
+    image = _image_cache.get(key)
+
+    if image is None:
+        art = find_art('bubble_{0}'.format(fill_color))
+
+        if art:
+            image = get_sprite_cache().load(art, (radius * 2, radius * 2))
+            _image_cache[key] = image
+
+            return image
+
+        # for drawing placeholder images, until there is art for every bubble type
+        image = pygame.Surface((radius * 2, radius * 2)).convert()
+        image.set_colorkey(pygame.Color('MAGENTA'))
+        image.fill(pygame.Color('MAGENTA'))
+        pygame.draw.circle(image, pygame.Color(fill_color), image.get_rect().center, radius)  # filled cir
+        pygame.draw.circle(image, pygame.Color(stroke_color), image.get_rect().center, radius, 2)  # stroke
+        _image_cache[key] = image
+
+    return image
 
 
 class Bubble(pygame.sprite.Sprite):
 
     def __init__(self, address, pos, radius, fill_color, stroke_color, angle=90, velocity=0, *groups):
         super().__init__(*groups)
-        self.image = pygame.Surface((radius * 2, radius * 2)).convert()
-        self.image.set_colorkey(pygame.Color('MAGENTA'))
-        self.background = pygame.Surface((radius * 2, radius * 2)).convert()
-        self.background.set_colorkey(pygame.Color('MAGENTA'))
+        self.image = get_bubble_image(fill_color, stroke_color, radius)
+        self.background = get_bubble_image('MAGENTA', 'MAGENTA', radius)
         self.rect = self.image.get_rect(center=pos)
 
         # movement & location
@@ -18,18 +54,14 @@ class Bubble(pygame.sprite.Sprite):
         self.angle = angle
         self.velocity = Vector2(1, 0).rotate(-self.angle) * velocity
 
-        # for drawing placeholder images
-        # this will be replaced with actual image code later
+        # drawing properties, the images themselves are shared between bubbles
         self.radius = radius
         self.fill = pygame.Color(fill_color)
         self.stroke = pygame.Color(stroke_color)
-        self.background.fill(pygame.Color('MAGENTA'))
-        self.image.fill(pygame.Color('MAGENTA'))
-        pygame.draw.circle(self.image, self.fill, self.image.get_rect().center, self.radius)  # filled cir
-        pygame.draw.circle(self.image, self.stroke, self.image.get_rect().center, self.radius, 2)  # stroke
 
         # game properties
         self.type_property = fill_color  # temporary value
+        self.type_id = TYPE_IDS.get(fill_color)  # index into ALL_TYPEPROPERTIES, what BubbleMap stores
 
     def set_velocity(self, velocity):
         self.velocity = Vector2(1, 0).rotate(-self.angle) * velocity
@@ -65,29 +97,3 @@ class Bubble(pygame.sprite.Sprite):
         """
 
         self.velocity = self.velocity.reflect(collision_vector.rotate(90).normalize())
-
-    # overload placeholders
-    def add(self, *groups):
-        super().add(*groups)
-
-    def remove(self, *groups):
-        super().remove(*groups)
-
-    def add_internal(self, group):
-        super().add_internal(group)
-
-    def remove_internal(self, group):
-        super().remove_internal(group)
-
-    def kill(self):
-        super().kill()
-
-    def groups(self):
-        return super().groups()
-
-    def alive(self):
-        return super().alive()
-
-    def __repr__(self):
-        return super().__repr__()
-
@@ -1,54 +1,419 @@
-from pygame.sprite import Group, Sprite
-from bubble import Bubble
+import struct
+import numpy
+from array import array
+from pygame.sprite import Group
+from src.constants import ALL_TYPEPROPERTIES
+from src.hexamaplib.hex_tables import pack
+
+# a snapshot row is a run of these: (q, index into ALL_TYPEPROPERTIES).  q is as wide as _q, endless boards
+# drift it by one every two rows they scroll
+_SNAPSHOT_CELL = struct.Struct('<iB')
 
 
 class BubbleMap(Group):
 
-    def __init__(self, *sprites):
+    def __init__(self, *sprites, hexmap=None):
         """
+        The board contents, stored by HexMap cell id: a type id array (indexes into ALL_TYPEPROPERTIES) plus an
+        occupancy bitmap, one byte per cell.  Game logic (matching, connectivity, present types, snapshots) runs on
+        these arrays.  Bubble sprites are optional views of occupied cells, the Group holds only them and they are
+        only needed for rendering.
 
         :type *sprites: bubble.Bubble
+        :param hexmap: The board's HexMap, see bind().
+        :type hexmap: src.hexamaplib.hex_map.HexMap
         """
-        super().__init__(*sprites)
+        super().__init__()
 
-        # internal structure that keeps track of Bubbles by grid address
-        self.sprite_dict_by_address = dict()
+        self.hexmap = None
+        self.types = bytearray()
+        self.occupied = bytearray()
+        self.count = 0
 
-    def add(self, *sprites):
-        super().add(*sprites)
+        # address of every occupied cell, so ids map back to addresses without going through the HexMap
+        self._q = array('i')
+        self._r = array('i')
+
+        # cell id -> Bubble, the render views
+        self.views = dict()
+
+        # areas of cells added or removed since the owner last redrew them
+        self.dirty_areas = list()
+
+        # ids of cells added or removed since their consumer last looked, e.g. src.aimguide
+        self.dirty_ids = set()
+
+        # snapshot bookkeeping
+        self._row_cache = dict()  # r -> encoded row bytes, shared between consecutive snapshots
+        self._dirty_rows = set()
+
+        if hexmap is not None:
+            self.bind(hexmap)
+
+        self.add(*sprites)
+
+    def bind(self, hexmap):
+        """
+        Empties the map and switches it to a new board.
+
+        :type hexmap: src.hexamaplib.hex_map.HexMap
+        :return: None
+        """
+        self.empty()
+        self.hexmap = hexmap
+        self._row_cache.clear()
+        self._dirty_rows.clear()
+        self.dirty_ids.clear()
+
+        size = len(hexmap.cells)
+        self.types = bytearray(size)
+        self.occupied = bytearray(size)
+        self._q = array('i', bytes(4 * size))
+        self._r = array('i', bytes(4 * size))
+
+    def _grow(self, cell_id):
+        # boards that load cells later (ChunkedHexMap) hand out ids past the initial size
+        extra = max(cell_id + 1, 2 * len(self.occupied)) - len(self.occupied)
+        self.types.extend(bytes(extra))
+        self.occupied.extend(bytes(extra))
+        self._q.frombytes(bytes(4 * extra))
+        self._r.frombytes(bytes(4 * extra))
+
+    def place(self, address, type_id, view=None):
+        """
+        Puts a bubble of the given type on an empty cell, optionally with a sprite to render it.  Returns False
+        and changes nothing if the cell is taken.
+
+        :param address: Axial address of a cell on the board.
+        :type address: tuple
+        :param type_id: Index into ALL_TYPEPROPERTIES.
+        :type type_id: int
+        :param view: Sprite rendering the bubble.
+        :type view: bubble.Bubble
+        :return: bool
+        """
+        if type_id is None:
+            raise ValueError('Unknown bubble type at {0}.'.format(address))
+
+        cell_id = self.hexmap.key_index[pack(address[0], address[1])]
+
+        if cell_id >= len(self.occupied):
+            self._grow(cell_id)
+
+        elif self.occupied[cell_id]:
+            return False
+
+        self.types[cell_id] = type_id
+        self.occupied[cell_id] = 1
+        self._q[cell_id], self._r[cell_id] = address
+        self.count += 1
+        self._dirty_rows.add(address[1])
+        self.dirty_ids.add(cell_id)
+
+        if view is not None:
+            super().add(view)
+            self.views[cell_id] = view
+            self.dirty_areas.append(view.rect.copy())
+
+        return True
+
+    def clear_cell(self, cell_id):
+        """
+        Empties a cell and returns its view, which is removed from the map but not killed.
+
+        :type cell_id: int
+        :return: bubble.Bubble or None
+        """
+        if cell_id >= len(self.occupied) or not self.occupied[cell_id]:
+            return None
+
+        self.occupied[cell_id] = 0
+        self.count -= 1
+        self._dirty_rows.add(self._r[cell_id])
+        self.dirty_ids.add(cell_id)
+        view = self.views.pop(cell_id, None)
+
+        if view is not None:
+            super().remove(view)
+            self.dirty_areas.append(view.rect.copy())
+
+        return view
 
+    def _cell_id(self, address):
+        return self.hexmap.key_index.get(pack(address[0], address[1])) if self.hexmap else None
+
+    def pop(self, address):
+        """
+        Empties the cell at address and returns its view, see clear_cell().
+
+        :type address: tuple
+        :return: bubble.Bubble or None
+        """
+        cell_id = self._cell_id(address)
+
+        return None if cell_id is None else self.clear_cell(cell_id)
+
+    def add(self, *sprites):
         for obj in sprites:
-            if obj.grid_address not in self.sprite_dict_by_address:
-                self.sprite_dict_by_address[obj.grid_address] = obj
+            self.place(obj.grid_address, obj.type_id, obj)
 
     def remove(self, *sprites):
-        super().remove(*sprites)
-
         for obj in sprites:
-            if obj.grid_address in self.sprite_dict_by_address:
-                del self.sprite_dict_by_address[obj.grid_address]
+            cell_id = self._cell_id(obj.grid_address)
+
+            if cell_id is not None and self.views.get(cell_id) is obj:
+                self.clear_cell(cell_id)
 
     def empty(self):
+        self.dirty_areas.extend(spr.rect.copy() for spr in self.views.values())
         super().empty()
-        self.sprite_dict_by_address.clear()
+        self.views.clear()
+
+        for cell_id in self.occupied_ids().tolist():
+            self._dirty_rows.add(self._r[cell_id])
+            self.dirty_ids.add(cell_id)
+
+        self.occupied = bytearray(len(self.occupied))
+        self.count = 0
 
     def get(self, address):
-        try:
-            return self.sprite_dict_by_address[address]
+        """
+        Returns the view of the bubble at address, or None.
+
+        :type address: tuple
+        :return: bubble.Bubble
+        """
+        cell_id = self._cell_id(address)
+
+        return None if cell_id is None else self.views.get(cell_id)
+
+    def is_occupied(self, address):
+        """
+        Returns True if there is a bubble at address.
+
+        :type address: tuple
+        :return: bool
+        """
+        cell_id = self._cell_id(address)
+
+        return cell_id is not None and self.is_occupied_id(cell_id)
+
+    def is_occupied_id(self, cell_id):
+        """
+        Returns True if there is a bubble on the cell with the given id.
+
+        :type cell_id: int
+        :return: bool
+        """
+        return cell_id < len(self.occupied) and self.occupied[cell_id] == 1
+
+    def type_at(self, address):
+        """
+        Returns the type id of the bubble at address, or None if the cell is empty.
+
+        :type address: tuple
+        :return: int
+        """
+        cell_id = self._cell_id(address)
+
+        if cell_id is None or cell_id >= len(self.occupied) or not self.occupied[cell_id]:
+            return None
+
+        return self.types[cell_id]
 
-        except KeyError:
+    def occupied_ids(self):
+        """
+        Returns the ids of all occupied cells, in id order.
+
+        :return: numpy.ndarray
+        """
+        return numpy.flatnonzero(numpy.frombuffer(self.occupied, dtype=numpy.uint8))
+
+    def address_of(self, cell_id):
+        """
+        Returns the address of an occupied cell.
+
+        :type cell_id: int
+        :return: tuple
+        """
+        return self._q[cell_id], self._r[cell_id]
+
+    def items(self):
+        """
+        Returns (address, type id) for every bubble, in cell id order.
+
+        :return: List
+        """
+        return [((self._q[i], self._r[i]), self.types[i]) for i in self.occupied_ids().tolist()]
+
+    def lowest_row(self):
+        """
+        Returns the highest r of any bubble, or None if the map is empty.
+
+        :return: int
+        """
+        if not self.count:
             return None
 
+        rows = numpy.frombuffer(self._r, dtype=numpy.intc)
+
+        return int(rows[self.occupied_ids()].max())
+
     def get_present_types(self):
         """
-        Returns a list of unique Bubble types currently present in map.
+        Returns a list of unique Bubble types currently present in map, in ALL_TYPEPROPERTIES order so the result
+        doesn't depend on the order bubbles were added in.
+
+        :return: List
+        """
+        types = numpy.frombuffer(self.types, dtype=numpy.uint8)[self.occupied_ids()]
+        present = numpy.flatnonzero(numpy.bincount(types, minlength=len(ALL_TYPEPROPERTIES)))
+
+        return [ALL_TYPEPROPERTIES[i] for i in present.tolist()]
+
+    def match_group(self, address):
+        """
+        Returns the ids of the bubbles connected to the one at address through bubbles of its type, itself
+        included.
 
+        :type address: tuple
         :return: List
         """
-        result = list()
+        start = self._cell_id(address)
+        type_id = self.types[start]
+        occupied, types = self.occupied, self.types
+        neighbor_ids = self.hexmap.neighbor_ids
+        group = [start]
+        seen = {start}
+
+        for cell_id in group:
+            for nbr in neighbor_ids(cell_id):
+                if nbr not in seen and occupied[nbr] and types[nbr] == type_id:
+                    seen.add(nbr)
+                    group.append(nbr)
+
+        return group
+
+    def unsupported(self, ceiling_row):
+        """
+        Returns the ids of the bubbles not connected to any bubble in the ceiling row, in id order.
+
+        :type ceiling_row: int
+        :return: List
+        """
+        ids = self.occupied_ids()
+        rows = numpy.frombuffer(self._r, dtype=numpy.intc)[ids]
+        stack = ids[rows == ceiling_row].tolist()
+        occupied = self.occupied
+        neighbor_ids = self.hexmap.neighbor_ids
+        connected = set(stack)
+
+        while stack:
+            for nbr in neighbor_ids(stack.pop()):
+                if occupied[nbr] and nbr not in connected:
+                    connected.add(nbr)
+                    stack.append(nbr)
+
+        return [cell_id for cell_id in ids.tolist() if cell_id not in connected]
+
+    def touching(self, pixel_pos, reach):
+        """
+        Returns True if a bubble's center is closer than reach to pixel_pos.  Only the cells around pixel_pos are
+        checked, so reach must not be more than a cell across.
+
+        :type pixel_pos: Tuple(int, int)
+        :param reach: Sum of the radii of the two bubbles.
+        :type reach: float
+        :return: bool
+        """
+        hexmap = self.hexmap
+        occupied = self.occupied
+        x, y = pixel_pos
+        reach *= reach
+
+        for cell_id in hexmap.hex_range(hexmap.get_celladdressbypixel(pixel_pos), 1):
+            if cell_id < len(occupied) and occupied[cell_id]:
+                cx, cy = hexmap.cells[cell_id].pixel_pos
+
+                if (cx - x) ** 2 + (cy - y) ** 2 < reach:
+                    return True
+
+        return False
+
+    def release_rows(self, rows):
+        """
+        Drops the snapshot bookkeeping of rows that are gone from the board for good, e.g. rows an endless board
+        scrolled past.  The rows must not hold any Bubbles.
+
+        :type rows: Iterable
+        :return: None
+        """
+        for r in rows:
+            self._dirty_rows.discard(r)
+            self._row_cache.pop(r, None)
+
+    def snapshot(self):
+        """
+        Returns a compact, immutable snapshot of the map contents: a tuple of (r, row bytes) pairs, with five bytes
+        per occupied cell.  Only rows changed since the last snapshot are re-encoded, the rest are the very same
+        bytes objects, so consecutive snapshots share most of their memory.
+
+        :return: Tuple
+        """
+        if self._dirty_rows:
+            rows = {r: [] for r in self._dirty_rows}
+
+            for cell_id in self.occupied_ids().tolist():
+                r = self._r[cell_id]
+
+                if r in rows:
+                    rows[r].append(_SNAPSHOT_CELL.pack(self._q[cell_id], self.types[cell_id]))
+
+            for r, cells in rows.items():
+                if cells:
+                    self._row_cache[r] = b''.join(sorted(cells))
+
+                else:
+                    self._row_cache.pop(r, None)
+
+            self._dirty_rows.clear()
+
+        return tuple(sorted(self._row_cache.items()))
+
+    def restore(self, snapshot, make_bubble):
+        """
+        Restores the map contents from a snapshot.  Only rows that differ from the current contents are touched,
+        and within those only the cells that changed.
+
+        :param snapshot: Value returned by snapshot().
+        :type snapshot: Tuple
+        :param make_bubble: Callable taking (address, type_property) and returning a new Bubble for that cell.
+        :return: None
+        """
+        current = dict(self.snapshot())
+        target = dict(snapshot)
+
+        for r in set(current) | set(target):
+            old_row = current.get(r, b'')
+            new_row = target.get(r, b'')
+
+            if old_row is new_row or old_row == new_row:
+                continue
+
+            old_cells = dict(_SNAPSHOT_CELL.iter_unpack(old_row))
+            new_cells = dict(_SNAPSHOT_CELL.iter_unpack(new_row))
+
+            for q, type_id in old_cells.items():
+                if new_cells.get(q) != type_id:
+                    view = self.pop((q, r))
+
+                    if view is not None:
+                        view.kill()
 
-        for item in self.sprite_dict_by_address.values():
-            if item.type_property not in result:
-                result.append(item.type_property)
+            for q, type_id in new_cells.items():
+                if old_cells.get(q) != type_id:
+                    self.add(make_bubble((q, r), ALL_TYPEPROPERTIES[type_id]))
 
-        return result
+        # the restored rows are exactly the snapshot's, keep sharing its bytes
+        self.snapshot()
+        self._row_cache = target
@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+import pygame
+
+__all__ = ["FrameCapture", "CAPTURE_FORMATS", "encode_png"]
+
+# image sequence formats go through pygame.image.save, raw appends the pixels of every frame to one file
+CAPTURE_FORMATS = ('png', 'bmp', 'tga', 'raw')
+
+
+class FrameCapture:
+
+    def __init__(self, path, surface, fmt='png', pool_size=8, fps=None):
+        """
+        Records frames without blocking the game loop.  capture() copies the display into one of a fixed pool of
+        Surfaces and hands it to a writer thread, which encodes and writes it and puts the Surface back into the
+        pool.  When the writer falls behind and the pool runs dry, frames are dropped and counted, so memory
+        never grows past the pool.
+
+        Image sequences are written to the path directory as frame_<number>.<fmt>, numbered by capture() call,
+        so dropped frames show up as gaps.  The raw format appends the pixels of every frame to the path file,
+        in the display's own pixel format; <path>.json describes the layout.
+
+        :param path: Output directory for image sequences, output file for raw.
+        :type path: str
+        :param surface: The display Surface, pool Surfaces use its size and pixel format.
+        :type surface: pygame.Surface
+        :param fmt: One of CAPTURE_FORMATS.
+        :type fmt: str
+        :param pool_size: Number of frame buffers, the most frames that can wait for the writer.
+        :type pool_size: int
+        :param fps: Frame rate stored in the raw layout.
+        :type fps: int
+        """
+        if fmt not in CAPTURE_FORMATS:
+            raise ValueError('Unknown capture format {0!r}, expected one of {1}.'.format(fmt, CAPTURE_FORMATS))
+
+        if pool_size < 1:
+            raise ValueError('pool_size must be at least 1.')
+
+        self.path = path
+        self.fmt = fmt
+        self.size = surface.get_size()
+
+        # counters
+        self.frames = 0  # capture() calls
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.copy_ms = 0.0  # time spent on the game thread
+        self.write_ms = 0.0  # time spent on the writer thread
+        self.error = None
+
+        # every buffer is either in _free, in _pending or with the writer
+        self._free = queue.Queue()
+        self._pending = queue.Queue()
+
+        for _ in range(pool_size):
+            self._free.put(pygame.Surface(self.size, 0, surface))
+
+        self._fp = None
+
+        if fmt == 'raw':
+            self._fp = open(path, 'wb')
+            self._write_layout(surface, fps)
+
+        else:
+            os.makedirs(path, exist_ok=True)
+
+        self._writer = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self._writer.start()
+
+    def _write_layout(self, surface, fps):
+        # enough to feed the raw stream to a video encoder
+        with open(self.path + '.json', 'w') as fp:
+            json.dump({
+                'width': self.size[0],
+                'height': self.size[1],
+                'pitch': surface.get_pitch(),
+                'bytesize': surface.get_bytesize(),
+                'masks': list(surface.get_masks()),
+                'fps': fps,
+            }, fp, indent=2)
+
+    def capture(self, surface):
+        """
+        Queues a copy of surface for writing.  Never waits: if no buffer is free the frame is dropped.  Returns
+        False for dropped frames.
+
+        :type surface: pygame.Surface
+        :return: bool
+        """
+        number = self.frames
+        self.frames += 1
+
+        try:
+            buf = self._free.get_nowait()
+
+        except queue.Empty:
+            self.dropped += 1
+            return False
+
+        start = time.perf_counter()
+        buf.blit(surface, (0, 0))
+        self.copy_ms += (time.perf_counter() - start) * 1000
+
+        self._pending.put((number, buf))
+
+        return True
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+
+            if item is None:
+                return
+
+            number, buf = item
+            start = time.perf_counter()
+
+            try:
+                if self.error is None:
+                    self._write(number, buf)
+                    self.written += 1
+
+            except (OSError, pygame.error) as exc:
+                # keep draining, so capture() drops frames instead of the game stalling on a full pool
+                self.error = exc
+
+            self.write_ms += (time.perf_counter() - start) * 1000
+            self._free.put(buf)
+
+    def _write(self, number, buf):
+        if self._fp:
+            view = buf.get_buffer()
+            self._fp.write(view)
+            self.bytes_written += view.length
+
+        else:
+            path = os.path.join(self.path, 'frame_{0:06d}.{1}'.format(number, self.fmt))
+
+            if self.fmt == 'png':
+                # pygame.image.save holds the GIL for the whole encode, zlib lets the game thread run meanwhile
+                data = encode_png(buf)
+
+                with open(path, 'wb') as fp:
+                    fp.write(data)
+
+            else:
+                pygame.image.save(buf, path)
+
+            self.bytes_written += os.path.getsize(path)
+
+    def close(self):
+        """
+        Waits for the writer to finish the queued frames and closes the output.
+
+        :return: None
+        """
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+
+        if self._fp:
+            self._fp.close()
+            self._fp = None
+
+    def report(self):
+        """
+        Returns the counters as text.
+
+        :return: str
+        """
+        text = '{0} frames, {1} written, {2} dropped, {3:.1f} MiB, {4:.3f} ms copy / {5:.2f} ms write per frame'
+        text = text.format(
+            self.frames, self.written, self.dropped, self.bytes_written / 2 ** 20,
+            self.copy_ms / max(self.frames - self.dropped, 1), self.write_ms / max(self.written, 1)
+        )
+
+        if self.error is not None:
+            text += ', stopped writing: {0}'.format(self.error)
+
+        return text
+
+
+def encode_png(surface, level=1):
+    """
+    Encodes a Surface as an RGB PNG.  The compression runs in zlib, which releases the GIL, so a writer thread
+    encoding frames barely slows the game thread down.
+
+    :type surface: pygame.Surface
+    :param level: zlib compression level, low levels are much faster and only a bit bigger.
+    :type level: int
+    :return: bytes
+    """
+    width, height = surface.get_size()
+    pixels = pygame.image.tostring(surface, 'RGB')
+    stride = width * 3
+
+    # every row starts with its filter type, 0 is none
+    rows = b''.join(b'\x00' + pixels[y:y + stride] for y in range(0, height * stride, stride))
+
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(rows, level)),
+        _png_chunk(b'IEND', b''),
+    ))
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
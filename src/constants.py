@@ -1,44 +1,101 @@
 import os
-from src.settings import Settings
+from src.settings import get_settings
 
 __all__ = [
     "DISP_SIZE", "PFLD_SIZE", "CELL_SIZE", "DISP_FSCR", "BGM_PATH", "SFX_PATH", "BGI_PATH", "SPR_PATH",
     "BGM_ENABLED", "SFX_ENABLED", "SFX_VOLUME", "BGM_VOLUME", "INPUT_DEV", "MV_UP", "MV_LEFT", "MV_DOWN",
-    "MV_RIGHT", "ACCEPT", "CANCEL", "config", "DEBUG", "ALL_TYPEPROPERTIES"
+    "MV_RIGHT", "ACCEPT", "CANCEL", "config", "DEBUG", "ALL_TYPEPROPERTIES", "INPUT_ROTATE_LEFT",
+    "INPUT_ROTATE_RIGHT", "INPUT_FIRE", "TARGET_FPS", "FRAME_BUDGET_MS", "EFFECT_LEVEL", "ADAPTIVE_QUALITY",
+    "COMPOSITING", "CACHE_PATH", "GC_FREEZE", "GC_THRESHOLDS", "TYPE_IDS", "RENDER_THREADS"
     ]
 
 ## GROK THE CONFIG FILE ##
-config = Settings(os.path.join(os.curdir, 'config.ini'))  # config file location hardcoding is intentional
-
-## DISPLAY ##
-DISP_SIZE = (config['VIDEO'].getint('display_width'), config['VIDEO'].getint('display_height'))
-PFLD_SIZE = (DISP_SIZE[0] * 0.65, DISP_SIZE[1] * 0.98)  # 65% scr width, 85% scr height
-CELL_SIZE = (PFLD_SIZE[0] / 23, PFLD_SIZE[0] / 23)  # Fit 15 bubbles across
-DISP_FSCR = config['VIDEO'].getboolean('fullscreen')
-
-## AUDIO ##
-BGM_ENABLED = config['AUDIO'].getboolean('bgm_enabled')
-SFX_ENABLED = config['AUDIO'].getboolean('sfx_enabled')
-BGM_VOLUME = config['AUDIO'].getint('bgm_volume') / 100
-SFX_VOLUME = config['AUDIO'].getint('sfx_volume') / 100
-
-## INPUT ##
-INPUT_DEV = config['INPUT']['inputdevice']
-MV_UP = config['INPUT']['moveup']
-MV_LEFT = config['INPUT']['moveleft']
-MV_DOWN = config['INPUT']['movedown']
-MV_RIGHT = config['INPUT']['moveright']
-ACCEPT = config['INPUT']['accept']
-CANCEL = config['INPUT']['cancel']
+# config.ini is only read when the first config backed name below is used, so importing src modules doesn't
+# need a config file.  access them as attributes, e.g. constants.DISP_SIZE, to keep them deferred; importing one
+# by name reads the config right there.
+_CONFIG_VALUES = {
+    ## DISPLAY ##
+    'DISP_SIZE': lambda cfg: (cfg['VIDEO'].getint('display_width'), cfg['VIDEO'].getint('display_height')),
+    # 65% scr width, 85% scr height
+    'PFLD_SIZE': lambda cfg: (_resolve('DISP_SIZE')[0] * 0.65, _resolve('DISP_SIZE')[1] * 0.98),
+    # Fit 15 bubbles across
+    'CELL_SIZE': lambda cfg: (_resolve('PFLD_SIZE')[0] / 23, _resolve('PFLD_SIZE')[0] / 23),
+    'DISP_FSCR': lambda cfg: cfg['VIDEO'].getboolean('fullscreen'),
+
+    ## AUDIO ##
+    'BGM_ENABLED': lambda cfg: cfg['AUDIO'].getboolean('bgm_enabled'),
+    'SFX_ENABLED': lambda cfg: cfg['AUDIO'].getboolean('sfx_enabled'),
+    'BGM_VOLUME': lambda cfg: cfg['AUDIO'].getint('bgm_volume') / 100,
+    'SFX_VOLUME': lambda cfg: cfg['AUDIO'].getint('sfx_volume') / 100,
+
+    ## PERFORMANCE ##
+    # fallbacks keep config files from before this section working
+    'TARGET_FPS': lambda cfg: cfg.getint('PERFORMANCE', 'target_fps', fallback=60),
+    'FRAME_BUDGET_MS': lambda cfg: cfg.getfloat('PERFORMANCE', 'frame_budget_ms',
+                                                fallback=1000 / _resolve('TARGET_FPS')),
+    'EFFECT_LEVEL': lambda cfg: cfg.getint('PERFORMANCE', 'effect_level', fallback=3),  # highest quality level, 0-3
+    'ADAPTIVE_QUALITY': lambda cfg: cfg.getboolean('PERFORMANCE', 'adaptive_quality', fallback=True),
+    'COMPOSITING': lambda cfg: cfg.get('PERFORMANCE', 'compositing', fallback='opaque').lower(),  # opaque or alpha
+    'GC_FREEZE': lambda cfg: cfg.getboolean('PERFORMANCE', 'gc_freeze', fallback=True),  # freeze after load_map
+    'GC_THRESHOLDS': lambda cfg: cfg.get('PERFORMANCE', 'gc_thresholds', fallback=''),  # e.g. 10000, 20, 20
+    'RENDER_THREADS': lambda cfg: cfg.getint('PERFORMANCE', 'render_threads', fallback=0),  # 0 draws on one thread
+
+    ## INPUT ##
+    'INPUT_DEV': lambda cfg: cfg['INPUT']['inputdevice'],
+    'MV_UP': lambda cfg: cfg['INPUT']['moveup'],
+    'MV_LEFT': lambda cfg: cfg['INPUT']['moveleft'],
+    'MV_DOWN': lambda cfg: cfg['INPUT']['movedown'],
+    'MV_RIGHT': lambda cfg: cfg['INPUT']['moveright'],
+    'ACCEPT': lambda cfg: cfg['INPUT']['accept'],
+    'CANCEL': lambda cfg: cfg['INPUT']['cancel'],
+}
+
+
+def __getattr__(name):
+    # only called for names not set yet; the value is stored as a module global, so this runs once per name
+    if name == 'config':
+        value = get_settings()
+
+    elif name in _CONFIG_VALUES:
+        value = _CONFIG_VALUES[name](_resolve('config'))
+
+    else:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+    globals()[name] = value
+
+    return value
+
+
+def _resolve(name):
+    # module level lookups of a deferred name don't go through __getattr__
+    try:
+        return globals()[name]
+
+    except KeyError:
+        return __getattr__(name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_CONFIG_VALUES) | {'config'})
+
+
+# per-tick input flags, this is everything the simulation needs to know about player input
+INPUT_ROTATE_LEFT = 0x01
+INPUT_ROTATE_RIGHT = 0x02
+INPUT_FIRE = 0x04
 
 ## PATHS ##
 BGM_PATH = os.path.join(os.curdir, 'resource', 'audio', 'bgm')
 SFX_PATH = os.path.join(os.curdir, 'resource', 'audio', 'sfx')
 BGI_PATH = os.path.join(os.curdir, 'resource', 'image', 'bkg')
 SPR_PATH = os.path.join(os.curdir, 'resource', 'image', 'sprites')
+CACHE_PATH = os.path.join(os.curdir, 'cache', 'sprites')  # generated, safe to delete
 
 ## GAME PROPERTIES ##
 ALL_TYPEPROPERTIES = ('RED', 'ORANGE', 'YELLOW', 'GREEN', 'BLUE', 'VIOLET', 'GRAY', 'WHITE')
+# bubble types interned to small ints, the board stores these instead of the names
+TYPE_IDS = {name: i for i, name in enumerate(ALL_TYPEPROPERTIES)}
 
 ## DEBUG MODE ##
 DEBUG = False
\ No newline at end of file
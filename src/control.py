@@ -0,0 +1,209 @@
+import collections
+import pygame
+from src import constants
+from src.constants import INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT, INPUT_FIRE
+
+__all__ = ["InputEvent", "InputHandler", "LatencyMeter", "resolve_key"]
+
+InputEvent = collections.namedtuple("InputEvent", ["time", "action", "pressed"])
+
+# actions bindings map to, and the tick flags held or pressed actions produce
+ACTION_LEFT = 'left'
+ACTION_RIGHT = 'right'
+ACTION_ACCEPT = 'accept'
+ACTION_CANCEL = 'cancel'
+
+# the only events the game reacts to; everything else is kept off the queue
+ALLOWED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.ACTIVEEVENT)
+
+
+def resolve_key(name):
+    """
+    Returns the pygame key code for a key name as written in config.ini, e.g. 'A', 'SPACE' or 'ESCAPE'.
+
+    :type name: str
+    :return: int
+    """
+    name = name.strip()
+
+    # pygame 2 knows the SDL key names, pygame 1.9 only the K_* constants
+    if hasattr(pygame.key, 'key_code'):
+        try:
+            return pygame.key.key_code(name.lower())
+
+        except ValueError:
+            pass
+
+    for attr in ('K_' + name, 'K_' + name.lower(), 'K_' + name.upper()):
+        if hasattr(pygame, attr):
+            return getattr(pygame, attr)
+
+    raise ValueError('Unknown key name {0!r} in the INPUT config section.'.format(name))
+
+
+class LatencyMeter:
+
+    def __init__(self, history=600):
+        """
+        Measures input-to-display latency: the time from an input being read to the display update showing its
+        effect.  Inputs are timestamped when poll() takes them off the event queue, not when they arrived: pygame
+        events carry no arrival time, so the time an input waited in the SDL queue before the poll and the OS side
+        of the latency are not included.
+
+        :param history: Number of recent samples kept for the statistics.
+        :type history: int
+        """
+        self.samples = collections.deque(maxlen=history)
+        self.total = 0
+        self._pending = list()
+
+    def input_applied(self, timestamp):
+        """
+        Notes that an input read at timestamp took effect in the frame being built.
+
+        :type timestamp: int
+        :return: None
+        """
+        self._pending.append(timestamp)
+
+    def frame_presented(self, now=None):
+        """
+        Call right after the display update; closes the samples of every input applied in this frame.
+
+        :param now: Time of the display update in ms, defaults to pygame.time.get_ticks().
+        :type now: int
+        :return: None
+        """
+        if not self._pending:
+            return
+
+        now = pygame.time.get_ticks() if now is None else now
+        self.samples.extend(now - ts for ts in self._pending)
+        self.total += len(self._pending)
+        self._pending.clear()
+
+    def report(self):
+        """
+        Returns a dict with the sample count, mean, 95th percentile and max latency in ms.
+
+        :return: dict
+        """
+        if not self.samples:
+            return {'count': 0, 'mean': 0.0, 'p95': 0, 'max': 0}
+
+        ordered = sorted(self.samples)
+
+        return {
+            'count': self.total,
+            'mean': sum(ordered) / len(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'max': ordered[-1]
+        }
+
+
+class InputHandler:
+
+    def __init__(self, bindings=None):
+        """
+        Reads keyboard input through the event queue and turns it into per-tick INPUT_* flags.  Key state is
+        tracked from KEYDOWN/KEYUP events, so a tap that starts and ends between two frames still counts for the
+        tick it happened in.
+
+        :param bindings: Dict of action to key name, defaults to the INPUT section of config.ini.
+        :type bindings: dict
+        """
+        if bindings is None:
+            bindings = {
+                ACTION_LEFT: constants.MV_LEFT,
+                ACTION_RIGHT: constants.MV_RIGHT,
+                ACTION_ACCEPT: constants.ACCEPT,
+                ACTION_CANCEL: constants.CANCEL
+            }
+
+        self.bindings = {resolve_key(name): action for action, name in bindings.items()}
+        self.events = collections.deque()
+        self.held = set()
+        self.quit_requested = False
+        self.latency = LatencyMeter()
+
+    def install(self):
+        """
+        Restricts the pygame event queue to the events this handler uses.
+
+        :return: None
+        """
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(ALLOWED_EVENTS))
+
+    def poll(self):
+        """
+        Drains the event queue, timestamping every bound key event with the time of this poll.  Everything drained
+        in one poll gets the same time, see LatencyMeter.
+
+        :return: None
+        """
+        now = pygame.time.get_ticks()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit_requested = True
+
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                action = self.bindings.get(event.key)
+
+                if action:
+                    self.events.append(InputEvent(now, action, event.type == pygame.KEYDOWN))
+
+            elif event.type == pygame.ACTIVEEVENT and not event.gain and event.state & pygame.APPINPUTFOCUS:
+                # key releases are lost while unfocused, don't leave keys stuck down.  the mouse merely leaving the
+                # window (APPMOUSEFOCUS) doesn't take the keyboard away
+                self.events.append(InputEvent(now, None, False))
+
+    def tick_flags(self):
+        """
+        Applies every queued input and returns the INPUT_* flags for the tick.  The game polls right before each
+        tick, so everything queued belongs to it.
+
+        :return: int
+        """
+        tapped = set()
+
+        while self.events:
+            event = self.events.popleft()
+
+            if event.action is None:
+                self.held.clear()
+
+            elif event.pressed:
+                self.held.add(event.action)
+                tapped.add(event.action)
+                self.latency.input_applied(event.time)
+
+                if event.action == ACTION_CANCEL:
+                    self.quit_requested = True
+
+            else:
+                self.held.discard(event.action)
+
+        active = self.held | tapped
+        flags = 0
+
+        if ACTION_LEFT in active:
+            flags |= INPUT_ROTATE_LEFT
+
+        elif ACTION_RIGHT in active:
+            flags |= INPUT_ROTATE_RIGHT
+
+        # firing only happens on the press, not while held
+        if ACTION_ACCEPT in tapped:
+            flags |= INPUT_FIRE
+
+        return flags
+
+    def frame_presented(self):
+        """
+        Call right after the display update, see LatencyMeter.frame_presented.
+
+        :return: None
+        """
+        self.latency.frame_presented()
@@ -0,0 +1,255 @@
+import json
+import random
+from src.playfield import Playfield
+from src.hexamaplib.chunked_map import ChunkedHexMap
+from src.constants import ALL_TYPEPROPERTIES, DEBUG
+
+__all__ = ["RandomChunkSource", "StreamChunkSource", "EndlessPlayfield"]
+
+
+class RandomChunkSource:
+
+    def __init__(self, seed=None, colors=5, cluster=0.55):
+        """
+        Generates endless chunks of full rows.  Every cell gets a bubble, so every chunk holds on to the one below
+        it, and colors are grown in clusters by copying a neighbor's color now and then.
+
+        :param seed: Seed for the generator, chunks come out the same for the same seed.
+        :type seed: int
+        :param colors: Number of bubble types used, taken from the front of ALL_TYPEPROPERTIES.
+        :type colors: int
+        :param cluster: Chance that a cell copies the color of the cell left of or above it.
+        :type cluster: float
+        """
+        if not 1 <= colors <= len(ALL_TYPEPROPERTIES):
+            raise ValueError('colors must be between 1 and {0}.'.format(len(ALL_TYPEPROPERTIES)))
+
+        self.palette = ALL_TYPEPROPERTIES[:colors]
+        self.cluster = cluster
+        self._rng = random.Random(seed)
+
+    def read_chunk(self, columns):
+        """
+        Returns the next chunk.
+
+        :param columns: Number of cells of every row of the chunk, top to bottom.
+        :type columns: List
+        :return: dict of (column, row) -> type_property, or None if there are no more chunks
+        """
+        rng = self._rng
+        chunk = dict()
+
+        for row, count in enumerate(columns):
+            for col in range(count):
+                near = [chunk[cell] for cell in ((col - 1, row), (col, row - 1)) if cell in chunk]
+
+                if near and rng.random() < self.cluster:
+                    chunk[(col, row)] = rng.choice(near)
+
+                else:
+                    chunk[(col, row)] = rng.choice(self.palette)
+
+        return chunk
+
+
+class StreamChunkSource:
+
+    def __init__(self, stream):
+        """
+        Reads endless chunks from a stream of JSON lines, one chunk per line, in the order they enter the board.
+        A line holds a map like the level files do, with "column, row" keys counted from the top left of the
+        chunk, e.g. {"map": {"0, 0": "RED", "1, 0": "BLUE"}}.  Cells outside the chunk are ignored.
+
+        :param stream: Text file object, or any iterable of lines.
+        """
+        self._lines = iter(stream)
+
+    def read_chunk(self, columns):
+        """
+        Returns the next chunk.
+
+        :param columns: Number of cells of every row of the chunk, top to bottom.
+        :type columns: List
+        :return: dict of (column, row) -> type_property, or None if the stream ended
+        """
+        for line in self._lines:
+            line = line.strip()
+
+            if not line:
+                continue
+
+            chunk = dict()
+
+            for key, type_property in json.loads(line)['map'].items():
+                col, row = (int(value) for value in key.split(','))
+
+                if 0 <= row < len(columns) and 0 <= col < columns[row]:
+                    chunk[(col, row)] = type_property
+
+            return chunk
+
+        return None
+
+
+class EndlessPlayfield(Playfield):
+
+    def __init__(self, source, surface_size, cell_size, seed=None, chunk_rows=8, start_chunks=1,
+                 descent_interval=600, preload_chunks=1):
+        """
+        Endless mode playfield.  The board is a ChunkedHexMap that scrolls down one row every descent_interval
+        ticks; chunks scrolling into view are filled from source, and chunks that have scrolled past both the loss
+        line and the bottom of the surface are released, so memory stays bounded however long the game goes.  The
+        game is lost once a bubble sits on or below the loss line, the row just above the shooter.
+
+        :param source: Chunk source, see RandomChunkSource and StreamChunkSource.
+        :param surface_size: Size of the playfield surface.
+        :type surface_size: Tuple(int, int)
+        :param cell_size: Size to use for HexMap cell size
+        :type cell_size: Tuple(int, int)
+        :param seed: Seed for every RNG used by the playfield.
+        :type seed: int
+        :param chunk_rows: Number of rows per chunk.
+        :type chunk_rows: int
+        :param start_chunks: Number of chunks filled from the top of the surface down when the game starts.
+        :type start_chunks: int
+        :param descent_interval: Ticks between descents, 0 to only descend when descend() is called.
+        :type descent_interval: int
+        :param preload_chunks: Chunks loaded above the surface ahead of time.
+        :type preload_chunks: int
+        """
+        self.source = source
+        self.surface_size = (int(surface_size[0]), int(surface_size[1]))
+        self.chunk_rows = chunk_rows
+        self.descent_interval = descent_interval
+        self.preload_chunks = preload_chunks
+
+        self._descent_timer = None
+        self.loss_offset = None  # rows from the top of the surface to the loss line
+        self.game_over = False
+        self.source_exhausted = False
+
+        # chunks are filled bottom up: the starting chunks first, then each one above as it comes into view
+        self._next_content_chunk = start_chunks - 1
+
+        super().__init__(source, cell_size, seed)
+
+    @property
+    def loss_row(self):
+        """
+        World row of the loss line.
+
+        :return: int
+        """
+        return self.hexmap.top_row + self.loss_offset
+
+    def chunk_of_loss_line(self):
+        """
+        Returns the index of the chunk the loss line is in.
+
+        :return: int
+        """
+        return self.hexmap.chunk_of(self.loss_row)
+
+    def load_map(self, source):
+        self.source = source
+        self._reset_board(self.surface_size, ChunkedHexMap(self.surface_size, self.cell_size, self.chunk_rows))
+
+        row_height = self.hexmap.row_height
+        self.loss_offset = max(1, int((self.shooter.rect.top - 2 * self.cell_size[1]) // row_height) + 1)
+        self.ceiling_row = self.hexmap.top_row
+
+        self.stream_chunks()
+
+        if self.aim_guide:
+            self.aim_guide.rebuild()
+
+        # the scheduler was just cleared with the old board
+        if self.descent_interval:
+            self._descent_timer = self.scheduler.every(self.descent_interval, self.descend)
+
+    def apply_input(self, flags):
+        if not self.game_over:
+            super().apply_input(flags)
+
+    def update(self):
+        super().update()
+
+        if not self.game_over and self.bubble_map.count:
+            # a bubble settling on the loss line ends the game too
+            self.game_over = self.bubble_map.lowest_row() >= self.loss_row
+
+        if self.game_over and self._descent_timer:
+            self._descent_timer.cancel()
+            self._descent_timer = None
+
+    def descend(self, rows=1):
+        """
+        Scrolls the board down, streaming in the chunks that come into view and releasing those that scrolled
+        out of it.
+
+        :type rows: int
+        :return: None
+        """
+        self.hexmap.descend(rows)
+
+        for spr in self.bubble_map.sprites():
+            spr.set_position(spr.grid_address, self.hexmap.board[spr.grid_address].get_pixelpos())
+
+        self.stream_chunks()
+        self.board_layer = None
+
+        # every cell moved, so every path did
+        if self.aim_guide:
+            self.aim_guide.invalidate()
+
+        if DEBUG:
+            self.paint_debug()
+
+    def stream_chunks(self):
+        """
+        Loads and fills every chunk in view or within preload_chunks above it, and releases chunks below both the
+        loss line and the surface.
+
+        :return: None
+        """
+        hexmap = self.hexmap
+        visible = hexmap.visible_chunks()
+
+        # bottom up, so content is read from the source in board order
+        for chunk in range(visible[-1], visible[0] - self.preload_chunks - 1, -1):
+            hexmap.load_chunk(chunk)
+
+            if chunk == self._next_content_chunk and not self.source_exhausted:
+                self._fill_chunk(chunk)
+                self._next_content_chunk -= 1
+
+        # the rows between the loss line and the bottom of the surface stay, a bubble may still settle there
+        below = max(self.chunk_of_loss_line(), visible[-1])
+
+        for chunk in [c for c in hexmap.chunks if c > below]:
+            for addr in hexmap.chunks[chunk]:
+                spr = self.bubble_map.pop(addr)
+
+                if spr:
+                    spr.kill()
+
+            self.bubble_map.release_rows(hexmap.chunk_rows_of(chunk))
+            hexmap.release_chunk(chunk)
+
+    def _fill_chunk(self, chunk):
+        rows = self.hexmap.chunk_rows_of(chunk)
+        content = self.source.read_chunk([len(self.hexmap.row_addresses(r)) for r in rows])
+
+        if content is None:
+            self.source_exhausted = True
+            return
+
+        for (col, row), type_property in content.items():
+            r = rows[row]
+            addr = (col - (r >> 1), r)
+
+            if addr in self.hexmap.board and not self.bubble_map.is_occupied(addr):
+                self.bubble_map.add(self._make_bubble(addr, type_property))
+
+        # bubbles hang from the top of the newest chunk
+        self.ceiling_row = rows[0]
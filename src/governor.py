@@ -0,0 +1,120 @@
+import collections
+from src import constants
+from src.constants import DEBUG
+
+__all__ = ["QualityLevel", "QUALITY_LEVELS", "QualityGovernor"]
+
+# Optional work, from cheapest to most expensive.  Everything not listed here is required for play and is never
+# shed.
+#   particles:           particle limit for popped/falling bubbles
+#   debug_overlay:       allow debug overlays (only if DEBUG is on at all)
+#   background_interval: redraw the full screen background every n frames, the playfield area is always redrawn
+#   dirty_rects:         only push changed screen areas to the display instead of the whole screen
+QualityLevel = collections.namedtuple(
+    "QualityLevel", ["particles", "debug_overlay", "background_interval", "dirty_rects"]
+)
+
+QUALITY_LEVELS = (
+    QualityLevel(32, False, 8, True),
+    QualityLevel(128, False, 4, True),
+    QualityLevel(256, True, 2, True),
+    QualityLevel(512, True, 1, False),
+)
+
+
+class QualityGovernor:
+
+    def __init__(self, frame_budget_ms=None, max_level=None, adaptive=None, smoothing=0.1, headroom=0.7,
+                 cooldown=30):
+        """
+        Measures frame time and steps optional work down when frames run over budget, and back up once there is
+        headroom again.  Frame times are smoothed, and after every change the governor waits a number of frames
+        before changing again so one slow frame doesn't make quality flicker.
+
+        :param frame_budget_ms: Time a frame may take, in milliseconds, defaults to FRAME_BUDGET_MS.
+        :type frame_budget_ms: float
+        :param max_level: Highest quality level allowed, an index into QUALITY_LEVELS, defaults to EFFECT_LEVEL.
+        :type max_level: int
+        :param adaptive: If False, the level stays fixed at max_level, defaults to ADAPTIVE_QUALITY.
+        :type adaptive: bool
+        :param smoothing: Weight of the newest frame in the moving average.
+        :type smoothing: float
+        :param headroom: Fraction of the budget the average must stay under before quality is raised.
+        :type headroom: float
+        :param cooldown: Frames to wait after a change before changing again.  Raising waits twice as long.
+        :type cooldown: int
+        """
+        if frame_budget_ms is None:
+            frame_budget_ms = constants.FRAME_BUDGET_MS
+
+        if max_level is None:
+            max_level = constants.EFFECT_LEVEL
+
+        if adaptive is None:
+            adaptive = constants.ADAPTIVE_QUALITY
+
+        self.frame_budget_ms = frame_budget_ms
+        self.max_level = max(0, min(max_level, len(QUALITY_LEVELS) - 1))
+        self.adaptive = adaptive
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.cooldown = cooldown
+
+        self.level = self.max_level
+        self.average_ms = 0.0
+        self.frame_count = 0
+        self._since_change = 0
+
+    @property
+    def quality(self):
+        """
+        Returns the current QualityLevel.
+
+        :return: QualityLevel
+        """
+        return QUALITY_LEVELS[self.level]
+
+    def frame(self, frame_time_ms):
+        """
+        Feeds the time the last frame took, not counting time spent waiting on the frame rate cap.  Returns True
+        if the quality level changed.
+
+        :type frame_time_ms: float
+        :return: bool
+        """
+        if self.frame_count:
+            self.average_ms += (frame_time_ms - self.average_ms) * self.smoothing
+
+        else:
+            self.average_ms = frame_time_ms
+
+        self.frame_count += 1
+        self._since_change += 1
+
+        if not self.adaptive or self._since_change < self.cooldown:
+            return False
+
+        if self.average_ms > self.frame_budget_ms and self.level > 0:
+            self.level -= 1
+
+        elif (self.average_ms < self.frame_budget_ms * self.headroom and self.level < self.max_level
+              and self._since_change >= self.cooldown * 2):
+            self.level += 1
+
+        else:
+            return False
+
+        self._since_change = 0
+
+        return True
+
+    def apply(self, playfield):
+        """
+        Pushes the playfield related parts of the current quality level to the playfield.
+
+        :type playfield: src.playfield.Playfield
+        :return: None
+        """
+        quality = self.quality
+        playfield.disloc_bubbles.limit = min(quality.particles, playfield.disloc_bubbles.capacity)
+        playfield.show_debug = playfield.shooter.show_debug = DEBUG and quality.debug_overlay
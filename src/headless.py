@@ -0,0 +1,18 @@
+import os
+import pygame
+
+__all__ = ["init_display"]
+
+
+def init_display():
+    """
+    Sets pygame up for tools, worker processes and tests that never show a window.  SDL gets the dummy video
+    driver unless one is configured, and a 1x1 display mode is set, because Surface.convert() needs a display
+    mode even when nothing is displayed.  Safe to call more than once.
+
+    :return: pygame.Surface, the display surface
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+
+    return pygame.display.set_mode((1, 1))
@@ -1 +1 @@
-__all__ = ["hex_map", "hex_cell"]
+__all__ = ["hex_map", "hex_cell", "hex_tables", "chunked_map"]
@@ -0,0 +1,196 @@
+from src.hexamaplib.hex_cell import HexCell
+from src.hexamaplib.hex_map import HexMap
+
+
+class _Origin:
+    """
+    Mutable stand-in for the HexMap origin Point.  Every cell's layout shares it, so scrolling the board is one
+    assignment instead of a new layout per cell.
+    """
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __getitem__(self, index):
+        return (self.x, self.y)[index]
+
+
+class ChunkedHexMap(HexMap):
+
+    def __init__(self, surface_size, cellsize, chunk_rows=8, hex_orientation='pointy'):
+        """
+        A HexMap over an endless column of rows.  Rows are grouped into chunks of chunk_rows rows, and only the
+        cells of loaded chunks exist, so memory depends on the number of loaded chunks rather than on how far the
+        board has scrolled.  Addresses are world addresses that never change; board, the indexes and all lookups
+        only see loaded cells and work the same across chunk boundaries.
+
+        Row 0 starts at the top of the surface, rows above it have negative r.  descend() scrolls the board down,
+        so the rows above come into view.
+
+        :param surface_size: Size of target Surface.
+        :type surface_size: Tuple
+        :param cellsize: Radii for hex cell size.
+        :type cellsize: Tuple
+        :param chunk_rows: Number of rows per chunk.
+        :type chunk_rows: int
+        :param hex_orientation: Orientation of individual hexagon cells, only 'pointy' rows can be chunked.
+        :type hex_orientation: str
+        """
+        if hex_orientation.lower() != 'pointy':
+            raise ValueError('ChunkedHexMap only supports the pointy hex orientation.')
+
+        if chunk_rows < 1:
+            raise ValueError('chunk_rows must be at least 1.')
+
+        self.chunk_rows = chunk_rows
+        self.chunks = dict()  # chunk index -> list of addresses
+        self._free_ids = list()
+
+        super().__init__(surface_size, cellsize, hex_orientation)
+
+        self.origin = _Origin(self.cellsize.x, self.cellsize.y)
+        self.layout = self.Layout(self.hex_orientation, self.cellsize, self.origin)
+        self.row_height = self.hex_orientation.f3 * self.cellsize.y
+
+        # world row at the top of the surface, and the number of rows that fit on it
+        self.top_row = 0
+        self.view_rows = max(1, int((self.surface_size[1] - 2 * self.cellsize.y) // self.row_height) + 1)
+
+        # column count per row parity, odd rows are shifted half a cell right
+        self._columns = [self._fit_columns(0), self._fit_columns(1)]
+
+        for chunk in self.visible_chunks():
+            self.load_chunk(chunk)
+
+    def populate_board(self):
+        # cells are created per chunk, see load_chunk()
+        return dict()
+
+    def _fit_columns(self, parity):
+        layout = self.Layout(self.hex_orientation, self.cellsize, self.cellsize)
+        count = 0
+
+        for col in range(self.cellcount.x):
+            cell = HexCell(self.Point(col - (parity >> 1), parity), layout)
+
+            if cell.pixel_pos.x + self.cellsize.x * 0.75 < self.surface_size[0]:
+                count += 1
+
+        return count
+
+    def chunk_of(self, r):
+        """
+        Returns the index of the chunk holding row r.
+
+        :type r: int
+        :return: int
+        """
+        return r // self.chunk_rows
+
+    def chunk_rows_of(self, chunk):
+        """
+        Returns the rows of a chunk, top to bottom.
+
+        :type chunk: int
+        :return: range
+        """
+        return range(chunk * self.chunk_rows, (chunk + 1) * self.chunk_rows)
+
+    def row_addresses(self, r):
+        """
+        Returns the axial addresses of row r, left to right, whether or not its chunk is loaded.
+
+        :type r: int
+        :return: List of tuple
+        """
+        offset = r >> 1
+
+        return [(col - offset, r) for col in range(self._columns[r & 1])]
+
+    def visible_chunks(self):
+        """
+        Returns the indexes of the chunks with at least one row on the surface.
+
+        :return: range
+        """
+        return range(self.chunk_of(self.top_row), self.chunk_of(self.top_row + self.view_rows - 1) + 1)
+
+    def load_chunk(self, chunk):
+        """
+        Creates the cells of a chunk.  Returns False if it was already loaded.
+
+        :type chunk: int
+        :return: bool
+        """
+        if chunk in self.chunks:
+            return False
+
+        addresses = list()
+
+        for r in self.chunk_rows_of(chunk):
+            for addr in self.row_addresses(r):
+                cell = HexCell(self.Point(*addr), self.layout)
+
+                if self._free_ids:
+                    cell_id = self._free_ids.pop()
+                    self.cells[cell_id] = cell
+
+                else:
+                    cell_id = len(self.cells)
+                    self.cells.append(cell)
+
+                self.board[addr] = cell
+                self.key_index[cell.key] = cell_id
+                self.cell_index[addr] = cell_id
+                addresses.append(addr)
+
+        self.chunks[chunk] = addresses
+        self._query_cache.clear()
+
+        return True
+
+    def release_chunk(self, chunk):
+        """
+        Drops the cells of a chunk.  Their ids are reused by chunks loaded later.  Returns False if it wasn't
+        loaded.
+
+        :type chunk: int
+        :return: bool
+        """
+        addresses = self.chunks.pop(chunk, None)
+
+        if addresses is None:
+            return False
+
+        for addr in addresses:
+            cell_id = self.cell_index.pop(addr)
+            del self.key_index[self.board.pop(addr).key]
+            self.cells[cell_id] = None
+            self._free_ids.append(cell_id)
+
+        self._query_cache.clear()
+
+        return True
+
+    def descend(self, rows=1):
+        """
+        Scrolls the board down by a number of rows, bringing the rows above into view.  The chunks coming into
+        view have to be loaded by the caller.  Returns the distance scrolled in pixels.
+
+        :type rows: int
+        :return: float
+        """
+        dy = rows * self.row_height
+        self.origin.y += dy
+        self.top_row -= rows
+
+        for cell in self.board.values():
+            cell.pixel_pos = cell.get_pixelpos()
+
+        return dy
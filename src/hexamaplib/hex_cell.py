@@ -2,6 +2,7 @@ import collections
 import math
 # import sys
 import pygame
+from src.hexamaplib.hex_tables import pack
 
 Point = collections.namedtuple("Point", ["x", "y"])
 CubeCoord = collections.namedtuple("Hex", ["q", "r", "s"])
@@ -34,6 +35,9 @@ class HexCell(object):
         else:
             raise ValueError("A Tuple with 2 (axial) or 3 (cube) elements is required for the coords parameter.")
 
+        # packed axial address, what HexMap indexes cells by
+        self.key = pack(self.axialpos[0], self.axialpos[1])
+
         self.layout = layout
         self.pixel_pos = self.__cube_to_pixel__(self.layout, self.cubepos)
 
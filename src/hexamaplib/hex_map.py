@@ -1,5 +1,7 @@
 import math, collections
+from array import array
 from src.hexamaplib.hex_cell import HexCell
+from src.hexamaplib import hex_tables
 
 
 # TODO: Implement a HexMap class, incorporate the below methods, and write the damn docstrings
@@ -77,6 +79,34 @@ class HexMap:
 
         self.board = self.populate_board()
 
+        # dense integer ids for the cells on the board, in board order.  key_index is what lookups go through,
+        # cell_index is the same by axial address tuple, for callers that have tuples anyway
+        self.cells = list(self.board.values())
+        self.key_index = {cell.key: cell_id for cell_id, cell in enumerate(self.cells)}
+        self.cell_index = {addr: cell_id for cell_id, addr in enumerate(self.board)}
+
+        # clipped range/ring/spiral results per (kind, radius), by center key.  the board never changes so these
+        # never go stale
+        self._query_cache = dict()
+
+    def get_cell_id(self, axial_addr):
+        """
+        Returns the dense integer id of the cell at the given axial address, or None if it is not on the board.
+
+        :type axial_addr: tuple
+        :return: int
+        """
+        return self.key_index.get(hex_tables.pack(axial_addr[0], axial_addr[1]))
+
+    def get_cell_by_id(self, cell_id):
+        """
+        Returns the HexCell with the given id.
+
+        :type cell_id: int
+        :return: HexCell
+        """
+        return self.cells[cell_id]
+
     def get_celladdressbypixel(self, pixel_coords):
         """
         Convert pixel coordinates to hex cube position.
@@ -164,12 +194,125 @@ class HexMap:
         return self.hex_add(cell, hex_directions[direction])
 
     def hex_allneighbors(self, cell):
-        cell_cube = self.CubeCoord(cell[0], cell[1], -cell[0] - cell[1])
-        result = []
+        """
+        Returns the axial addresses of the six neighbors of an axial address, on the board or not, in direction
+        order.
+
+        :type cell: tuple
+        :return: List of tuple
+        """
+        q, r = cell[0], cell[1]
+
+        return [(q + dq, r + dr) for dq, dr in hex_tables.AXIAL_DIRECTIONS]
+
+    def neighbor_ids(self, cell_id):
+        """
+        Returns the ids of the board cells next to a cell, in ring order.
+
+        :type cell_id: int
+        :return: array of cell ids
+        """
+        return self.hex_ring_key(self.cells[cell_id].key, 1)
+
+    def _offset_query(self, kind, offsets, key, radius):
+        cache = self._query_cache.get((kind, radius))
+
+        if cache is None:
+            cache = self._query_cache[(kind, radius)] = dict()
+
+        result = cache.get(key)
+
+        if result is None:
+            result = cache[key] = hex_tables.clip_keys(offsets(radius), key, self.key_index)
+
+        return result
+
+    def hex_range_key(self, key, radius):
+        """
+        Returns the ids of all board cells within radius steps of the center cell, in row order.
+
+        :param key: Packed key of the center cell.
+        :type key: int
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self._offset_query('range', hex_tables.range_key_offsets, key, radius)
+
+    def hex_ring_key(self, key, radius):
+        """
+        Returns the ids of the board cells exactly radius steps from the center cell, in ring order.
+
+        :param key: Packed key of the center cell.
+        :type key: int
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self._offset_query('ring', hex_tables.ring_key_offsets, key, radius)
+
+    def hex_spiral_key(self, key, radius):
+        """
+        Returns the ids of all board cells within radius steps of the center cell, center first and then ring by
+        ring outward.
+
+        :param key: Packed key of the center cell.
+        :type key: int
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self._offset_query('spiral', hex_tables.spiral_key_offsets, key, radius)
+
+    def hex_range(self, center, radius):
+        """
+        hex_range_key() by axial address.
+
+        :param center: Axial address.
+        :type center: tuple
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self.hex_range_key(hex_tables.pack(center[0], center[1]), radius)
+
+    def hex_ring(self, center, radius):
+        """
+        hex_ring_key() by axial address.
+
+        :param center: Axial address.
+        :type center: tuple
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self.hex_ring_key(hex_tables.pack(center[0], center[1]), radius)
+
+    def hex_spiral(self, center, radius):
+        """
+        hex_spiral_key() by axial address.
+
+        :param center: Axial address.
+        :type center: tuple
+        :type radius: int
+        :return: array of cell ids
+        """
+        return self.hex_spiral_key(hex_tables.pack(center[0], center[1]), radius)
+
+    def hex_within_distance(self, center, radius, cell_ids):
+        """
+        Returns the ids from cell_ids that are within radius steps of the center address.
+
+        :param center: Axial address.
+        :type center: tuple
+        :type radius: int
+        :param cell_ids: Iterable of cell ids.
+        :return: array of cell ids
+        """
+        q, r = center[0], center[1]
+        cells = self.cells
+        result = array('i')
+
+        for cid in cell_ids:
+            pos = cells[cid].axialpos
 
-        for i in range(6):
-            c = self.hex_neighbor(cell_cube, i)
-            result.append((c.q, c.r))
+            if hex_tables.axial_distance(pos[0] - q, pos[1] - r) <= radius:
+                result.append(cid)
 
         return result
 
@@ -0,0 +1,183 @@
+import functools
+from array import array
+
+# axial (q, r) offsets of the six neighbors, in the same order as HexMap.hex_direction
+AXIAL_DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+# packed coordinate keys hold an axial address in one int: q biased into the low KEY_BITS bits, r above them.
+# keys sort by (r, q), and adding key_offset(dq, dr) to a key moves it by (dq, dr), so neighbor and range lookups
+# are int additions instead of tuple building and hashing.  q must fit the field, r is unbounded.  the field is
+# as wide as the int32 q BubbleMap stores, endless boards drift q by one every two rows they scroll
+KEY_BITS = 32
+_KEY_BIAS = 1 << (KEY_BITS - 1)
+_KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def pack(q, r):
+    """
+    Returns the packed key of an axial address.
+
+    :type q: int
+    :type r: int
+    :return: int
+    """
+    return (r << KEY_BITS) + q + _KEY_BIAS
+
+
+def unpack(key):
+    """
+    Returns the axial address of a packed key.
+
+    :type key: int
+    :return: Tuple(int, int)
+    """
+    q = (key & _KEY_MASK) - _KEY_BIAS
+
+    return q, (key - q - _KEY_BIAS) >> KEY_BITS
+
+
+def key_offset(dq, dr):
+    """
+    Returns the packed form of an axial offset, to be added to keys.
+
+    :type dq: int
+    :type dr: int
+    :return: int
+    """
+    return (dr << KEY_BITS) + dq
+
+
+KEY_DIRECTIONS = tuple(key_offset(dq, dr) for dq, dr in AXIAL_DIRECTIONS)
+
+
+@functools.lru_cache(maxsize=None)
+def ring_offsets(radius):
+    """
+    Returns the axial offsets of the cells exactly radius steps from a center cell, walking the ring in
+    direction order.  Computed once per radius.
+
+    :type radius: int
+    :return: Tuple of (dq, dr)
+    """
+    if radius < 0:
+        raise ValueError('radius must not be negative.')
+
+    if radius == 0:
+        return ((0, 0),)
+
+    q, r = AXIAL_DIRECTIONS[4][0] * radius, AXIAL_DIRECTIONS[4][1] * radius
+    result = []
+
+    for dq, dr in AXIAL_DIRECTIONS:
+        for _ in range(radius):
+            result.append((q, r))
+            q, r = q + dq, r + dr
+
+    return tuple(result)
+
+
+@functools.lru_cache(maxsize=None)
+def spiral_offsets(radius):
+    """
+    Returns the axial offsets of every cell within radius steps, center first and then ring by ring outward.
+    Computed once per radius.
+
+    :type radius: int
+    :return: Tuple of (dq, dr)
+    """
+    if radius <= 0:
+        return ring_offsets(0)
+
+    return spiral_offsets(radius - 1) + ring_offsets(radius)
+
+
+@functools.lru_cache(maxsize=None)
+def range_offsets(radius):
+    """
+    Returns the axial offsets of every cell within radius steps, in row order (r, then q).  Computed once per
+    radius.
+
+    :type radius: int
+    :return: Tuple of (dq, dr)
+    """
+    return tuple(sorted(spiral_offsets(radius), key=lambda offset: (offset[1], offset[0])))
+
+
+@functools.lru_cache(maxsize=None)
+def ring_key_offsets(radius):
+    """
+    ring_offsets() as packed offsets.
+
+    :type radius: int
+    :return: Tuple of int
+    """
+    return tuple(key_offset(dq, dr) for dq, dr in ring_offsets(radius))
+
+
+@functools.lru_cache(maxsize=None)
+def spiral_key_offsets(radius):
+    """
+    spiral_offsets() as packed offsets.
+
+    :type radius: int
+    :return: Tuple of int
+    """
+    return tuple(key_offset(dq, dr) for dq, dr in spiral_offsets(radius))
+
+
+@functools.lru_cache(maxsize=None)
+def range_key_offsets(radius):
+    """
+    range_offsets() as packed offsets.
+
+    :type radius: int
+    :return: Tuple of int
+    """
+    return tuple(key_offset(dq, dr) for dq, dr in range_offsets(radius))
+
+
+def axial_distance(dq, dr):
+    """
+    Returns the hex distance covered by an axial offset.
+
+    :type dq: int
+    :type dr: int
+    :return: int
+    """
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+
+def clip_offsets(offsets, center, cell_index):
+    """
+    Applies offsets to a center address and returns the ids of the resulting cells that are on the board.
+
+    :param offsets: Tuple of (dq, dr), see ring_offsets, spiral_offsets and range_offsets.
+    :param center: Axial address of the center cell.
+    :type center: tuple
+    :param cell_index: Dict of axial address -> cell id, see HexMap.cell_index.
+    :type cell_index: dict
+    :return: array of cell ids
+    """
+    q, r = center[0], center[1]
+    get = cell_index.get
+    ids = (get((q + dq, r + dr)) for dq, dr in offsets)
+
+    return array('i', [cid for cid in ids if cid is not None])
+
+
+def clip_keys(key_offsets, key, key_index):
+    """
+    clip_offsets() for packed keys: applies packed offsets to a key and returns the ids of the resulting cells
+    that are on the board.
+
+    :param key_offsets: Tuple of packed offsets, see ring_key_offsets, spiral_key_offsets and range_key_offsets.
+    :param key: Packed key of the center cell.
+    :type key: int
+    :param key_index: Dict of packed key -> cell id, see HexMap.key_index.
+    :type key_index: dict
+    :return: array of cell ids
+    """
+    get = key_index.get
+    ids = (get(key + offset) for offset in key_offsets)
+
+    return array('i', [cid for cid in ids if cid is not None])
@@ -0,0 +1,57 @@
+import os
+import time
+
+__all__ = ["MapWatcher"]
+
+
+class MapWatcher:
+
+    def __init__(self, directory, interval=0.2):
+        """
+        Watches a directory of map files for changes by polling their modification times, which needs nothing
+        beyond os.stat and costs a single scandir per interval.
+
+        :param directory: Directory to watch, e.g. maps/.
+        :type directory: str
+        :param interval: Seconds between scans, poll() returns nothing in between.
+        :type interval: float
+        """
+        self.directory = directory
+        self.interval = interval
+        self._next_scan = 0.0
+        self._stamps = self._scan()
+
+    def _scan(self):
+        stamps = dict()
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        stamps[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+                except OSError:
+                    # an editor's temp or swap file that was removed mid-scan
+                    continue
+
+        return stamps
+
+    def poll(self):
+        """
+        Returns the paths of the files that were created or modified since the last scan.  Cheap to call every
+        frame.
+
+        :return: List of str
+        """
+        now = time.monotonic()
+
+        if now < self._next_scan:
+            return []
+
+        self._next_scan = now + self.interval
+        stamps = self._scan()
+        changed = [path for path, stamp in stamps.items() if self._stamps.get(path) != stamp]
+        self._stamps = stamps
+
+        return changed
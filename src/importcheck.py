@@ -0,0 +1,142 @@
+import collections
+import os
+import subprocess
+import sys
+import tempfile
+
+__all__ = ["ImportTiming", "measure_imports", "check_budget"]
+
+ImportTiming = collections.namedtuple("ImportTiming", ["module", "self_us", "cumulative_us", "depth"])
+
+# the modules the game and its tools start from
+DEFAULT_MODULES = (
+    'src.playfield', 'src.replay', 'src.governor', 'src.control', 'src.memprofile', 'src.spritecache',
+    'src.levelgen', 'src.versus'
+)
+
+# package whose own import cost gets its own budget, everything else is third party
+PROJECT_PACKAGE = 'src'
+
+
+def measure_imports(modules=DEFAULT_MODULES, runs=3):
+    """
+    Imports the given modules in fresh interpreters with -X importtime and returns the timing of every imported
+    module, the fastest of all runs for each.  The interpreters run in an empty directory, so an import that needs
+    config.ini fails here.
+
+    :type modules: tuple
+    :param runs: Number of interpreters started, more runs filter out more noise.
+    :type runs: int
+    :return: List of ImportTiming, in import order
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get('PYTHONPATH')))))
+    best = collections.OrderedDict()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)],
+                cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+            )
+
+            if proc.returncode:
+                raise RuntimeError('Importing {0} failed:\n{1}'.format(', '.join(modules), proc.stderr))
+
+            for timing in _parse(proc.stderr):
+                known = best.get(timing.module)
+
+                if known is None or timing.cumulative_us < known.cumulative_us:
+                    best[timing.module] = timing
+
+    return list(best.values())
+
+
+def _parse(output):
+    # lines look like "import time:       586 |     262050 |   src.playfield", the indent of the name is the depth
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+
+        yield ImportTiming(name.strip(), int(self_us), int(cumulative_us), depth)
+
+
+def check_budget(timings, modules, budget_ms, project_budget_ms):
+    """
+    Returns a list of budget overruns: the total import time of the given modules against budget_ms, and the
+    time spent in this project's own modules against project_budget_ms.
+
+    :type timings: List
+    :type modules: tuple
+    :type budget_ms: float
+    :type project_budget_ms: float
+    :return: List of str, empty if within budget
+    """
+    # modules already pulled in by an earlier one are counted in its time, only top level imports add up
+    total_ms = sum(t.cumulative_us for t in timings if t.depth == 0 and t.module in modules) / 1000
+    project_ms = project_time(timings) / 1000
+    errors = list()
+
+    if total_ms > budget_ms:
+        errors.append('import time {0:.1f} ms is over the {1:.1f} ms budget'.format(total_ms, budget_ms))
+
+    if project_ms > project_budget_ms:
+        errors.append('project import time {0:.1f} ms is over the {1:.1f} ms budget'.format(
+            project_ms, project_budget_ms))
+
+    return errors
+
+
+def project_time(timings):
+    """
+    Returns the self time of this project's modules, in us.
+
+    :type timings: List
+    :return: int
+    """
+    return sum(
+        timing.self_us for timing in timings
+        if timing.module == PROJECT_PACKAGE or timing.module.startswith(PROJECT_PACKAGE + '.')
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Checks startup import time against a budget.')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='modules to import')
+    parser.add_argument('--budget-ms', type=float, default=500, help='budget for importing the modules')
+    parser.add_argument('--project-budget-ms', type=float, default=40,
+                        help='budget for the self time of the src modules alone')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports listed')
+    args = parser.parse_args()
+
+    modules = tuple(args.modules)
+    timings = measure_imports(modules, args.runs)
+
+    print('slowest imports (cumulative ms, self ms):')
+
+    for timing in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:args.top]:
+        print('  {0:8.1f} {1:8.1f}  {2}{3}'.format(
+            timing.cumulative_us / 1000, timing.self_us / 1000, '  ' * timing.depth, timing.module))
+
+    print('project modules (self ms):')
+
+    for timing in sorted(timings, key=lambda t: t.self_us, reverse=True):
+        if timing.module.startswith(PROJECT_PACKAGE + '.'):
+            print('  {0:8.1f}  {1}'.format(timing.self_us / 1000, timing.module))
+
+    errors = check_budget(timings, modules, args.budget_ms, args.project_budget_ms)
+
+    for error in errors:
+        print('OVER BUDGET: ' + error)
+
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import functools
+import json
+import os
+import random
+from src import constants
+from src.constants import ALL_TYPEPROPERTIES
+
+__all__ = ["LevelParams", "BoardGeometry", "get_geometry", "generate_map", "generate_batch"]
+
+# default playfield surface size, matching the hand written maps
+DEFAULT_MAP_SIZE = (338, 588)
+
+
+class LevelParams:
+
+    def __init__(self, width=DEFAULT_MAP_SIZE[0], height=DEFAULT_MAP_SIZE[1], cell_size=None, rows=8,
+                 density=0.85, colors=5, cluster_sizes=None):
+        """
+        Parameters for generated levels.
+
+        :param width: Playfield surface width, written to the map file.
+        :type width: int
+        :param height: Playfield surface height, written to the map file.
+        :type height: int
+        :param cell_size: HexMap cell size the map is generated for, defaults to CELL_SIZE.
+        :type cell_size: Tuple(float, float)
+        :param rows: Number of rows from the ceiling down that may hold bubbles.
+        :type rows: int
+        :param density: Fraction of the cells in those rows that get a bubble.
+        :type density: float
+        :param colors: Number of bubble types used, taken from the front of ALL_TYPEPROPERTIES.
+        :type colors: int
+        :param cluster_sizes: Dict of cluster size -> relative weight.
+        :type cluster_sizes: dict
+        """
+        if not 1 <= colors <= len(ALL_TYPEPROPERTIES):
+            raise ValueError('colors must be between 1 and {0}.'.format(len(ALL_TYPEPROPERTIES)))
+
+        self.width = width
+        self.height = height
+        cell_size = cell_size or constants.CELL_SIZE
+        self.cell_size = (cell_size[0], cell_size[1])
+        self.rows = rows
+        self.density = density
+        self.colors = colors
+        self.cluster_sizes = cluster_sizes or {1: 1, 2: 3, 3: 4, 4: 2, 5: 1}
+
+
+class BoardGeometry:
+
+    def __init__(self, width, height, cell_size):
+        """
+        The parts of a HexMap board the generator and the map checker need, as flat lists indexed by HexMap cell
+        id: addresses, rows and neighbor ids, plus the cell id of every address.  Built once per geometry and
+        reused for every map.
+
+        :type width: int
+        :type height: int
+        :type cell_size: Tuple(float, float)
+        """
+        from src.hexamaplib.hex_map import HexMap
+
+        hexmap = HexMap((width, height), cell_size, hex_orientation='pointy')
+
+        self.addresses = list(hexmap.board)
+        self.cell_index = dict(hexmap.cell_index)
+        self.keys = ['{0}, {1}'.format(q, r) for q, r in self.addresses]
+        self.rows = [r for _, r in self.addresses]
+        self.neighbors = [
+            tuple(hexmap.cell_index[nbr] for nbr in hexmap.hex_allneighbors(addr) if nbr in hexmap.cell_index)
+            for addr in self.addresses
+        ]
+        self.ceiling = min(self.rows)
+
+
+@functools.lru_cache(maxsize=16)
+def get_geometry(width, height, cell_size):
+    """
+    Returns the cached BoardGeometry for the given map size and cell size.
+
+    :return: BoardGeometry
+    """
+    return BoardGeometry(width, height, cell_size)
+
+
+def generate_map(params, seed):
+    """
+    Generates one level.  Bubbles are grown outward from the ceiling, so every bubble is connected to it, then
+    colored in clusters whose sizes follow params.cluster_sizes.  The same params and seed always produce the
+    same map.
+
+    :type params: LevelParams
+    :type seed: int
+    :return: dict in the format Playfield.load_map reads
+    """
+    geo = get_geometry(params.width, params.height, params.cell_size)
+    rng = random.Random(seed)
+    max_row = geo.ceiling + params.rows
+
+    candidates = [cid for cid, r in enumerate(geo.rows) if r < max_row]
+    target = int(len(candidates) * params.density)
+
+    # grow from the ceiling through random frontier picks, every cell joins next to one already placed
+    placed = set()
+    frontier = [cid for cid in candidates if geo.rows[cid] == geo.ceiling]
+    in_frontier = set(frontier)
+
+    while frontier and len(placed) < target:
+        i = rng.randrange(len(frontier))
+        frontier[i], frontier[-1] = frontier[-1], frontier[i]
+        cid = frontier.pop()
+        placed.add(cid)
+
+        for nbr in geo.neighbors[cid]:
+            if nbr not in in_frontier and geo.rows[nbr] < max_row:
+                in_frontier.add(nbr)
+                frontier.append(nbr)
+
+    # color in clusters, avoiding the colors of clusters already touching the new one where possible
+    palette = ALL_TYPEPROPERTIES[:params.colors]
+    sizes = list(params.cluster_sizes)
+    weights = [params.cluster_sizes[s] for s in sizes]
+    colors = dict()
+    order = sorted(placed)
+    rng.shuffle(order)
+
+    for start in order:
+        if start in colors:
+            continue
+
+        size = rng.choices(sizes, weights)[0]
+        cluster = [start]
+        grow = [start]
+        colors[start] = None
+
+        while grow and len(cluster) < size:
+            nbrs = [n for n in geo.neighbors[grow[-1]] if n in placed and n not in colors]
+
+            if not nbrs:
+                grow.pop()
+                continue
+
+            n = rng.choice(nbrs)
+            colors[n] = None
+            cluster.append(n)
+            grow.append(n)
+
+        touching = set(colors.get(n) for cid in cluster for n in geo.neighbors[cid]) - {None}
+        choices = [c for c in palette if c not in touching] or palette
+        color = rng.choice(choices)
+
+        for cid in cluster:
+            colors[cid] = color
+
+    return {
+        'width': params.width,
+        'height': params.height,
+        'seed': seed,
+        'map': {geo.keys[cid]: colors[cid] for cid in sorted(placed)}
+    }
+
+
+def _write_map(job):
+    params, seed, path = job
+
+    with open(path, 'w') as fp:
+        json.dump(generate_map(params, seed), fp, indent=2)
+
+    return path
+
+
+def generate_batch(params, count, out_dir, base_seed=0, workers=None, prefix='GEN_MAP'):
+    """
+    Generates count maps into out_dir across a process pool.  Map i uses seed base_seed + i and is written to
+    <prefix>_<seed>.JSON, so any single map can be regenerated from its file name.
+
+    :type params: LevelParams
+    :type count: int
+    :type out_dir: str
+    :type base_seed: int
+    :param workers: Number of worker processes, defaults to the CPU count.  0 generates in this process.
+    :type workers: int
+    :type prefix: str
+    :return: List of written paths
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [
+        (params, seed, os.path.join(out_dir, '{0}_{1}.JSON'.format(prefix, seed)))
+        for seed in range(base_seed, base_seed + count)
+    ]
+
+    if workers == 0:
+        return [_write_map(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # big chunks keep the per-map IPC cost low, each worker builds its geometry only once
+        chunksize = max(1, count // ((workers or os.cpu_count() or 1) * 4))
+
+        return list(pool.map(_write_map, jobs, chunksize=chunksize))
+
+
+def _parse_cluster_sizes(text):
+    return {int(size): float(weight) for size, weight in (item.split(':') for item in text.split(','))}
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Generates random levels in the maps/ JSON format.')
+    parser.add_argument('out_dir', help='directory to write maps to')
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first map, the rest count up from it')
+    parser.add_argument('--workers', type=int, help='worker processes, 0 for none, default one per CPU')
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--density', type=float, default=0.85)
+    parser.add_argument('--colors', type=int, default=5)
+    parser.add_argument('--cluster-sizes', type=_parse_cluster_sizes, metavar='SIZE:WEIGHT,...',
+                        help='cluster size distribution, e.g. 1:1,2:3,3:4,4:2,5:1')
+    args = parser.parse_args()
+
+    params = LevelParams(rows=args.rows, density=args.density, colors=args.colors,
+                         cluster_sizes=args.cluster_sizes)
+
+    start = time.perf_counter()
+    paths = generate_batch(params, args.count, args.out_dir, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print('{0} maps in {1:.2f}s ({2:.0f} maps/s)'.format(len(paths), elapsed, len(paths) / max(elapsed, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
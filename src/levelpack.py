@@ -0,0 +1,236 @@
+import collections
+import json
+import os
+import struct
+import threading
+import zlib
+
+__all__ = ["LevelEntry", "LevelPack", "LevelPrefetcher", "write_pack", "level_metadata"]
+
+# File layout, all little endian:
+#   header:  magic, format version, level count, offset of the index
+#   blobs:   one zlib compressed JSON level per entry, in the maps/ format
+#   index:   per level its blob offset and length, map size, color count, bubble count, difficulty and the
+#            utf-8 name, so a level can be found and read without touching any other blob
+PACK_MAGIC = b'PBLP'
+PACK_VERSION = 1
+
+_HEADER = struct.Struct('<4sBIQ')
+_ENTRY = struct.Struct('<QIHHBHfB')
+
+LevelEntry = collections.namedtuple(
+    "LevelEntry", ["name", "offset", "length", "width", "height", "colors", "bubbles", "difficulty"]
+)
+
+
+def level_metadata(level):
+    """
+    Returns (colors, bubbles, difficulty) of a level dict.  Difficulty is taken from the level's own
+    "difficulty" key if it has one, otherwise it is estimated from how many colors share how few bubbles.
+
+    :param level: Level in the maps/ JSON format.
+    :type level: dict
+    :return: Tuple(int, int, float)
+    """
+    cells = level['map']
+    colors = len(set(cells.values()))
+    bubbles = len(cells)
+    difficulty = level.get('difficulty')
+
+    if difficulty is None:
+        # more colors means fewer matches per shot, more bubbles means more shots
+        difficulty = colors * (1 + bubbles / 100) if bubbles else 0.0
+
+    return colors, bubbles, float(difficulty)
+
+
+def write_pack(path, levels, compression=9):
+    """
+    Writes a level pack.
+
+    :param path: Pack file to write.
+    :type path: str
+    :param levels: Iterable of (name, level dict) in play order.
+    :param compression: zlib compression level.
+    :type compression: int
+    :return: List of LevelEntry
+    """
+    entries = list()
+
+    with open(path, 'wb') as fp:
+        fp.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, 0))
+
+        for name, data in levels:
+            blob = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), compression)
+            entries.append(LevelEntry(name, fp.tell(), len(blob), data['width'], data['height'],
+                                      *level_metadata(data)))
+            fp.write(blob)
+
+        index_offset = fp.tell()
+
+        for entry in entries:
+            name = entry.name.encode('utf-8')
+            fp.write(_ENTRY.pack(entry.offset, entry.length, entry.width, entry.height, entry.colors,
+                                 entry.bubbles, entry.difficulty, len(name)))
+            fp.write(name)
+
+        fp.seek(0)
+        fp.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries), index_offset))
+
+    return entries
+
+
+class LevelPack:
+
+    def __init__(self, path):
+        """
+        Reads a level pack.  Only the header and the index are read up front, every level is read and decoded
+        on its own when asked for.  Safe to read from several threads.
+
+        :param path: Pack file to read.
+        :type path: str
+        """
+        self.path = path
+        self._fp = open(path, 'rb')
+        self._lock = threading.Lock()
+
+        magic, version, count, index_offset = _HEADER.unpack(self._fp.read(_HEADER.size))
+
+        if magic != PACK_MAGIC:
+            raise IOError('{0} is not a level pack.'.format(path))
+
+        if version != PACK_VERSION:
+            raise IOError('Unsupported level pack version {0} in {1}.'.format(version, path))
+
+        self._fp.seek(index_offset)
+        index = self._fp.read()
+        self.entries = list()
+        offset = 0
+
+        for _ in range(count):
+            fields = _ENTRY.unpack_from(index, offset)
+            offset += _ENTRY.size
+            name = index[offset:offset + fields[-1]].decode('utf-8')
+            offset += fields[-1]
+            self.entries.append(LevelEntry(name, *fields[:-1]))
+
+        self._by_name = {entry.name: i for i, entry in enumerate(self.entries)}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, name):
+        """
+        Returns the index of the level with the given name.
+
+        :type name: str
+        :return: int
+        """
+        try:
+            return self._by_name[name]
+
+        except KeyError:
+            raise KeyError('No level named {0!r} in {1}.'.format(name, self.path))
+
+    def read(self, index):
+        """
+        Reads and decodes one level.
+
+        :type index: int
+        :return: dict in the format Playfield.load_map reads
+        """
+        entry = self.entries[index]
+
+        with self._lock:
+            self._fp.seek(entry.offset)
+            blob = self._fp.read(entry.length)
+
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def close(self):
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LevelPrefetcher:
+
+    def __init__(self, pack):
+        """
+        Decodes levels of a pack on a background thread ahead of time, so a level transition only has to build
+        the board.  zlib releases the GIL while decompressing, so prefetching barely costs the game thread.
+
+        :type pack: LevelPack
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.pack = pack
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-prefetch')
+        self._pending = dict()  # index -> Future
+
+    def prefetch(self, index):
+        """
+        Starts decoding a level in the background, if it is in the pack and not already on its way.
+
+        :type index: int
+        :return: None
+        """
+        if 0 <= index < len(self.pack) and index not in self._pending:
+            self._pending[index] = self._pool.submit(self.pack.read, index)
+
+    def get(self, index):
+        """
+        Returns a decoded level, waiting for its prefetch if one is running and reading it right away if not.
+        Prefetched levels are handed out once.
+
+        :type index: int
+        :return: dict
+        """
+        future = self._pending.pop(index, None)
+
+        return future.result() if future else self.pack.read(index)
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self._pending.clear()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Builds and lists level packs.')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+
+    build = sub.add_parser('build', help='pack map files into one level pack, in the given order')
+    build.add_argument('pack', help='level pack to write')
+    build.add_argument('maps', nargs='+', help='map files in the maps/ JSON format')
+
+    show = sub.add_parser('list', help='list the levels of a pack')
+    show.add_argument('pack')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        def levels():
+            for path in args.maps:
+                with open(path, 'r') as fp:
+                    yield os.path.splitext(os.path.basename(path))[0], json.load(fp)
+
+        entries = write_pack(args.pack, levels())
+        print('{0} levels, {1} bytes'.format(len(entries), os.path.getsize(args.pack)))
+
+    else:
+        with LevelPack(args.pack) as pack:
+            for i, entry in enumerate(pack.entries):
+                print('{0:4d}  {1:24} {2}x{3}  {4} colors  {5:4d} bubbles  difficulty {6:.1f}  {7} bytes'.format(
+                    i, entry.name, entry.width, entry.height, entry.colors, entry.bubbles, entry.difficulty,
+                    entry.length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import collections
+import json
+import os
+from src.constants import ALL_TYPEPROPERTIES
+from src.levelgen import get_geometry
+
+__all__ = ["SUPPORTED_RESOLUTIONS", "Issue", "cell_size_for", "check_map", "check_maps"]
+
+# [VIDEO] display_width x display_height combinations the game is expected to run at
+SUPPORTED_RESOLUTIONS = ((640, 480), (800, 600), (1024, 768), (1280, 720), (1280, 1024), (1920, 1080))
+
+# smallest group of one type that pops, see Playfield.process_collision
+MATCH_SIZE = 3
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# resolutions: the display sizes the issue shows up at, empty if it doesn't depend on the resolution
+Issue = collections.namedtuple("Issue", ["severity", "message", "resolutions"])
+
+
+def cell_size_for(display_size):
+    """
+    Returns the HexMap cell size the game uses at a display size, the same way constants.CELL_SIZE is derived
+    from the [VIDEO] settings.
+
+    :type display_size: Tuple(int, int)
+    :return: Tuple(float, float)
+    """
+    playfield_width = display_size[0] * 0.65
+
+    return playfield_width / 23, playfield_width / 23
+
+
+def _read(filepath):
+    # returns (width, height, {address: type_property}) or raises ValueError with what is wrong
+    try:
+        with open(filepath, 'r') as fp:
+            data = json.load(fp)
+
+    except json.JSONDecodeError as exc:
+        raise ValueError('not valid JSON: {0}'.format(exc))
+
+    if not isinstance(data, dict):
+        raise ValueError('top level is not an object')
+
+    for key in ('width', 'height', 'map'):
+        if key not in data:
+            raise ValueError('missing "{0}"'.format(key))
+
+    if not isinstance(data['width'], int) or not isinstance(data['height'], int):
+        raise ValueError('width and height must be integers')
+
+    if not isinstance(data['map'], dict):
+        raise ValueError('"map" is not an object')
+
+    cells = dict()
+
+    for address, type_property in data['map'].items():
+        try:
+            q, r = address.split(', ')
+            cells[(int(q), int(r))] = type_property
+
+        except ValueError:
+            raise ValueError('"{0}" is not a "q, r" address'.format(address))
+
+    return data['width'], data['height'], cells
+
+
+def _check_board(geo, cells):
+    """
+    Yields (severity, message) for the cells of a map on one board geometry.
+
+    :type geo: src.levelgen.BoardGeometry
+    :param cells: dict of axial address -> type_property, with known types only.
+    :type cells: dict
+    :return: generator of Tuple
+    """
+    off_board = sorted(addr for addr in cells if addr not in geo.cell_index)
+
+    if off_board:
+        yield ERROR, '{0} addresses not on the board: {1}'.format(
+            len(off_board), ' '.join('({0}, {1})'.format(*addr) for addr in off_board[:5]) +
+            (' ...' if len(off_board) > 5 else ''))
+
+    index = geo.cell_index
+    types = {index[addr]: type_property for addr, type_property in cells.items() if addr in index}
+
+    # everything reachable from the ceiling row stays up, the rest falls on the first pop
+    stack = [cid for cid in types if geo.rows[cid] == geo.ceiling]
+    connected = set(stack)
+
+    while stack:
+        for nbr in geo.neighbors[stack.pop()]:
+            if nbr in types and nbr not in connected:
+                connected.add(nbr)
+                stack.append(nbr)
+
+    if len(connected) < len(types):
+        yield WARNING, '{0} bubbles not connected to the ceiling'.format(len(types) - len(connected))
+
+    # groups that would already pop, so the level doesn't start in a settled state
+    seen = set()
+    groups = []
+
+    for start, type_property in types.items():
+        if start in seen:
+            continue
+
+        group = [start]
+        seen.add(start)
+
+        for cid in group:
+            for nbr in geo.neighbors[cid]:
+                if nbr not in seen and types.get(nbr) == type_property:
+                    seen.add(nbr)
+                    group.append(nbr)
+
+        if len(group) >= MATCH_SIZE:
+            groups.append(len(group))
+
+    if groups:
+        yield WARNING, '{0} starting match groups of {1} or more, largest {2}'.format(
+            len(groups), MATCH_SIZE, max(groups))
+
+
+def check_map(filepath, resolutions=SUPPORTED_RESOLUTIONS):
+    """
+    Checks a map file against the HexMap board it is played on at each of the given display resolutions.
+    Board geometries are cached across calls, see levelgen.get_geometry().
+
+    :type filepath: str
+    :param resolutions: Display sizes to check, as (width, height).
+    :type resolutions: Iterable
+    :return: List of Issue
+    """
+    try:
+        width, height, cells = _read(filepath)
+
+    except (OSError, ValueError) as exc:
+        return [Issue(ERROR, str(exc), ())]
+
+    issues = []
+    unknown = sorted(set(str(t) for t in cells.values() if t not in ALL_TYPEPROPERTIES))
+
+    if unknown:
+        issues.append(Issue(ERROR, 'unknown bubble types: {0}'.format(', '.join(unknown)), ()))
+        cells = {addr: t for addr, t in cells.items() if t in ALL_TYPEPROPERTIES}
+
+    if not cells:
+        issues.append(Issue(WARNING, 'no bubbles', ()))
+        return issues
+
+    # the same problem usually shows up at several resolutions, report it once with all of them
+    found = collections.OrderedDict()
+
+    for resolution in resolutions:
+        geo = get_geometry(width, height, cell_size_for(resolution))
+
+        for severity, message in _check_board(geo, cells):
+            found.setdefault((severity, message), []).append(tuple(resolution))
+
+    issues.extend(Issue(severity, message, tuple(res)) for (severity, message), res in found.items())
+
+    return issues
+
+
+def _check_job(job):
+    filepath, resolutions = job
+
+    return filepath, check_map(filepath, resolutions)
+
+
+def check_maps(paths, resolutions=SUPPORTED_RESOLUTIONS, workers=None):
+    """
+    Checks map files across a process pool.  Files are handed out in big chunks, so each worker builds every
+    geometry once and reuses it for all of its maps.
+
+    :param paths: Map files, or directories searched for *.json files.
+    :type paths: Iterable
+    :type resolutions: Iterable
+    :param workers: Number of worker processes, defaults to the CPU count.  0 checks in this process.
+    :type workers: int
+    :return: List of (map file path, list of Issue), in path order
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    files = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(dirpath, name) for dirpath, _, names in os.walk(path)
+                for name in names if name.lower().endswith('.json')
+            ))
+
+        else:
+            files.append(path)
+
+    resolutions = tuple(tuple(res) for res in resolutions)
+    jobs = [(filepath, resolutions) for filepath in files]
+
+    if workers == 0:
+        return [_check_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+
+        return list(pool.map(_check_job, jobs, chunksize=chunksize))
+
+
+def _parse_resolution(text):
+    width, height = text.lower().split('x')
+
+    return int(width), int(height)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Checks map files against the board at every resolution.')
+    parser.add_argument('maps', nargs='*', default=[os.path.join(os.curdir, 'maps')],
+                        help='map files or directories, defaults to maps/')
+    parser.add_argument('--workers', type=int, help='worker processes, 0 for none, default one per CPU')
+    parser.add_argument('--resolution', type=_parse_resolution, action='append', metavar='WxH',
+                        help='display resolution to check, may be repeated, defaults to all supported ones')
+    parser.add_argument('--strict', action='store_true', help='fail on warnings too')
+    args = parser.parse_args()
+
+    resolutions = args.resolution or SUPPORTED_RESOLUTIONS
+
+    start = time.perf_counter()
+    results = check_maps(args.maps, resolutions, args.workers)
+    elapsed = time.perf_counter() - start
+
+    counts = collections.Counter()
+
+    for filepath, issues in results:
+        for issue in issues:
+            counts[issue.severity] += 1
+
+            where = ''
+
+            if issue.resolutions and len(issue.resolutions) < len(resolutions):
+                where = ' (at {0})'.format(', '.join('{0}x{1}'.format(*res) for res in issue.resolutions))
+
+            print('{0}: {1}: {2}{3}'.format(filepath, issue.severity, issue.message, where))
+
+    print('{0} maps, {1} errors, {2} warnings in {3:.2f}s'.format(
+        len(results), counts[ERROR], counts[WARNING], elapsed))
+
+    failed = counts[ERROR] or (args.strict and counts[WARNING])
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
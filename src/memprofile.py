@@ -0,0 +1,246 @@
+import collections
+import gc
+import time
+import tracemalloc
+
+__all__ = ["GCEvent", "MemoryProfiler", "GCMonitor", "freeze_heap", "thaw_heap", "tune_gc", "parse_thresholds"]
+
+GCEvent = collections.namedtuple("GCEvent", ["frame", "generation", "duration_ms", "collected", "uncollectable"])
+
+
+class MemoryProfiler:
+
+    def __init__(self, top=10, traceback_frames=1):
+        """
+        Reports the top allocators per phase of a run (e.g. startup, load_map, steady).  Every phase is compared
+        to the snapshot taken at the end of the previous one, so the report shows what that phase allocated and
+        still holds on to.
+
+        :param top: Number of allocation sites listed per phase.
+        :type top: int
+        :param traceback_frames: Stack frames stored per allocation, more is slower but easier to read.
+        :type traceback_frames: int
+        """
+        self.top = top
+        self.traceback_frames = traceback_frames
+        self.phases = list()
+        self._last = None
+
+    def start(self):
+        """
+        Starts tracing allocations.  Everything allocated before this is invisible to the profiler.
+
+        :return: None
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+
+        self._last = self._take_snapshot()
+
+    def stop(self):
+        """
+        Stops tracing allocations.
+
+        :return: None
+        """
+        tracemalloc.stop()
+        self._last = None
+
+    def phase(self, name):
+        """
+        Ends the current phase, storing its top allocators under the given name.
+
+        :type name: str
+        :return: List of tracemalloc.StatisticDiff
+        """
+        if self._last is None:
+            raise RuntimeError('MemoryProfiler.start() has to be called before the first phase.')
+
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self._last, 'lineno')[:self.top]
+        current, peak = tracemalloc.get_traced_memory()
+
+        self.phases.append((name, current, peak, stats))
+        self._last = snapshot
+
+        # python 3.9+, older versions report the peak of the whole run
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+        return stats
+
+    def report(self):
+        """
+        Returns the per phase report as text.
+
+        :return: str
+        """
+        lines = list()
+
+        for name, current, peak, stats in self.phases:
+            lines.append('== {0}: {1:.1f} KiB traced, {2:.1f} KiB peak =='.format(name, current / 1024, peak / 1024))
+
+            for stat in stats:
+                frame = stat.traceback[0]
+                lines.append('  {0:+9.1f} KiB {1:+7d} blocks  {2}:{3}'.format(
+                    stat.size_diff / 1024, stat.count_diff, frame.filename, frame.lineno))
+
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _take_snapshot():
+        # the profiler's own bookkeeping would otherwise top every list
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+
+class GCMonitor:
+
+    def __init__(self, history=1000):
+        """
+        Logs every garbage collection with its duration and the frame it happened in, through gc.callbacks.
+
+        :param history: Number of recent collections kept.
+        :type history: int
+        """
+        self.events = collections.deque(maxlen=history)
+        self.frame = 0
+        self.total_ms = [0.0, 0.0, 0.0]
+        self.counts = [0, 0, 0]
+        self._started = None
+
+    def install(self):
+        """
+        Starts logging collections.
+
+        :return: None
+        """
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def uninstall(self):
+        """
+        Stops logging collections.
+
+        :return: None
+        """
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def next_frame(self):
+        """
+        Call once per frame, collections are logged against the current frame number.
+
+        :return: None
+        """
+        self.frame += 1
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self._started = time.perf_counter()
+
+        elif self._started is not None:
+            duration_ms = (time.perf_counter() - self._started) * 1000
+            generation = info['generation']
+            self._started = None
+
+            self.events.append(
+                GCEvent(self.frame, generation, duration_ms, info['collected'], info['uncollectable'])
+            )
+            self.total_ms[generation] += duration_ms
+            self.counts[generation] += 1
+
+    def worst(self, count=5):
+        """
+        Returns the slowest logged collections, slowest first.
+
+        :type count: int
+        :return: List of GCEvent
+        """
+        return sorted(self.events, key=lambda event: event.duration_ms, reverse=True)[:count]
+
+    def report(self):
+        """
+        Returns a summary of the collections per generation and the slowest ones as text.
+
+        :return: str
+        """
+        lines = ['== gc over {0} frames =='.format(self.frame)]
+
+        for generation in range(3):
+            count = self.counts[generation]
+            lines.append('  gen {0}: {1:5d} collections, {2:8.2f} ms total, {3:6.3f} ms avg'.format(
+                generation, count, self.total_ms[generation], self.total_ms[generation] / count if count else 0.0))
+
+        for event in self.worst():
+            lines.append('  frame {0:6d}: gen {1} took {2:.3f} ms, {3} collected'.format(
+                event.frame, event.generation, event.duration_ms, event.collected))
+
+        return '\n'.join(lines)
+
+
+def freeze_heap():
+    """
+    Moves every object alive right now into the permanent generation, so later collections don't traverse them.
+    Meant to be called after a level is loaded, when the board objects are there to stay.  Does nothing on Pythons
+    without gc.freeze.
+
+    :return: int, number of frozen objects
+    """
+    if not hasattr(gc, 'freeze'):
+        return 0
+
+    # collect first, so garbage from loading is freed instead of frozen
+    gc.collect()
+    gc.freeze()
+
+    return gc.get_freeze_count()
+
+
+def thaw_heap():
+    """
+    Moves the permanent generation back into the oldest one, so a board frozen by freeze_heap() can be collected
+    once it is dropped.  Call before replacing a frozen board.  Does nothing on Pythons without gc.unfreeze.
+
+    :return: None
+    """
+    if hasattr(gc, 'unfreeze'):
+        gc.unfreeze()
+
+
+def tune_gc(thresholds):
+    """
+    Sets the collector thresholds, returning the previous ones.  None leaves them as they are.
+
+    :param thresholds: Tuple of up to three ints, see gc.set_threshold.
+    :type thresholds: tuple
+    :return: tuple
+    """
+    previous = gc.get_threshold()
+
+    if thresholds:
+        gc.set_threshold(*thresholds)
+
+    return previous
+
+
+def parse_thresholds(text):
+    """
+    Parses a threshold setting like '10000, 20, 20'.  An empty string means the defaults.
+
+    :type text: str
+    :return: tuple or None
+    """
+    text = text.strip()
+
+    if not text:
+        return None
+
+    thresholds = tuple(int(value) for value in text.split(','))
+
+    if not 1 <= len(thresholds) <= 3:
+        raise ValueError('gc_thresholds takes one to three values, got {0!r}.'.format(text))
+
+    return thresholds
@@ -0,0 +1,159 @@
+import numpy
+import pygame
+
+
+class ParticleSystem:
+
+    def __init__(self, bounds, capacity=512, gravity=0.35, lifetime=240, seed=None):
+        """
+        Array-backed debris for popped and falling bubbles.  Particle position, velocity and lifetime are kept
+        in NumPy arrays and advanced in a single vectorized step, so a cascade of hundreds of bubbles costs about
+        the same to simulate as a handful.  Particles are drawn with the shared bubble images.
+
+        :param bounds: Area particles live in; anything leaving it is culled.
+        :type bounds: pygame.Rect
+        :param capacity: Maximum number of live particles.
+        :type capacity: int
+        :param gravity: Downward acceleration in pixels per tick.
+        :type gravity: float
+        :param lifetime: Ticks a particle lives before it is culled regardless of position.
+        :type lifetime: int
+        :param seed: Seed for the velocity jitter RNG.
+        :type seed: int
+        """
+
+        self.bounds = pygame.Rect(bounds)
+        self.capacity = capacity
+        self.limit = capacity  # may be lowered at runtime to shed work
+        self.gravity = gravity
+        self.lifetime = lifetime
+        self.count = 0
+
+        self._rng = numpy.random.default_rng(seed)
+
+        # particle state, only the first self.count rows are live
+        self.pos = numpy.zeros((capacity, 2), dtype=numpy.float32)
+        self.vel = numpy.zeros((capacity, 2), dtype=numpy.float32)
+        self.life = numpy.zeros(capacity, dtype=numpy.int32)
+        self.kind = numpy.zeros(capacity, dtype=numpy.int32)
+
+        # shared imagery, particles refer to it by index
+        self._images = list()
+        self._image_index = dict()
+        self._half_sizes = numpy.zeros((0, 2), dtype=numpy.float32)
+
+    def __len__(self):
+        return self.count
+
+    def _get_kind(self, image):
+        """
+        Returns the index of the given image in the shared image list, adding it if needed.
+
+        :type image: pygame.Surface
+        :return: int
+        """
+        kind = self._image_index.get(id(image))
+
+        if kind is None:
+            kind = len(self._images)
+            self._images.append(image)
+            self._image_index[id(image)] = kind
+            self._half_sizes = numpy.vstack(
+                (self._half_sizes, numpy.array(image.get_size(), dtype=numpy.float32) / 2)
+            )
+
+        return kind
+
+    def spawn(self, sprites, burst=False):
+        """
+        Converts sprites into particles at their current positions.  Popped bubbles burst outward, dislocated
+        bubbles just drop with a little sideways drift.  Sprites over the current limit are discarded.
+
+        :param sprites: Iterable of sprites with image and rect attributes.
+        :param burst: True for an outward burst, False for a fall.
+        :type burst: bool
+        :return: int number of particles spawned
+        """
+        sprites = list(sprites)[:max(self.limit - self.count, 0)]
+        n = len(sprites)
+
+        if not n:
+            return 0
+
+        start, end = self.count, self.count + n
+
+        self.pos[start:end] = [spr.rect.center for spr in sprites]
+        self.kind[start:end] = [self._get_kind(spr.image) for spr in sprites]
+        self.life[start:end] = self.lifetime
+
+        if burst:
+            angle = self._rng.uniform(0, 2 * numpy.pi, n)
+            speed = self._rng.uniform(2.0, 5.0, n)
+            self.vel[start:end, 0] = numpy.cos(angle) * speed
+            self.vel[start:end, 1] = numpy.sin(angle) * speed
+
+        else:
+            self.vel[start:end, 0] = self._rng.uniform(-1.0, 1.0, n)
+            self.vel[start:end, 1] = self._rng.uniform(0.0, 1.5, n)
+
+        self.count = end
+
+        return n
+
+    def update(self):
+        """
+        Advances every live particle one tick and culls the ones that left the bounds or expired.
+
+        :return: None
+        """
+        n = self.count
+
+        if not n:
+            return
+
+        vel = self.vel[:n]
+        pos = self.pos[:n]
+        vel[:, 1] += self.gravity
+        pos += vel
+        self.life[:n] -= 1
+
+        # a particle is culled once its image is entirely outside of the bounds
+        half = self._half_sizes[self.kind[:n]]
+        alive = (
+            (self.life[:n] > 0)
+            & (pos[:, 0] + half[:, 0] >= self.bounds.left)
+            & (pos[:, 0] - half[:, 0] < self.bounds.right)
+            & (pos[:, 1] - half[:, 1] < self.bounds.bottom)
+        )
+
+        if alive.all():
+            return
+
+        # compact live particles to the front of the arrays
+        keep = numpy.flatnonzero(alive)
+        k = len(keep)
+        self.pos[:k] = pos[keep]
+        self.vel[:k] = vel[keep]
+        self.life[:k] = self.life[keep]
+        self.kind[:k] = self.kind[keep]
+        self.count = k
+
+    def draw(self, surface):
+        """
+        Blits every live particle to the given surface.
+
+        :type surface: pygame.Surface
+        :return: pygame.Surface
+        """
+        n = self.count
+
+        if n:
+            kinds = self.kind[:n]
+            topleft = (self.pos[:n] - self._half_sizes[kinds]).astype(numpy.int32).tolist()
+            images = self._images
+            surface.blits([(images[k], tl) for k, tl in zip(kinds.tolist(), topleft)], False)
+
+        return surface
+
+    def clear(self):
+        self.count = 0
@@ -1,19 +1,23 @@
 import math
 import pygame
-import json
+import collections
 from random import Random
 from pygame.math import Vector2
 from src.bubble import Bubble
 from src.shooter import Shooter
 from src.bubblemap import BubbleMap
+from src.particles import ParticleSystem
+from src.scheduler import Scheduler, TweenBatch
 from src.hexamaplib.hex_map import HexMap
-from src.constants import *
-from pygame.locals import *
+from src.hexamaplib.hex_tables import KEY_DIRECTIONS, pack, unpack
+from src.constants import ALL_TYPEPROPERTIES, DEBUG, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT, INPUT_FIRE
+
+PlayfieldSnapshot = collections.namedtuple("PlayfieldSnapshot", ["board", "shooter", "active"])
 
 
 class Playfield:
 
-    def __init__(self, map_file_path, cell_size):
+    def __init__(self, map_file_path, cell_size, seed=None):
         """
         Renders a background and gameboard surface.
 
@@ -21,10 +25,16 @@ class Playfield:
         :type surface_size: Tuple (int, int)
         :param cell_size: Size to use for HexMap cell size
         :type cell_size: Tuple(int, int)
+        :param seed: Seed for every RNG used by the playfield.  The same map, seed and inputs replay identically.
+        :type seed: int
         """
 
         self.image = None
         self.background = None
+        self.backdrop = None  # pre-composited background + tint, only set for opaque compositing
+        self.board_layer = None  # background plus settled bubbles, see render_board_layer()
+        self._board_layer_debug = None
+        self._backdrop_source = None
         self.rect = None
         self.area_params = None
         self.hexmap = None
@@ -32,27 +42,38 @@ class Playfield:
         self.dbgsurf = None
 
         self.bg_color = (255, 255, 255, 150)
+        self.seed = seed
+        self.ceiling_row = 0  # bubbles not connected to this row fall
+        self.show_debug = DEBUG  # debug overlays may be switched off at runtime, but not on without DEBUG
+        self.renderer = None  # draws the board in parallel bands when set, see src.bandrender
+        self.headless = False  # simulate only and draw nothing, for batch playback like src.analytics
+        self.on_shot = None  # called with (cell_id, angle, matched, dropped) whenever a fired bubble settles
+        self.aim_guide = None  # draws the predicted path of the next shot when set, see src.aimguide
 
         self.cell_size = cell_size
         self.cell_radius = int(cell_size[0] - 2)  # this is a magic number just to accommodate drawn sprites
 
         # sprite groups
+        # all_sprites holds only what moves or animates and gets ticked every frame.  settled bubbles sleep in
+        # bubble_map instead, so the per-frame update cost doesn't grow with the board
         self.all_sprites = pygame.sprite.Group()
-        self.bubble_map = BubbleMap()  # i think i need a new class here
+        self.bubble_map = BubbleMap()  # bound to the board's HexMap in _reset_board()
         self.active_bubble = pygame.sprite.GroupSingle()
         self.next_bubble = pygame.sprite.GroupSingle()
-        self.disloc_bubbles = pygame.sprite.Group()
+        self.disloc_bubbles = None  # popped and falling bubbles, see src.particles
+
+        # delayed events and animations run on the tick, see src.scheduler.  they aren't part of snapshots, so
+        # modes that are recorded and replayed must not change the board from them
+        self.scheduler = Scheduler()
+        self.tweens = TweenBatch(self.scheduler)
 
         # gamey stuff
         self.load_map(map_file_path)
         self.image.blit(self.background, self.rect.topleft)
 
     def update(self):
-        self.image.fill(pygame.Color(*self.bg_color))
-
-        # debug
-        if DEBUG:
-            self.image.blit(self.dbgsurf, self.rect.topleft)
+        self.scheduler.advance()
+        self.tweens.update()
 
         # self.all_sprites.clear(self.image, self.background)
         self.all_sprites.update()
@@ -62,79 +83,288 @@ class Playfield:
         if self.active_bubble.sprite:
             self.process_collision()
 
-        # update and paint everything
-        self.all_sprites.draw(self.image)
+        self.disloc_bubbles.update()
+
+        if self.headless:
+            self.bubble_map.dirty_areas.clear()
+            return
+
+        # settled bubbles come from the cached board layer, only cells changed since last frame are re-rendered
+        if self.board_layer is None or self._board_layer_debug != self.show_debug:
+            self.render_board_layer()
+
+        elif self.bubble_map.dirty_areas:
+            self.render_board_layer(self.bubble_map.dirty_areas)
+
+        self.bubble_map.dirty_areas.clear()
+
+        # paint everything.  without a backdrop both surfaces have per-pixel alpha, and blitting onto fully
+        # transparent pixels copies the layer exactly instead of blending it with the last frame
+        if self.renderer:
+            self.renderer.run(self.image, self.rect, self.hexmap, self._paint_layer)
+
+        else:
+            self._paint_layer(self.image, self.rect, (0, 0))
+
+        self.active_bubble.draw(self.image)
+        self.shooter.next.draw(self.image)
+        self.disloc_bubbles.draw(self.image)
+
+        if self.aim_guide:
+            self.aim_guide.sync()
+            self.aim_guide.draw(self.image, self.shooter.angle)
+
         self.shooter.draw(self.image)
 
+    def _paint_layer(self, target, area, offset=None):
+        # the cached board layer is where every frame starts from
+        ox, oy = offset if offset is not None else area.topleft
+
+        if not self.backdrop:
+            target.fill((0, 0, 0, 0))
+
+        target.blit(self.board_layer, (area.x - ox, area.y - oy), area)
+
+    def render_board_layer(self, areas=None):
+        """
+        Renders the static board layer: the playfield background plus every settled bubble.  If areas are given,
+        only the region covering them is re-rendered.
+
+        :param areas: List of pygame.Rect, or None to render the whole layer.
+        :type areas: List
+        :return: None
+        """
+        if self.board_layer is None:
+            self.board_layer = self.image.copy()
+
+        layer = self.board_layer
+        clip = areas[0].unionall(areas[1:]) if areas else layer.get_rect()
+
+        if self.renderer:
+            self.renderer.run(layer, clip, self.hexmap, self._paint_board)
+
+        else:
+            layer.set_clip(clip)
+            self._paint_board(layer, clip, (0, 0))
+            layer.set_clip(None)
+
+        self._board_layer_debug = self.show_debug
+
+    def _paint_board(self, target, area, offset=None):
+        """
+        Paints the part of the board layer inside area onto target, whose top left corner is at offset on the
+        layer.  Band renderers call this with a subsurface per band.
+
+        :type target: pygame.Surface
+        :type area: pygame.Rect
+        :param offset: Layer position of target's (0, 0), defaults to area.topleft.
+        :type offset: Tuple(int, int)
+        :return: None
+        """
+        ox, oy = offset if offset is not None else area.topleft
+
+        if self.backdrop:
+            target.blit(self.backdrop, (area.x - ox, area.y - oy), area)
+
+        else:
+            target.fill(pygame.Color(*self.bg_color))
+
+        # debug
+        if self.show_debug:
+            target.blit(self.dbgsurf, (self.rect.x - ox, self.rect.y - oy))
+
+        for spr in self.bubble_map.sprites():
+            if spr.rect.colliderect(area):
+                target.blit(spr.image, spr.rect.move(-ox, -oy))
+
+    def set_backdrop(self, surface, pos):
+        """
+        Switches the playfield to opaque compositing.  The translucent bg_color tint is blended once onto a copy
+        of the part of the given surface the playfield will be blitted over, and from then on every frame starts
+        from that copy and self.image is an opaque surface.  Blitting self.image at pos onto the given surface
+        then gives the same result as the per-pixel alpha path, without any alpha blending per frame.
+
+        :param surface: Surface the playfield is drawn over, usually the screen background.
+        :type surface: pygame.Surface
+        :param pos: Position the playfield is blitted at on that surface.
+        :type pos: Tuple(int, int)
+        :return: None
+        """
+        self._backdrop_source = (surface, pos)
+
+        tint = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        tint.fill(pygame.Color(*self.bg_color))
+
+        self.backdrop = pygame.Surface(self.rect.size).convert()
+        self.backdrop.blit(surface, (0, 0), pygame.Rect(pos, self.rect.size))
+        self.backdrop.blit(tint, (0, 0))
+
+        self.image = self.backdrop.copy()
+        self.board_layer = None
+
+    def apply_input(self, flags):
+        """
+        Applies one tick worth of player input, given as a combination of the INPUT_* flags.
+
+        :type flags: int
+        :return: None
+        """
+        if flags & INPUT_ROTATE_LEFT:
+            self.shooter.rotate(1)
+
+        elif flags & INPUT_ROTATE_RIGHT:
+            self.shooter.rotate(-1)
+
+        # one bubble in flight at a time
+        if flags & INPUT_FIRE and self.shooter.next.sprite and not self.active_bubble.sprite:
+            self.shooter.fire(10, self.active_bubble)
+
+    def snapshot(self):
+        """
+        Returns a compact, immutable snapshot of the game state: the board (see BubbleMap.snapshot), the shooter
+        (see Shooter.snapshot) and the bubble in flight, if any.  Snapshots hold no sprites or Surfaces, so they
+        are cheap to keep around for undo and can be pickled for save/resume.
+
+        :return: PlayfieldSnapshot
+        """
+        active = self.active_bubble.sprite
+
+        if active:
+            active = (
+                active.grid_address, tuple(active.pos), active.angle, tuple(active.velocity), active.type_property
+            )
+
+        return PlayfieldSnapshot(self.bubble_map.snapshot(), self.shooter.snapshot(), active)
+
+    def restore(self, snapshot):
+        """
+        Restores the game state from a snapshot taken on this playfield's map.  The HexMap and the bubble images
+        are reused, only the cells that differ are replaced.
+
+        :type snapshot: PlayfieldSnapshot
+        :return: None
+        """
+        self.bubble_map.restore(snapshot.board, self._make_bubble)
+        self.shooter.restore(snapshot.shooter, self.all_sprites)
+
+        if self.active_bubble.sprite:
+            self.active_bubble.sprite.kill()
+
+        if snapshot.active:
+            addr, pos, angle, velocity, type_property = snapshot.active
+            bubble = Bubble(addr, pos, self.cell_radius, type_property, 'BLACK', angle, 0, self.active_bubble,
+                            self.all_sprites)
+            bubble.velocity = Vector2(velocity)
+
+    def _make_bubble(self, address, type_property):
+        """
+        Returns a new settled Bubble of the given type at the given map address.  It isn't in any group, settled
+        bubbles only belong to bubble_map.
+
+        :type address: tuple
+        :type type_property: str
+        :return: Bubble
+        """
+        return Bubble(
+            address,                                        # adress
+            self.hexmap.board.get(address).get_pixelpos(),  # pixelpos
+            self.cell_radius,                               # radius
+            type_property,                                  # fill_color
+            'BLACK',                                        # stroke_color
+            180,                                            # angle
+            0                                               # velocity
+        )
+
     def process_collision(self):
         mv = self.active_bubble.sprite
 
-        # check for boundary collision and bounce
-        if mv.rect.top < 0:
-            #TODO: make bubbles stick to top
-            mv.bounce(Vector2(1, 0))
-            return
-        elif mv.rect.left < 0 or mv.rect.right > self.rect.width:
-            mv.bounce(Vector2(0, 1))
+        if self._check_bounds(mv):
             return
-        elif mv.rect.top > self.rect.bottom:
-            mv.kill()
-            return
-
-        collision_list = pygame.sprite.spritecollide(mv, self.bubble_map, False)
 
-        if collision_list:
-            # keep going until circle collision
-            for spr in collision_list:
-                if pygame.sprite.collide_circle(mv, spr):
-                    new_pos = mv.rect.clamp(self.rect).center
-                    mv.set_position(
-                        self._validate_axial_addr(
-                            self.hexmap.get_celladdressbypixel(new_pos),
-                            self._get_shiftdir(mv)
-                        ),
-                        new_pos
-                    )
+        # circle collision against the settled bubbles around mv, straight from the board arrays
+        if self.bubble_map.touching(mv.rect.center, mv.radius + self.cell_radius):
+            dest_cell = self._landing_cell(mv)
 
-                    dest_cell = self.hexmap.board.get(mv.grid_address)
+            if dest_cell is None:
+                mv.kill()
+                return
 
-                    mv.set_velocity(0)
-                    mv.set_position(dest_cell.axialpos, dest_cell.get_pixelpos())
+            mv.set_velocity(0)
+            mv.set_position(dest_cell.axialpos, dest_cell.get_pixelpos())
 
-                    # move the active bubble to the map
-                    self.bubble_map.add(mv)
-                    self.active_bubble.remove(mv)
+            # move the active bubble to the map, where it sleeps
+            self.bubble_map.add(mv)
+            self.active_bubble.remove(mv)
+            self.all_sprites.remove(mv)
 
-                    # testing floodfill
-                    matches = self._floodfill(mv, pygame.sprite.Group())
-                    if len(matches) >= 3:
-                        for sprite in matches:
-                            sprite.kill()
-                            self.bubble_map.remove(sprite)
+            matches = self.bubble_map.match_group(mv.grid_address)
+            dropped = ()
+            if len(matches) >= 3:
+                self._dislocate(matches, burst=True)
+                dropped = self.bubble_map.unsupported(self.ceiling_row)
+                self._dislocate(dropped, burst=False)
+            else:
+                matches = ()
 
-                    return
+            if self.on_shot:
+                self.on_shot(self.hexmap.get_cell_id(mv.grid_address), mv.angle, len(matches), len(dropped))
 
-                continue
+    def _check_bounds(self, mv):
+        """
+        Bounces a moving bubble off the walls and kills it once it falls out of the bottom.  Returns True if it
+        did either, in which case there is no board collision to check this tick.
 
-    def _floodfill(self, sprite, spritegroup):
+        :type mv: src.bubble.Bubble
+        :return: bool
         """
-        Returns a group of touching sprites whose type_property match.
+        # check for boundary collision and bounce
+        if mv.rect.top < 0:
+            #TODO: make bubbles stick to top
+            mv.bounce(Vector2(1, 0))
+            return True
+        elif mv.rect.left < 0 or mv.rect.right > self.rect.width:
+            mv.bounce(Vector2(0, 1))
+            return True
+        elif mv.rect.top > self.rect.bottom:
+            mv.kill()
+            return True
 
-        :type spritegroup: pygame.sprite.Group
-        :type sprite: Bubble
-        :return: pygame.sprite.Group
+        return False
+
+    def _landing_cell(self, mv):
         """
+        Returns the cell a moving bubble that touched the board settles in, or None if there is no free cell for
+        it.  The bubble's grid address is moved to the cell it stopped over.
 
-        nbr_bubble_addr = [addr for addr in self.hexmap.hex_allneighbors(sprite.grid_address) if addr in self.bubble_map.sprite_dict_by_address.keys()]
+        :type mv: src.bubble.Bubble
+        :return: HexCell
+        """
+        new_pos = mv.rect.clamp(self.rect).center
+        mv.set_position(
+            self._validate_axial_addr(
+                self.hexmap.get_celladdressbypixel(new_pos),
+                self._get_shiftdir(mv)
+            ),
+            new_pos
+        )
+
+        return self.hexmap.board.get(self._get_free_addr(mv.grid_address, new_pos))
+
+    def _dislocate(self, cell_ids, burst):
+        """
+        Removes bubbles from the map and hands their sprites to the particle system to burst or fall.
 
-        for ax in nbr_bubble_addr:
-            b = self.bubble_map.get(ax)
-            if b.type_property == sprite.type_property and b not in spritegroup:
-                spritegroup.add(b)
-                sprite = b
-                self._floodfill(sprite, spritegroup)
+        :param cell_ids: HexMap cell ids of the bubbles.
+        :type cell_ids: Iterable
+        :param burst: True for popped bubbles, False for falling ones.
+        :type burst: bool
+        :return: None
+        """
+        sprites = [spr for spr in map(self.bubble_map.clear_cell, cell_ids) if spr is not None]
+        self.disloc_bubbles.spawn(sprites, burst=burst)
 
-        return spritegroup
+        for sprite in sprites:
+            sprite.kill()
 
     def _validate_axial_addr(self, axial_addr, shift):
         """
@@ -145,37 +375,128 @@ class Playfield:
         :param shift: int
         :return:
         """
+        key_index = self.hexmap.key_index
+        key = pack(axial_addr[0], axial_addr[1])
         c = 0
 
-        while axial_addr not in self.hexmap.board.keys():
-            axial_addr = (axial_addr[0] + shift, axial_addr[1])
+        while key not in key_index:
+            key += shift
 
             # infinite loops are bad, mmkay?
             assert c < 2, f"Maximum iteration count {c} reached."
             c += 1
 
-        return axial_addr
+        return unpack(key) if c else axial_addr
+
+    def _get_free_addr(self, axial_addr, pixel_pos):
+        """
+        Returns axial_addr if that cell is free, otherwise the free neighboring cell closest to pixel_pos, or None
+        if there is none.  This keeps a bubble from settling on top of another one.
+        :param axial_addr: tuple
+        :param pixel_pos: tuple
+        :return: tuple
+        """
+        if not self.bubble_map.is_occupied(axial_addr):
+            return axial_addr
+
+        key = pack(axial_addr[0], axial_addr[1])
+        nbr_ids = (self.hexmap.key_index.get(key + offset) for offset in KEY_DIRECTIONS)
+        free = [
+            self.hexmap.cells[cell_id] for cell_id in nbr_ids
+            if cell_id is not None and not self.bubble_map.is_occupied_id(cell_id)
+        ]
+
+        if not free:
+            return None
+
+        return min(free, key=lambda cell: Vector2(cell.get_pixelpos()).distance_squared_to(pixel_pos)).axialpos
+
+    def _reset_board(self, size, hexmap):
+        """
+        Sets up the surfaces, the particle system, the shooter and the debug overlay for a new board.
+
+        :param size: Playfield surface size.
+        :type size: Tuple(int, int)
+        :param hexmap: The new board's HexMap.
+        :type hexmap: HexMap
+        :return: None
+        """
+        # the old board's shooter, its next bubble and a bubble still in flight go with it
+        if self.shooter:
+            if self.shooter.next.sprite:
+                self.shooter.next.sprite.kill()
+
+            self.shooter.kill()
+
+        if self.active_bubble.sprite:
+            self.active_bubble.sprite.kill()
+
+        self.image = pygame.Surface(size).convert_alpha()
+        self.board_layer = None
+        self.background = pygame.Surface(size).convert_alpha()
+        self.background.fill(pygame.Color(*self.bg_color))
+        self.area_params = self.image.get_size()
+        self.rect = self.image.get_rect()
+        self.hexmap = hexmap
+        self.bubble_map.bind(hexmap)
+        self.scheduler.clear()
+        self.tweens.clear()
+
+        if self._backdrop_source:
+            self.set_backdrop(*self._backdrop_source)
+
+        self.disloc_bubbles = ParticleSystem(self.rect, seed=self.seed)
+
+        # shooter sprite
+        # shooter_pos = self.rect.midbottom
+        self.shooter = Shooter(
+            (0, 0),
+            (-5, 15),
+            self.hexmap.get_pixeladdressbycell((-5, 15)),
+            self.cell_radius,
+            self.bubble_map,
+            self.all_sprites,
+            seed=self.seed
+        )
+        self.shooter.rect.midbottom = (self.rect.midbottom[0], self.rect.midbottom[1] - 20)
+
+        # debug
+        if DEBUG:
+            print("Playfield dimensions: {0}".format(self.area_params))
+            self.paint_debug()
+
+    def paint_debug(self):
+        """
+        Paints the cell grid onto the debug overlay.
+
+        :return: None
+        """
+        self.dbgsurf = pygame.Surface(self.area_params)
+        self.dbgsurf.fill(pygame.Color(self.bg_color))
+        self.dbgsurf.convert()
+        for cell in self.hexmap.board.values():
+            cell.paint(self.dbgsurf, color="grey")
 
     def _get_shiftdir(self, sprite):
         """
-        Returns +1 or -1 depending on which side of playfield centery the sprite is.
+        Returns +1 or -1 depending on which side of playfield centerx the sprite is, pointing back towards the
+        middle.
         :param sprite: pygame.sprite.Sprite
         :return: Boolean
         """
-        if self.rect.centery < sprite.rect.centery:
+        if sprite.rect.centerx < self.rect.centerx:
             return 1
 
         return -1
 
     def load_map(self, filepath):
-        try:
-            map_toplevel = json.load(open(filepath, 'r'))
-            map_width = map_toplevel['width']
-            map_height = map_toplevel['height']
-            map_dict = map_toplevel['map']
+        """
+        Sets up a new board from a map file, or from a map dict as LevelPack.read() returns it.
 
-        except Exception:
-            raise IOError('Unable to read file located at {0}.'.format(filepath))
+        :type filepath: str or dict
+        :return: None
+        """
+        size, cells = self._read_map(filepath)
 
         try:
             # reset affected properties
@@ -183,54 +504,100 @@ class Playfield:
             if DEBUG:
                 print("Loading map...")
 
-            self.image = pygame.Surface((map_width, map_height)).convert_alpha()
-            self.background = pygame.Surface((map_width, map_height)).convert_alpha()
-            self.background.fill(pygame.Color(*self.bg_color))
-            self.area_params = self.image.get_size()
-            self.rect = self.image.get_rect()
-            self.hexmap = HexMap(self.area_params, self.cell_size, hex_orientation='pointy')
-
-            # shooter sprite
-            # shooter_pos = self.rect.midbottom
-            self.shooter = Shooter(
-                (0, 0),
-                (-5, 15),
-                self.hexmap.get_pixeladdressbycell((-5, 15)),
-                self.cell_radius,
-                self.bubble_map,
-                self.all_sprites
-            )
-            self.shooter.rect.midbottom = (self.rect.midbottom[0], self.rect.midbottom[1] - 20)
+            self._reset_board(size, HexMap(size, self.cell_size, hex_orientation='pointy'))
 
-            # debug
-            if DEBUG:
-                print("Playfield dimensions: {0}".format(self.area_params))
-                self.dbgsurf = pygame.Surface(self.area_params)
-                self.dbgsurf.fill(pygame.Color(self.bg_color))
-                self.dbgsurf.convert()
-                for cell in self.hexmap.board.values():
-                    cell.paint(self.dbgsurf, color="grey")
-
-            for address in map_dict:
-                addr = address.split(", ")
-                addr = (int(addr[0]), int(addr[1]))
-                self.bubble_map.add(
-                    # this is test code for now, just drawing bubbles with primitives
-                    # later, the ADDRESS : TYPE json approach will be used to decide which sprite
-                    # graphic to load and what special properties (if any) the bubble might have
-                    Bubble(
-                        addr,                                        # adress
-                        self.hexmap.board.get(addr).get_pixelpos(),  # pixelpos
-                        self.cell_radius,                            # radius
-                        map_dict.get(address),                       # fill_color
-                        'BLACK',                                     # stroke_color
-                        180,                                         # angle
-                        0,                                           # velocity
-                        (self.bubble_map, self.all_sprites)          # *groups
-                    )
-                )
-
-            self.all_sprites.add(self.bubble_map)
+            for addr, type_property in cells.items():
+                if addr not in self.hexmap.board:
+                    raise ValueError('{0} is not a cell of the {1}x{2} board.'.format(addr, *size))
+
+                # this is test code for now, just drawing bubbles with primitives
+                # later, the ADDRESS : TYPE json approach will be used to decide which sprite
+                # graphic to load and what special properties (if any) the bubble might have
+                self.bubble_map.add(self._make_bubble(addr, type_property))
 
         except:
             raise
+
+        if self.aim_guide:
+            self.aim_guide.rebuild()
+
+    def reload_map(self, filepath):
+        """
+        Brings the board in line with an edited map file without starting over: only cells that were added,
+        removed or changed type are touched, and the HexMap is kept.  If the map size changed the map is loaded
+        from scratch instead.  Returns the number of (added, removed, changed) cells, or None after a full load.
+
+        :type filepath: str
+        :return: Tuple(int, int, int)
+        """
+        size, cells = self._read_map(filepath)
+
+        if size != self.rect.size:
+            self.load_map(filepath)
+            return None
+
+        for addr in cells:
+            if addr not in self.hexmap.board:
+                raise ValueError('{0} is not a cell of the {1}x{2} board in {3}.'.format(addr, *size, filepath))
+
+        removed = changed = 0
+
+        for addr, type_id in self.bubble_map.items():
+            type_property = cells.get(addr)
+
+            if type_property == ALL_TYPEPROPERTIES[type_id]:
+                continue
+
+            self.bubble_map.pop(addr).kill()
+
+            if type_property is None:
+                removed += 1
+
+            else:
+                self.bubble_map.add(self._make_bubble(addr, type_property))
+                changed += 1
+
+        added = 0
+
+        for addr, type_property in cells.items():
+            if not self.bubble_map.is_occupied(addr):
+                self.bubble_map.add(self._make_bubble(addr, type_property))
+                added += 1
+
+        return added, removed, changed
+
+    @staticmethod
+    def _read_map(filepath):
+        """
+        Reads a map file, or takes a map that was already decoded, e.g. from a level pack.  Returns the playfield
+        size and a dict of axial address -> type_property.
+
+        :param filepath: Path of a map file, or a dict in the map file format.
+        :type filepath: str or dict
+        :return: Tuple(Tuple(int, int), dict)
+        """
+        # only needed here, keeps it off the startup path
+        import json
+
+        try:
+            if isinstance(filepath, dict):
+                map_toplevel = filepath
+
+            else:
+                with open(filepath, 'r') as fp:
+                    map_toplevel = json.load(fp)
+
+            size = (map_toplevel['width'], map_toplevel['height'])
+            cells = dict()
+
+            for address, type_property in map_toplevel['map'].items():
+                q, r = address.split(", ")
+                cells[(int(q), int(r))] = type_property
+
+        except Exception:
+            if isinstance(filepath, dict):
+                raise IOError('Unable to read map data.')
+
+            raise IOError('Unable to read file located at {0}.'.format(filepath))
+
+        return size, cells
@@ -0,0 +1,288 @@
+import struct
+import zlib
+import pygame
+from src import constants
+from src.headless import init_display
+
+__all__ = ["ReplayRecorder", "ReplayPlayer", "state_digest"]
+
+# File layout, all little endian:
+#   header:  magic, format version, seed, map path length, followed by the utf-8 map path
+#   body:    run-length encoded input records of (INPUT_* flags, run length in ticks)
+#   footer:  END_OF_INPUT record, total tick count and a digest of the final state (see state_digest)
+REPLAY_MAGIC = b'PYBR'
+REPLAY_VERSION = 1
+END_OF_INPUT = 0xFF
+
+_HEADER = struct.Struct('<4sBqH')
+_RECORD = struct.Struct('<BH')
+_FOOTER = struct.Struct('<II')
+_MAX_RUN = 0xFFFF
+
+
+def state_digest(playfield):
+    """
+    Returns a CRC32 of the gameplay relevant state of a playfield.  Two runs of the same replay must produce the
+    same digest at the same tick, which makes this the check for determinism.
+
+    :type playfield: src.playfield.Playfield
+    :return: int
+    """
+    board = sorted(
+        (addr, constants.ALL_TYPEPROPERTIES[type_id]) for addr, type_id in playfield.bubble_map.items()
+    )
+    active = playfield.active_bubble.sprite
+    nxt = playfield.shooter.next.sprite
+
+    state = (
+        board,
+        playfield.shooter.angle,
+        nxt.type_property if nxt else None,
+        (tuple(active.pos), tuple(active.velocity), active.type_property) if active else None
+    )
+
+    return zlib.crc32(repr(state).encode('utf-8'))
+
+
+class ReplayRecorder:
+
+    def __init__(self, filepath, map_file_path, seed):
+        """
+        Writes the per-tick inputs of a session to a compact binary replay log.  Only inputs are stored, the
+        playfield state is reproduced on playback from the map and the seed.
+
+        :param filepath: Replay file to write.
+        :type filepath: str
+        :param map_file_path: Map the session is played on.
+        :type map_file_path: str
+        :param seed: Seed the session's Playfield was created with.
+        :type seed: int
+        """
+        self.filepath = filepath
+        self.tick = 0
+
+        self._fp = open(filepath, 'wb')
+        self._flags = None
+        self._run = 0
+
+        map_path = map_file_path.encode('utf-8')
+        self._fp.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, len(map_path)))
+        self._fp.write(map_path)
+
+    def record(self, flags):
+        """
+        Records the input flags applied on the current tick.
+
+        :type flags: int
+        :return: None
+        """
+        if flags == self._flags and self._run < _MAX_RUN:
+            self._run += 1
+
+        else:
+            self._flush()
+            self._flags = flags
+            self._run = 1
+
+        self.tick += 1
+
+    def _flush(self):
+        if self._run:
+            self._fp.write(_RECORD.pack(self._flags, self._run))
+
+    def close(self, playfield=None):
+        """
+        Finishes the log.  If the recorded playfield is given, its final state digest is stored so playback can
+        verify it reproduced the session exactly.
+
+        :type playfield: src.playfield.Playfield
+        :return: None
+        """
+        if self._fp.closed:
+            return
+
+        self._flush()
+        self._fp.write(_RECORD.pack(END_OF_INPUT, 0))
+        self._fp.write(_FOOTER.pack(self.tick, state_digest(playfield) if playfield else 0))
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayPlayer:
+
+    def __init__(self, filepath, cell_size, keyframe_interval=300):
+        """
+        Plays a replay log back against a fresh Playfield.  Playback is uncapped; pacing, if any, is up to the
+        caller.  Keyframes of the playfield state are kept every keyframe_interval ticks so seek() only has to
+        simulate from the closest one.
+
+        :param filepath: Replay file to read.
+        :type filepath: str
+        :param cell_size: Cell size the Playfield is created with.
+        :type cell_size: Tuple(int, int)
+        :param keyframe_interval: Ticks between stored keyframes.
+        :type keyframe_interval: int
+        """
+        # imported here to keep this module usable by tools that only read logs
+        from src.playfield import Playfield
+
+        self.filepath = filepath
+        self.keyframe_interval = keyframe_interval
+
+        with open(filepath, 'rb') as fp:
+            data = fp.read()
+
+        magic, version, self.seed, path_len = _HEADER.unpack_from(data, 0)
+
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError('{0} is not a version {1} replay file.'.format(filepath, REPLAY_VERSION))
+
+        offset = _HEADER.size
+        self.map_file_path = data[offset:offset + path_len].decode('utf-8')
+        offset += path_len
+
+        # expand the input runs into one byte per tick
+        self.inputs = bytearray()
+
+        while True:
+            flags, run = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+
+            if flags == END_OF_INPUT:
+                break
+
+            self.inputs.extend(bytes((flags,)) * run)
+
+        self.recorded_ticks, self.recorded_digest = _FOOTER.unpack_from(data, offset)
+
+        self.playfield = Playfield(self.map_file_path, cell_size, seed=self.seed)
+        self.tick = 0
+        self.keyframes = {0: self._capture()}
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def step(self):
+        """
+        Simulates a single tick.  Returns False once the end of the replay is reached.
+
+        :return: bool
+        """
+        if self.tick >= len(self.inputs):
+            return False
+
+        self.playfield.apply_input(self.inputs[self.tick])
+        self.playfield.update()
+        self.tick += 1
+
+        if self.tick % self.keyframe_interval == 0 and self.tick not in self.keyframes:
+            self.keyframes[self.tick] = self._capture()
+
+        return True
+
+    def run(self, until=None):
+        """
+        Simulates as fast as possible up to the given tick, or to the end of the replay.
+
+        :type until: int
+        :return: int the tick playback stopped at
+        """
+        until = len(self.inputs) if until is None else min(until, len(self.inputs))
+
+        while self.tick < until and self.step():
+            pass
+
+        return self.tick
+
+    def seek(self, tick):
+        """
+        Moves playback to the given tick, restoring the closest keyframe at or before it and simulating forward.
+
+        :type tick: int
+        :return: int the tick playback stopped at
+        """
+        tick = max(0, min(tick, len(self.inputs)))
+        start = max(k for k in self.keyframes if k <= tick)
+
+        if self.tick < start or self.tick > tick:
+            self._restore(start)
+
+        return self.run(tick)
+
+    def verify(self):
+        """
+        Plays to the end and checks the final state against the digest stored by the recorder.
+
+        :return: bool
+        """
+        self.run()
+
+        return self.tick == self.recorded_ticks and state_digest(self.playfield) == self.recorded_digest
+
+    def _capture(self):
+        """
+        Captures the state needed to resume playback from the current tick: a playfield snapshot plus the
+        particles, which are not part of the game state but should look the same after a seek.
+
+        :return: Tuple
+        """
+        particles = self.playfield.disloc_bubbles
+
+        return (
+            self.playfield.snapshot(),
+            (
+                particles.count, particles.pos.copy(), particles.vel.copy(), particles.life.copy(),
+                particles.kind.copy(), particles._rng.bit_generator.state
+            )
+        )
+
+    def _restore(self, tick):
+        snapshot, (count, pos, vel, life, kind, rng_state) = self.keyframes[tick]
+        particles = self.playfield.disloc_bubbles
+
+        self.playfield.restore(snapshot)
+
+        particles.count = count
+        particles.pos[:] = pos
+        particles.vel[:] = vel
+        particles.life[:] = life
+        particles.kind[:] = kind
+        particles._rng.bit_generator.state = rng_state
+
+        self.tick = tick
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Plays back a replay log headless at uncapped speed.')
+    parser.add_argument('replay', nargs='+', help='replay file(s) to play back')
+    args = parser.parse_args()
+
+    init_display()
+
+    failed = 0
+
+    for filepath in args.replay:
+        start = time.perf_counter()
+        player = ReplayPlayer(filepath, constants.CELL_SIZE)
+        ok = player.verify()
+        elapsed = time.perf_counter() - start
+        failed += not ok
+
+        print('{0}: {1} ticks in {2:.2f}s ({3:.0f} ticks/s), {4}'.format(
+            filepath, player.tick, elapsed, player.tick / max(elapsed, 1e-9), 'OK' if ok else 'DIVERGED'))
+
+    pygame.quit()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
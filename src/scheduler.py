@@ -0,0 +1,285 @@
+import numpy
+
+__all__ = ["Timer", "Scheduler", "TweenBatch", "EASINGS"]
+
+# each wheel level has 2 ** _SLOT_BITS slots, a slot of level n spans 2 ** (_SLOT_BITS * n) ticks
+_SLOT_BITS = 6
+_SLOTS = 1 << _SLOT_BITS
+_SLOT_MASK = _SLOTS - 1
+_LEVELS = 4  # 2 ** 24 ticks, over three days at 60 ticks a second; later timers wait in an overflow list
+
+
+class Timer:
+    """
+    Handle of a scheduled callback, see Scheduler.schedule().
+    """
+    __slots__ = ('deadline', 'interval', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, interval, callback, args):
+        self.deadline = deadline
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Keeps the callback from running.  The timer is dropped the next time its slot is visited.
+
+        :return: None
+        """
+        self.cancelled = True
+
+
+class Scheduler:
+
+    def __init__(self):
+        """
+        Runs callbacks a number of ticks from now, on a hierarchical timer wheel: scheduling and cancelling are
+        O(1), and a tick only visits the timers that are due, plus the occasional cascade of a coarser slot into
+        finer ones.  Time only moves in advance(), so a real-time loop and an uncapped headless simulation fire
+        the same callbacks on the same ticks.
+        """
+        self.now = 0
+        self._wheel = [[list() for _ in range(_SLOTS)] for _ in range(_LEVELS)]
+        self._overflow = list()
+
+    def schedule(self, delay, callback, *args):
+        """
+        Runs callback(*args) delay ticks from now.
+
+        :param delay: Ticks from now, at least 1.  A callback scheduled from a callback never runs on the same tick.
+        :type delay: int
+        :type callback: Callable
+        :return: Timer
+        """
+        timer = Timer(self.now + max(int(delay), 1), 0, callback, args)
+        self._place(timer)
+
+        return timer
+
+    def every(self, interval, callback, *args):
+        """
+        Runs callback(*args) every interval ticks, starting interval ticks from now, until cancelled.
+
+        :type interval: int
+        :type callback: Callable
+        :return: Timer
+        """
+        interval = max(int(interval), 1)
+        timer = Timer(self.now + interval, interval, callback, args)
+        self._place(timer)
+
+        return timer
+
+    def _place(self, timer):
+        deadline = timer.deadline
+
+        # a timer goes on the finest level whose current span still holds its deadline
+        for level in range(_LEVELS):
+            shift = _SLOT_BITS * (level + 1)
+
+            if deadline >> shift == self.now >> shift:
+                self._wheel[level][(deadline >> (shift - _SLOT_BITS)) & _SLOT_MASK].append(timer)
+                return
+
+        self._overflow.append(timer)
+
+    def advance(self, ticks=1):
+        """
+        Moves time forward, running every callback that comes due, in the order they were scheduled.
+
+        :type ticks: int
+        :return: None
+        """
+        for _ in range(ticks):
+            self.now += 1
+            now = self.now
+
+            # cascade the coarse slots that start on this tick, coarsest first
+            if not now & _SLOT_MASK:
+                top = 1
+
+                while top < _LEVELS and not now & ((1 << (_SLOT_BITS * (top + 1))) - 1):
+                    top += 1
+
+                if top == _LEVELS:
+                    overflow, self._overflow = self._overflow, list()
+                    self._cascade(overflow)
+                    top -= 1
+
+                for level in range(top, 0, -1):
+                    slots = self._wheel[level]
+                    index = (now >> (_SLOT_BITS * level)) & _SLOT_MASK
+                    due, slots[index] = slots[index], list()
+                    self._cascade(due)
+
+            slots = self._wheel[0]
+            due, slots[now & _SLOT_MASK] = slots[now & _SLOT_MASK], list()
+
+            for timer in due:
+                if timer.cancelled:
+                    continue
+
+                timer.callback(*timer.args)
+
+                if timer.interval and not timer.cancelled:
+                    timer.deadline += timer.interval
+                    self._place(timer)
+
+    def _cascade(self, timers):
+        for timer in timers:
+            if not timer.cancelled:
+                self._place(timer)
+
+    def clear(self):
+        """
+        Drops every scheduled timer.
+
+        :return: None
+        """
+        for slots in self._wheel:
+            for slot in slots:
+                slot.clear()
+
+        self._overflow.clear()
+
+    def __len__(self):
+        return sum(
+            not timer.cancelled for slots in self._wheel for slot in slots for timer in slot
+        ) + sum(not timer.cancelled for timer in self._overflow)
+
+
+# easing functions on arrays of progress values in [0, 1]
+EASINGS = {
+    'linear': lambda t: t,
+    'in_quad': lambda t: t * t,
+    'out_quad': lambda t: t * (2 - t),
+    'in_out_quad': lambda t: numpy.where(t < 0.5, 2 * t * t, 1 - 2 * (1 - t) ** 2),
+}
+
+
+class TweenBatch:
+
+    def __init__(self, scheduler, capacity=64, dims=2):
+        """
+        Interpolates many values at once.  Every tween is a row of NumPy arrays, all rows are advanced in one
+        vectorized step per easing, and the results are left in values for their owners to read; only tweens
+        with an on_update callback cost a Python call per tick.  Tweens finish through the scheduler, so their
+        on_done callbacks run on the wheel like any other timer.
+
+        :type scheduler: Scheduler
+        :param capacity: Maximum number of running tweens.
+        :type capacity: int
+        :param dims: Components per value, e.g. 2 for positions.
+        :type dims: int
+        """
+        self.scheduler = scheduler
+        self.values = numpy.zeros((capacity, dims), dtype=numpy.float32)
+
+        self._start = numpy.zeros((capacity, dims), dtype=numpy.float32)
+        self._delta = numpy.zeros((capacity, dims), dtype=numpy.float32)
+        self._begin = numpy.zeros(capacity, dtype=numpy.int64)
+        self._duration = numpy.ones(capacity, dtype=numpy.int64)
+        self._ease = [None] * capacity
+        self._on_update = [None] * capacity
+        self._timers = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self._ease) - len(self._free)
+
+    def add(self, start, end, duration, ease='linear', on_update=None, on_done=None):
+        """
+        Starts a tween from start to end over duration ticks.  Returns its row in values, valid until the tween
+        is done or cancelled.
+
+        :type start: Sequence
+        :type end: Sequence
+        :type duration: int
+        :param ease: Name of one of EASINGS.
+        :type ease: str
+        :param on_update: Called with the current value every tick.
+        :param on_done: Called once the end value is reached.
+        :return: int
+        """
+        if not self._free:
+            raise RuntimeError('TweenBatch is full, raise its capacity.')
+
+        duration = max(int(duration), 1)
+        row = self._free.pop()
+        self._start[row] = start
+        self._delta[row] = numpy.subtract(end, start)
+        self.values[row] = start
+        self._begin[row] = self.scheduler.now
+        self._duration[row] = duration
+        self._ease[row] = EASINGS[ease]
+        self._on_update[row] = on_update
+        self._timers[row] = self.scheduler.schedule(duration, self._finish, row, on_done)
+
+        return row
+
+    def cancel(self, row):
+        """
+        Stops a tween where it is, without calling on_done.
+
+        :type row: int
+        :return: None
+        """
+        if self._ease[row] is not None:
+            self._timers[row].cancel()
+            self._release(row)
+
+    def clear(self):
+        """
+        Stops every tween, without calling on_done.
+
+        :return: None
+        """
+        for row, ease in enumerate(self._ease):
+            if ease is not None:
+                self.cancel(row)
+
+    def _release(self, row):
+        self._ease[row] = None
+        self._on_update[row] = None
+        self._timers[row] = None
+        self._free.append(row)
+
+    def _finish(self, row, on_done):
+        self.values[row] = self._start[row] + self._delta[row]
+
+        if self._on_update[row]:
+            self._on_update[row](self.values[row])
+
+        self._release(row)
+
+        if on_done:
+            on_done()
+
+    def update(self):
+        """
+        Advances every running tween to the scheduler's current tick.
+
+        :return: None
+        """
+        if len(self._free) == len(self._ease):
+            return
+
+        progress = (self.scheduler.now - self._begin) / self._duration
+        numpy.clip(progress, 0.0, 1.0, out=progress)
+
+        # one pass per easing in use, not per tween
+        rows_by_ease = dict()
+
+        for row, ease in enumerate(self._ease):
+            if ease is not None:
+                rows_by_ease.setdefault(ease, list()).append(row)
+
+        for ease, rows in rows_by_ease.items():
+            eased = ease(progress[rows])[:, None]
+            self.values[rows] = self._start[rows] + self._delta[rows] * eased
+
+        for row, on_update in enumerate(self._on_update):
+            if on_update is not None:
+                on_update(self.values[row])
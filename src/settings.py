@@ -35,7 +35,17 @@ class Settings(configparser.ConfigParser):
                 'cancel': 'ESCAPE'
             },
             'VIDEO': {'display_width': '800', 'display_height': '600', 'fullscreen': 'True'},
-            'AUDIO': {'sfx_enabled': 'True', 'sfx_volume': '100', 'bgm_enabled': 'True', 'bgm_volume': '100'}
+            'AUDIO': {'sfx_enabled': 'True', 'sfx_volume': '100', 'bgm_enabled': 'True', 'bgm_volume': '100'},
+            'PERFORMANCE': {
+                'target_fps': '60',
+                'frame_budget_ms': '16.6',
+                'effect_level': '3',
+                'adaptive_quality': 'True',
+                'compositing': 'opaque',
+                'gc_freeze': 'True',
+                'gc_thresholds': '',
+                'render_threads': '0'
+            }
         }
 
         # load settings dict into parser
@@ -50,3 +60,20 @@ class Settings(configparser.ConfigParser):
         # write it out
         with open(self.configFilePath, 'w') as fp:
             self.write(fp)
+
+
+_settings = None
+
+
+def get_settings():
+    """
+    Returns the game's Settings, read from config.ini in the current directory on first use.
+
+    :return: Settings
+    """
+    global _settings
+
+    if _settings is None:
+        _settings = Settings(os.path.join(os.curdir, 'config.ini'))  # config file location hardcoding is intentional
+
+    return _settings
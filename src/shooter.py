@@ -1,22 +1,31 @@
-import pygame, random
+import pygame, random, collections
 from pygame.math import Vector2
 from src.bubble import Bubble
-from pygame.locals import *
-from src.constants import *
+from src.spritecache import get_sprite_cache, find_art
+from src.constants import ALL_TYPEPROPERTIES, DEBUG
+
+# next_angle is the angle the next bubble was made with: Shooter.fire() rotates its velocity from there, so it
+# decides the last bits of the shot's velocity
+ShooterSnapshot = collections.namedtuple("ShooterSnapshot", ["angle", "next_type", "rng_state", "next_angle"])
 
 
 class Shooter(pygame.sprite.Sprite):
 
-    def __init__(self, position, bubble_origin_addr, bubble_origin_pos, bubble_radius, bubble_map, *groups):
+    def __init__(self, position, bubble_origin_addr, bubble_origin_pos, bubble_radius, bubble_map, *groups,
+                 seed=None):
         super().__init__(*groups)
-        self.image = pygame.Surface((75, 75)).convert()  # temporary value
+        art = find_art('shooter')
+        self.image = get_sprite_cache().load(art, (75, 75)) if art else pygame.Surface((75, 75)).convert()
         self.rect = self.image.get_rect()
         self.rect.midbottom = position
 
         # Unique shooter properties
         self.angle = 90
         self.limits = (20, 160)
-        self._rng = random.Random()
+        self.show_debug = DEBUG
+        self._rng = random.Random(seed)
+        self._rng_draws = 0  # bumped whenever the rng is used, see snapshot()
+        self._rng_state = None
         # TODO: remember to add to playfield spritegroups when changed
         self.next = pygame.sprite.GroupSingle()
         # stored copy of bubble properties
@@ -26,18 +35,19 @@ class Shooter(pygame.sprite.Sprite):
         self._bubble_map = bubble_map  # needed to access get_present_types()
 
         # placeholder image
-        self.image.set_colorkey(pygame.Color('MAGENTA'))
-        self.image.fill(pygame.Color('MAGENTA'))
-        pygame.draw.polygon(
-            self.image,
-            pygame.Color("BLUE"),
-            [
-                (37, 0),
-                (75, 75),
-                (0, 75),
-                (37, 0)
-            ]
-        )
+        if not art:
+            self.image.set_colorkey(pygame.Color('MAGENTA'))
+            self.image.fill(pygame.Color('MAGENTA'))
+            pygame.draw.polygon(
+                self.image,
+                pygame.Color("BLUE"),
+                [
+                    (37, 0),
+                    (75, 75),
+                    (0, 75),
+                    (37, 0)
+                ]
+            )
 
         # animation stuff
         self._orig_img = pygame.transform.rotate(self.image, -self.angle)
@@ -79,8 +89,9 @@ class Shooter(pygame.sprite.Sprite):
 
         # ran-dumb in
         ri = self._rng.randint(0, 100)
+        self._rng_draws += 1
 
-        if ri <= rbc:
+        if ri <= rbc and diff:
             Bubble(
                 start_axial,                # address
                 start_pos,                  # pixelpos
@@ -97,7 +108,7 @@ class Shooter(pygame.sprite.Sprite):
                 start_axial,                # address
                 start_pos,                  # pixelpos
                 radius,                     # radius
-                self._rng.choice(cpc),      # fill_color
+                self._rng.choice(cpc or ALL_TYPEPROPERTIES),  # fill_color
                 'BLACK',                    # stroke_color
                 self.angle,                 # angle
                 0,                          # velocity
@@ -111,6 +122,56 @@ class Shooter(pygame.sprite.Sprite):
         self.next.sprite.add(*groups)
         self.next.empty()
 
+    def snapshot(self):
+        """
+        Returns the shooter state needed to resume play: angle, type and angle of the next bubble and the rng state.
+        The rng state is only captured again after the rng has been used, so snapshots taken between shots
+        share it.
+
+        :return: ShooterSnapshot
+        """
+        if self._rng_state is None or self._rng_state[0] != self._rng_draws:
+            self._rng_state = (self._rng_draws, self._rng.getstate())
+
+        nxt = self.next.sprite
+
+        return ShooterSnapshot(
+            self.angle, nxt.type_property if nxt else None, self._rng_state[1], nxt.angle if nxt else None
+        )
+
+    def restore(self, snapshot, *groups):
+        """
+        Restores the shooter from a ShooterSnapshot.  A recreated next bubble is also added to the given groups.
+
+        :type snapshot: ShooterSnapshot
+        :return: None
+        """
+        self.angle = snapshot.angle
+        self._rng.setstate(snapshot.rng_state)
+        self._rng_draws += 1
+        self._rng_state = (self._rng_draws, snapshot.rng_state)
+
+        nxt = self.next.sprite
+
+        if nxt and (nxt.type_property, nxt.angle) == (snapshot.next_type, snapshot.next_angle):
+            return
+
+        if nxt:
+            nxt.kill()
+
+        if snapshot.next_type:
+            Bubble(
+                self._bubble_origin_addr,
+                self._bubble_origin_pos,
+                self._bubble_radius,
+                snapshot.next_type,
+                'BLACK',
+                snapshot.next_angle,
+                0,
+                self.next,
+                *groups
+            )
+
     def kill(self):
         super().kill()
 
@@ -137,7 +198,7 @@ class Shooter(pygame.sprite.Sprite):
 
         res.blit(self.image, self.rect.topleft)
 
-        if DEBUG:
+        if self.show_debug:
             debug_text = pygame.font.Font(pygame.font.get_default_font(), 14).render(
                 "{0} deg".format(self.angle), True, pygame.Color("RED"))
 
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import pygame
+from src import constants
+from src.constants import CACHE_PATH, SPR_PATH
+from src.headless import init_display
+
+__all__ = ["SpriteCache", "get_sprite_cache", "find_art"]
+
+# bump when the scaling method changes, so old cache entries are not reused
+CACHE_VERSION = 1
+
+
+class SpriteCache:
+
+    def __init__(self, cache_dir=CACHE_PATH):
+        """
+        Pre-scaled sprite art, cached on disk.  Source art is scaled once per target size with smoothscale and the
+        result is stored under a key made of the source file's hash and the target size, so later launches at the
+        same resolution load the scaled image directly.  Changing the source file changes its hash, which makes
+        stale entries unreachable.
+
+        :param cache_dir: Directory scaled images are stored in.  Created on first write.
+        :type cache_dir: str
+        """
+        self.cache_dir = cache_dir
+
+        # per process memo, so every sprite sharing an image gets the very same Surface
+        self._loaded = dict()
+        self._hashes = dict()
+
+        # counters, handy to check a launch didn't scale anything
+        self.hits = 0
+        self.misses = 0
+
+    def source_hash(self, source_path):
+        """
+        Returns the hex digest of a source file's contents.
+
+        :type source_path: str
+        :return: str
+        """
+        digest = self._hashes.get(source_path)
+
+        if digest is None:
+            with open(source_path, 'rb') as fp:
+                digest = hashlib.sha1(fp.read()).hexdigest()
+
+            self._hashes[source_path] = digest
+
+        return digest
+
+    def cache_path(self, source_path, size):
+        """
+        Returns the path of the cache entry for a source file scaled to the given size.
+
+        :type source_path: str
+        :type size: Tuple(int, int)
+        :return: str
+        """
+        return os.path.join(
+            self.cache_dir,
+            '{0}_{1}x{2}_v{3}.png'.format(self.source_hash(source_path), int(size[0]), int(size[1]), CACHE_VERSION)
+        )
+
+    def load(self, source_path, size):
+        """
+        Returns the source image scaled to the given size, from the cache if possible.
+
+        :param source_path: Path of the full size source art.
+        :type source_path: str
+        :param size: Target size in pixels.
+        :type size: Tuple(int, int)
+        :return: pygame.Surface
+        """
+        size = (int(size[0]), int(size[1]))
+        key = (source_path, size)
+        image = self._loaded.get(key)
+
+        if image is not None:
+            return image
+
+        path = self.cache_path(source_path, size)
+
+        if os.path.exists(path):
+            self.hits += 1
+            image = pygame.image.load(path).convert_alpha()
+
+        else:
+            self.misses += 1
+            image = self.scale(source_path, size)
+            self._store(image, path)
+
+        self._loaded[key] = image
+
+        return image
+
+    def scale(self, source_path, size):
+        """
+        Loads and scales source art without touching the cache.
+
+        :type source_path: str
+        :type size: Tuple(int, int)
+        :return: pygame.Surface
+        """
+        source = pygame.image.load(source_path).convert_alpha()
+
+        if source.get_size() == size:
+            return source
+
+        return pygame.transform.smoothscale(source, size)
+
+    def _store(self, image, path):
+        # write to a temporary name first, so a concurrent launch never reads a half written file
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = '{0}.{1}.tmp.png'.format(path, os.getpid())
+
+        try:
+            pygame.image.save(image, tmp_path)
+            os.replace(tmp_path, path)
+
+        except (OSError, pygame.error):
+            # the cache is an optimization only, an unwritable cache dir just means scaling again next launch
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prescale(self, source_paths, sizes):
+        """
+        Makes sure the cache holds every source at every given size.  Returns the number of images scaled.
+
+        :type source_paths: List
+        :type sizes: List
+        :return: int
+        """
+        misses = self.misses
+
+        for source_path in source_paths:
+            for size in sizes:
+                self.load(source_path, size)
+
+        return self.misses - misses
+
+
+_sprite_cache = None
+
+
+def get_sprite_cache():
+    """
+    Returns the shared SpriteCache.
+
+    :return: SpriteCache
+    """
+    global _sprite_cache
+
+    if _sprite_cache is None:
+        _sprite_cache = SpriteCache()
+
+    return _sprite_cache
+
+
+def find_art(name):
+    """
+    Returns the path of the sprite art with the given name in SPR_PATH, or None if there is no such art yet.
+
+    :type name: str
+    :return: str
+    """
+    path = os.path.join(SPR_PATH, '{0}.png'.format(name.lower()))
+
+    return path if os.path.exists(path) else None
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pre-scales sprite art into the sprite cache.')
+    parser.add_argument('--all-resolutions', action='store_true',
+                        help='also scale for the common resolutions, not only the configured one')
+    args = parser.parse_args()
+
+    init_display()
+
+    widths = {constants.DISP_SIZE[0]}
+
+    if args.all_resolutions:
+        widths.update((640, 800, 1024, 1280, 1366, 1600, 1920, 2560, 3840))
+
+    # bubble diameter, matching Playfield.cell_radius for each display width
+    sizes = [(int(w * 0.65 / 23 - 2) * 2,) * 2 for w in sorted(widths)]
+    sources = [
+        os.path.join(SPR_PATH, name) for name in sorted(os.listdir(SPR_PATH)) if name.lower().startswith('bubble_')
+    ] if os.path.isdir(SPR_PATH) else []
+
+    cache = get_sprite_cache()
+    scaled = cache.prescale(sources, sizes)
+
+    shooter = find_art('shooter')
+
+    if shooter:
+        scaled += cache.prescale([shooter], [(75, 75)])  # Shooter's image size
+        sources.append(shooter)
+
+    print('{0} sources, {1} sizes: {2} scaled, {3} already cached'.format(
+        len(sources), len(sizes), scaled, cache.hits))
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
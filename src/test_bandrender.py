@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import unittest
+import pygame
+from src.headless import init_display
+
+SURFACE_SIZE = (338, 588)
+CELL_SIZE = (338 / 23, 338 / 23)
+
+# (threads, bands), one band per thread, more bands than threads, and more bands than there are rows
+RENDERERS = ((1, 1), (2, 2), (3, 7), (4, 64))
+
+
+def setUpModule():
+    init_display()
+
+
+def tearDownModule():
+    pygame.quit()
+
+
+class BandRendererTest(unittest.TestCase):
+
+    def setUp(self):
+        from src.levelgen import LevelParams, generate_map
+        from src.playfield import Playfield
+
+        params = LevelParams(SURFACE_SIZE[0], SURFACE_SIZE[1], CELL_SIZE, rows=1000, density=1.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'full.json')
+
+            with open(path, 'w') as fp:
+                json.dump(generate_map(params, 0), fp)
+
+            self.playfield = Playfield(path, CELL_SIZE, seed=0)
+
+    def _render(self, renderer, areas=None):
+        if self.playfield.board_layer is not None:
+            # start from garbage, so nothing is left over from an earlier render
+            self.playfield.board_layer.fill((255, 0, 255, 255))
+
+        self.playfield.renderer = renderer
+
+        try:
+            self.playfield.render_board_layer(areas)
+
+        finally:
+            self.playfield.renderer = None
+
+        return pygame.image.tostring(self.playfield.board_layer, 'RGBA')
+
+    def _assert_identical(self, areas=None):
+        from src.bandrender import BandRenderer
+
+        reference = self._render(None, areas)
+
+        for workers, bands in RENDERERS:
+            renderer = BandRenderer(workers, bands)
+
+            try:
+                self.assertTrue(self._render(renderer, areas) == reference, (workers, bands))
+
+            finally:
+                renderer.close()
+
+    def test_translucent_layer(self):
+        self._assert_identical()
+
+    def test_opaque_layer(self):
+        background = pygame.Surface((400, 700))
+
+        for y in range(0, 700, 10):
+            background.fill((y % 256, 255 - y % 256, 128), pygame.Rect(0, y, 400, 10))
+
+        self.playfield.set_backdrop(background, (31, 57))
+        self._assert_identical()
+
+    def test_partial_render(self):
+        self._render(None)
+        self._assert_identical([pygame.Rect(20, 100, 60, 40), pygame.Rect(150, 300, 30, 90)])
+
+    def test_row_bands_cover_area(self):
+        from src.bandrender import row_bands
+
+        hexmap = self.playfield.hexmap
+
+        for area in (pygame.Rect((0, 0), SURFACE_SIZE), pygame.Rect(13, 101, 200, 77), pygame.Rect(0, 40, 338, 3)):
+            for count in (1, 2, 5, 64):
+                bands = row_bands(hexmap, area, count)
+
+                self.assertLessEqual(len(bands), count)
+                self.assertEqual(bands[0].top, area.top)
+                self.assertEqual(bands[-1].bottom, area.bottom)
+
+                for upper, lower in zip(bands, bands[1:]):
+                    self.assertEqual(upper.bottom, lower.top)
+
+                for band in bands:
+                    self.assertGreater(band.height, 0)
+                    self.assertEqual((band.left, band.width), (area.left, area.width))
+
+
+if __name__ == "__main__":
+    unittest.main()
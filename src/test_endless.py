@@ -0,0 +1,53 @@
+import unittest
+import pygame
+from src.headless import init_display
+
+SURFACE_SIZE = (338, 588)
+CELL_SIZE = (338 / 23, 338 / 23)
+
+
+def setUpModule():
+    init_display()
+
+
+def tearDownModule():
+    pygame.quit()
+
+
+class EndlessScrollTest(unittest.TestCase):
+
+    def test_snapshot_after_long_scroll(self):
+        from src.endless import EndlessPlayfield, RandomChunkSource
+
+        playfield = EndlessPlayfield(RandomChunkSource(seed=1), SURFACE_SIZE, CELL_SIZE, seed=1, descent_interval=0)
+
+        # q drifts by one every two rows, this takes it well past what a signed byte holds
+        for _ in range(75):
+            playfield.descend(8)
+
+        self.assertGreater(max(q for (q, _), _ in playfield.bubble_map.items()), 256)
+
+        snapshot = playfield.snapshot()
+        board = playfield.bubble_map.items()
+
+        for addr, _ in board[:10]:
+            playfield.bubble_map.pop(addr).kill()
+
+        playfield.restore(snapshot)
+
+        self.assertEqual(playfield.bubble_map.items(), board)
+
+    def test_packed_keys_hold_scrolled_addresses(self):
+        from src.hexamaplib.hex_tables import KEY_DIRECTIONS, AXIAL_DIRECTIONS, pack, unpack
+
+        for q, r in ((40000, -80000), (-40000, 80000), (0, 0)):
+            key = pack(q, r)
+
+            self.assertEqual(unpack(key), (q, r))
+
+            for offset, (dq, dr) in zip(KEY_DIRECTIONS, AXIAL_DIRECTIONS):
+                self.assertEqual(unpack(key + offset), (q + dq, r + dr))
+
+
+if __name__ == "__main__":
+    unittest.main()
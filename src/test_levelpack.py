@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAP_FILE_PATH = os.path.join(ROOT, 'maps', 'TEST_MAP1.JSON')
+
+
+def _levels():
+    with open(MAP_FILE_PATH, 'r') as fp:
+        test_map = json.load(fp)
+
+    return [
+        ('TEST_MAP1', test_map),
+        ('two colors', {'width': 338, 'height': 588, 'map': {'0, 0': 'RED', '1, 0': 'BLUE', '2, 0': 'RED'}}),
+        ('rated', {'width': 338, 'height': 588, 'map': {'0, 0': 'GREEN'}, 'difficulty': 7.5}),
+        ('empty', {'width': 200, 'height': 300, 'map': {}}),
+    ]
+
+
+class LevelMetadataTest(unittest.TestCase):
+
+    def test_counts_and_estimate(self):
+        from src.levelpack import level_metadata
+
+        levels = dict(_levels())
+
+        self.assertEqual(level_metadata(levels['two colors']), (2, 3, 2 * 1.03))
+        self.assertEqual(level_metadata(levels['rated']), (1, 1, 7.5))
+        self.assertEqual(level_metadata(levels['empty']), (0, 0, 0.0))
+
+
+class LevelPackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'levels.pack')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_back(self):
+        from src.levelpack import LevelPack, level_metadata, write_pack
+
+        levels = _levels()
+        written = write_pack(self.path, levels)
+
+        with LevelPack(self.path) as pack:
+            self.assertEqual(len(pack), len(levels))
+
+            for i, (name, data) in enumerate(levels):
+                entry = pack.entries[i]
+                colors, bubbles, difficulty = level_metadata(data)
+
+                self.assertEqual(pack.find(name), i)
+                self.assertEqual(pack.read(i), data)
+                self.assertEqual(entry._replace(difficulty=0), written[i]._replace(difficulty=0))
+                self.assertEqual((entry.name, entry.width, entry.height), (name, data['width'], data['height']))
+                self.assertEqual((entry.colors, entry.bubbles), (colors, bubbles))
+                self.assertAlmostEqual(entry.difficulty, difficulty, places=5)  # stored as a float32
+
+            # out of order, as a level select would
+            self.assertEqual(pack.read(2), levels[2][1])
+            self.assertEqual(pack.read(0), levels[0][1])
+
+    def test_prefetcher(self):
+        from src.levelpack import LevelPack, LevelPrefetcher, write_pack
+
+        levels = _levels()
+        write_pack(self.path, levels)
+
+        with LevelPack(self.path) as pack:
+            prefetcher = LevelPrefetcher(pack)
+
+            try:
+                prefetcher.prefetch(1)
+                prefetcher.prefetch(len(pack))  # past the end, ignored
+
+                self.assertEqual(prefetcher.get(1), levels[1][1])
+                self.assertEqual(prefetcher.get(3), levels[3][1])
+
+            finally:
+                prefetcher.close()
+
+    def test_unknown_name(self):
+        from src.levelpack import LevelPack, write_pack
+
+        write_pack(self.path, _levels())
+
+        with LevelPack(self.path) as pack:
+            with self.assertRaises(KeyError):
+                pack.find('TEST_MAP2')
+
+    def test_not_a_pack(self):
+        from src.levelpack import LevelPack
+
+        with self.assertRaises(IOError):
+            LevelPack(MAP_FILE_PATH)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import unittest
+import pygame
+from src.headless import init_display
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAP_FILE_PATH = os.path.join(ROOT, 'maps', 'TEST_MAP1.JSON')
+CELL_SIZE = (338 / 23, 338 / 23)
+
+
+def setUpModule():
+    init_display()
+
+
+def tearDownModule():
+    pygame.quit()
+
+
+class PlayfieldLoadTest(unittest.TestCase):
+
+    def test_reload_keeps_one_shooter(self):
+        from src.bubble import Bubble
+        from src.constants import INPUT_FIRE
+        from src.playfield import Playfield
+        from src.shooter import Shooter
+
+        playfield = Playfield(MAP_FILE_PATH, CELL_SIZE, seed=1)
+        playfield.update()
+        playfield.apply_input(INPUT_FIRE)  # so a bubble is in flight during the next load
+        playfield.update()
+
+        playfield.load_map(MAP_FILE_PATH)
+        playfield.load_map(MAP_FILE_PATH)
+        playfield.update()
+
+        sprites = playfield.all_sprites.sprites()
+
+        self.assertEqual(sum(isinstance(spr, Shooter) for spr in sprites), 1)
+        self.assertEqual(sum(isinstance(spr, Bubble) for spr in sprites), 1)  # the new shooter's next bubble
+        self.assertIs(playfield.shooter, next(spr for spr in sprites if isinstance(spr, Shooter)))
+
+
+class PlayfieldSnapshotTest(unittest.TestCase):
+
+    @staticmethod
+    def _play(playfield, ticks):
+        from src.constants import INPUT_FIRE, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT
+        from src.replay import state_digest
+
+        digests = list()
+
+        for tick in range(ticks):
+            flags = INPUT_FIRE if tick % 40 == 1 else INPUT_ROTATE_LEFT if tick % 40 < 15 else INPUT_ROTATE_RIGHT
+            playfield.apply_input(flags)
+            playfield.update()
+            digests.append(state_digest(playfield))
+
+        return digests
+
+    def test_restore_round_trip(self):
+        from src.playfield import Playfield
+        from src.replay import state_digest
+
+        playfield = Playfield(MAP_FILE_PATH, CELL_SIZE, seed=1)
+        self._play(playfield, 5)  # so the snapshot catches a bubble in flight
+
+        self.assertIsNotNone(playfield.active_bubble.sprite)
+
+        snapshot = playfield.snapshot()
+        digest = state_digest(playfield)
+        board = playfield.bubble_map.items()
+
+        first = self._play(playfield, 300)
+        self.assertNotEqual(playfield.bubble_map.items(), board)
+
+        playfield.restore(snapshot)
+        self.assertEqual(state_digest(playfield), digest)
+        self.assertEqual(playfield.bubble_map.items(), board)
+
+        # the rng is part of the snapshot, so the game plays out the same again
+        self.assertEqual(self._play(playfield, 300), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
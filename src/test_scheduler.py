@@ -0,0 +1,135 @@
+import unittest
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_schedule_fires_on_deadline(self):
+        from src.scheduler import Scheduler
+
+        scheduler = Scheduler()
+        fired = list()
+        scheduler.schedule(3, fired.append, 'a')
+        scheduler.schedule(3, fired.append, 'b')
+        scheduler.schedule(1, fired.append, 'c')
+
+        scheduler.advance(2)
+        self.assertEqual(fired, ['c'])
+
+        scheduler.advance()
+        self.assertEqual(fired, ['c', 'a', 'b'])
+        self.assertEqual(len(scheduler), 0)
+
+    def test_long_delays_cascade_to_their_tick(self):
+        from src.scheduler import Scheduler
+
+        # delays on both sides of every level's span, and from starts just short of a top level boundary so the
+        # overflow list gets cascaded too
+        for start in (0, 37, (1 << 24) - 5):
+            for delay in (63, 64, 65, 4095, 4096, 4097, 262143, 262145, 300000):
+                scheduler = Scheduler()
+                scheduler.now = start
+                fired = list()
+                scheduler.schedule(delay, lambda: fired.append(scheduler.now))
+
+                scheduler.advance(delay - 1)
+                self.assertEqual(fired, [], (start, delay))
+
+                scheduler.advance()
+                self.assertEqual(fired, [start + delay], (start, delay))
+
+    def test_every_until_cancelled(self):
+        from src.scheduler import Scheduler
+
+        scheduler = Scheduler()
+        fired = list()
+        timer = scheduler.every(3, lambda: fired.append(scheduler.now))
+
+        scheduler.advance(10)
+        self.assertEqual(fired, [3, 6, 9])
+
+        timer.cancel()
+        scheduler.advance(10)
+        self.assertEqual(fired, [3, 6, 9])
+        self.assertEqual(len(scheduler), 0)
+
+    def test_callback_scheduled_from_callback_waits_a_tick(self):
+        from src.scheduler import Scheduler
+
+        scheduler = Scheduler()
+        fired = list()
+        scheduler.schedule(1, lambda: scheduler.schedule(0, lambda: fired.append(scheduler.now)))
+
+        scheduler.advance()
+        self.assertEqual(fired, [])
+
+        scheduler.advance()
+        self.assertEqual(fired, [2])
+
+    def test_clear(self):
+        from src.scheduler import Scheduler
+
+        scheduler = Scheduler()
+        fired = list()
+
+        for delay in (1, 100, 10000, 1 << 25):
+            scheduler.schedule(delay, fired.append, delay)
+
+        self.assertEqual(len(scheduler), 4)
+
+        scheduler.clear()
+        scheduler.advance(200)
+        self.assertEqual(fired, [])
+        self.assertEqual(len(scheduler), 0)
+
+
+class TweenBatchTest(unittest.TestCase):
+
+    def test_linear_tween_reaches_end(self):
+        from src.scheduler import Scheduler, TweenBatch
+
+        scheduler = Scheduler()
+        batch = TweenBatch(scheduler, capacity=4)
+        done = list()
+        row = batch.add((0, 0), (10, 20), 10, on_done=lambda: done.append(scheduler.now))
+
+        scheduler.advance(5)
+        batch.update()
+        self.assertEqual(batch.values[row].tolist(), [5, 10])
+        self.assertEqual(done, [])
+
+        scheduler.advance(5)
+        self.assertEqual(batch.values[row].tolist(), [10, 20])
+        self.assertEqual(done, [10])
+        self.assertEqual(len(batch), 0)
+
+    def test_easings_share_a_batch(self):
+        from src.scheduler import Scheduler, TweenBatch
+
+        scheduler = Scheduler()
+        batch = TweenBatch(scheduler, capacity=4, dims=1)
+        rows = {ease: batch.add((0,), (100,), 10, ease) for ease in ('linear', 'in_quad', 'out_quad', 'in_out_quad')}
+
+        scheduler.advance(5)
+        batch.update()
+
+        self.assertEqual({ease: batch.values[row][0] for ease, row in rows.items()},
+                         {'linear': 50, 'in_quad': 25, 'out_quad': 75, 'in_out_quad': 50})
+
+    def test_cancel_skips_on_done(self):
+        from src.scheduler import Scheduler, TweenBatch
+
+        scheduler = Scheduler()
+        batch = TweenBatch(scheduler, capacity=1)
+        done = list()
+        row = batch.add((0, 0), (1, 1), 4, on_done=lambda: done.append(True))
+
+        batch.cancel(row)
+        scheduler.advance(10)
+
+        self.assertEqual(done, [])
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(len(scheduler), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,549 @@
+import os
+import socket
+import struct
+import time
+from src import constants
+from src.constants import INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT, INPUT_FIRE
+
+__all__ = ["SyncState", "DeltaEncoder", "DeltaDecoder", "SyncStats", "VersusSync", "run_loopback_match"]
+
+# Wire format, all little endian.  Every tick's messages go out as one length prefixed frame:
+#   frame:   uint16 length, header, messages
+#   header:  seq, base seq the board delta is relative to, latest seq received from the peer, message count
+#   ATTACH:  kind, count, then (uint16 cell id, uint8 type id) per cell
+#   REMOVE:  kind, count, then uint16 cell id per cell
+#   NEXT:    kind, uint8 type id of the next bubble (NO_TYPE for none)
+#   GARBAGE: kind, uint16 total garbage rows sent so far
+#   PING:    kind, uint32 sender clock in ms
+#   PONG:    kind, uint32 echoed PING clock
+_LENGTH = struct.Struct('<H')
+_HEADER = struct.Struct('<IIIB')
+_KIND_COUNT = struct.Struct('<BH')
+_CELL_TYPE = struct.Struct('<HB')
+_CELL = struct.Struct('<H')
+_KIND_BYTE = struct.Struct('<BB')
+_KIND_WORD = struct.Struct('<BH')
+_KIND_DWORD = struct.Struct('<BI')
+
+MSG_ATTACH = 1
+MSG_REMOVE = 2
+MSG_NEXT = 3
+MSG_GARBAGE = 4
+MSG_PING = 5
+MSG_PONG = 6
+
+NO_TYPE = 0xFF
+
+
+def _clock_ms():
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+class SyncState:
+
+    def __init__(self, board=None, next_type=NO_TYPE, garbage=0):
+        """
+        Everything the opponent needs to mirror a playfield: the board as cell id -> type id, the next bubble's
+        type id and the running total of garbage rows sent.
+
+        :type board: dict
+        :type next_type: int
+        :type garbage: int
+        """
+        self.board = board if board is not None else dict()
+        self.next_type = next_type
+        self.garbage = garbage
+
+    @classmethod
+    def from_playfield(cls, playfield, garbage=0):
+        """
+        Captures the sync state of a playfield.
+
+        :type playfield: src.playfield.Playfield
+        :type garbage: int
+        :return: SyncState
+        """
+        types = playfield.bubble_map.types
+        board = {cell_id: types[cell_id] for cell_id in playfield.bubble_map.occupied_ids().tolist()}
+        nxt = playfield.shooter.next.sprite
+
+        return cls(board, nxt.type_id if nxt else NO_TYPE, garbage)
+
+    def copy(self):
+        return SyncState(dict(self.board), self.next_type, self.garbage)
+
+    def __eq__(self, other):
+        return (self.board, self.next_type, self.garbage) == (other.board, other.next_type, other.garbage)
+
+
+class DeltaEncoder:
+
+    def __init__(self):
+        """
+        Encodes the local state as deltas against the last state the peer acknowledged.  Deltas sent but not yet
+        acknowledged are simply sent again as part of the next delta, so a lost or late frame never needs a
+        resend of its own.
+        """
+        self.seq = 0
+        self.base_seq = 0
+        self._base = SyncState()
+        self._last_sent = self._base
+        self._sent = {0: self._base}
+
+    def acknowledge(self, seq):
+        """
+        Moves the baseline forward to a state the peer acknowledged.
+
+        :type seq: int
+        :return: None
+        """
+        if seq <= self.base_seq or seq not in self._sent:
+            return
+
+        self.base_seq = seq
+        self._base = self._sent[seq]
+        self._sent = {s: state for s, state in self._sent.items() if s >= seq}
+
+    def encode(self, state):
+        """
+        Returns (base seq, message bytes, message count) describing state against the baseline, or None if
+        state is unchanged since the last call.
+
+        :type state: SyncState
+        :return: Tuple
+        """
+        if state == self._last_sent:
+            return None
+
+        base = self._base
+        attached = [(cell, t) for cell, t in state.board.items() if base.board.get(cell) != t]
+        removed = [cell for cell in base.board if cell not in state.board]
+        parts = list()
+        count = 0
+
+        if attached:
+            parts.append(_KIND_COUNT.pack(MSG_ATTACH, len(attached)))
+            parts.extend(_CELL_TYPE.pack(cell, t) for cell, t in attached)
+            count += 1
+
+        if removed:
+            parts.append(_KIND_COUNT.pack(MSG_REMOVE, len(removed)))
+            parts.extend(_CELL.pack(cell) for cell in removed)
+            count += 1
+
+        if state.next_type != base.next_type:
+            parts.append(_KIND_BYTE.pack(MSG_NEXT, state.next_type))
+            count += 1
+
+        if state.garbage != base.garbage:
+            parts.append(_KIND_WORD.pack(MSG_GARBAGE, state.garbage))
+            count += 1
+
+        self.seq += 1
+        self._sent[self.seq] = self._last_sent = state.copy()
+
+        return self.base_seq, b''.join(parts), count
+
+
+class DeltaDecoder:
+
+    def __init__(self):
+        """
+        Rebuilds the peer's state from deltas.  States are kept by seq until the peer stops using them as a
+        baseline.
+        """
+        self.seq = 0
+        self.state = SyncState()
+        self._states = {0: self.state}
+
+    def apply(self, seq, base_seq, attached, removed, next_type, garbage):
+        """
+        Applies a delta.  Returns False if it is older than the current state or its baseline is unknown.
+
+        :return: bool
+        """
+        if seq <= self.seq or base_seq not in self._states:
+            return False
+
+        state = self._states[base_seq].copy()
+        state.board.update(attached)
+
+        for cell in removed:
+            state.board.pop(cell, None)
+
+        if next_type is not None:
+            state.next_type = next_type
+
+        if garbage is not None:
+            state.garbage = garbage
+
+        self.seq = seq
+        self.state = state
+        self._states = {s: st for s, st in self._states.items() if s >= base_seq}
+        self._states[seq] = state
+
+        return True
+
+
+class SyncStats:
+
+    def __init__(self):
+        """
+        Bandwidth and latency counters for one match.
+        """
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.rtt_samples = list()
+        self.ticks = 0
+
+    def report(self, tick_rate=None):
+        """
+        Returns the counters plus bytes per second at the given tick rate and round trip times in ms.
+
+        :param tick_rate: Ticks per second, defaults to TARGET_FPS.
+        :type tick_rate: int
+        :return: dict
+        """
+        tick_rate = tick_rate or constants.TARGET_FPS
+        seconds = max(self.ticks, 1) / tick_rate
+        rtt = sorted(self.rtt_samples)
+
+        return {
+            'ticks': self.ticks,
+            'frames_sent': self.frames_sent,
+            'frames_received': self.frames_received,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'sent_bytes_per_second': self.bytes_sent / seconds,
+            'rtt_mean_ms': sum(rtt) / len(rtt) if rtt else None,
+            'rtt_max_ms': rtt[-1] if rtt else None
+        }
+
+
+class VersusSync:
+
+    def __init__(self, playfield, sock, ping_interval=30):
+        """
+        Keeps an opponent's playfield in sync over a stream socket.  Call tick() once per simulation tick; it
+        sends the local changes batched into one frame and applies whatever arrived from the peer, whose state
+        is then available as self.remote.
+
+        :param playfield: The local playfield.
+        :type playfield: src.playfield.Playfield
+        :param sock: Connected stream socket to the peer.  It is switched to non-blocking.
+        :type sock: socket.socket
+        :param ping_interval: Ticks between latency probes.
+        :type ping_interval: int
+        """
+        self.playfield = playfield
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.ping_interval = ping_interval
+
+        self.encoder = DeltaEncoder()
+        self.decoder = DeltaDecoder()
+        self.stats = SyncStats()
+
+        self.garbage_sent = 0
+        self.garbage_applied = 0  # incoming garbage rows already handed to the game
+
+        self._recv_buffer = bytearray()
+        self._acked_peer = 0  # latest peer seq we told the peer about
+        self._pongs = list()
+        self._last_board = None
+
+    @property
+    def remote(self):
+        """
+        The latest known state of the opponent.
+
+        :return: SyncState
+        """
+        return self.decoder.state
+
+    def send_garbage(self, rows):
+        """
+        Queues garbage rows for the opponent.
+
+        :type rows: int
+        :return: None
+        """
+        self.garbage_sent += rows
+
+    def take_garbage(self):
+        """
+        Returns the number of garbage rows the opponent sent that have not been taken yet.
+
+        :return: int
+        """
+        rows = self.remote.garbage - self.garbage_applied
+        self.garbage_applied = self.remote.garbage
+
+        return rows
+
+    def tick(self):
+        """
+        Receives and applies peer frames, then sends this tick's frame if there is anything to say.
+
+        :return: None
+        """
+        self.stats.ticks += 1
+        self._receive()
+
+        # the board snapshot rows are shared while nothing changes, so unchanged boards are cheap to detect
+        board = self.playfield.bubble_map.snapshot()
+        nxt = self.playfield.shooter.next.sprite
+        key = (board, nxt.type_property if nxt else None, self.garbage_sent)
+
+        delta = None
+
+        if key != self._last_board:
+            self._last_board = key
+            delta = self.encoder.encode(SyncState.from_playfield(self.playfield, self.garbage_sent))
+
+        parts = list()
+        count = 0
+
+        if delta:
+            base_seq, payload, count = delta
+            parts.append(payload)
+
+        else:
+            base_seq = self.encoder.base_seq
+
+        if self.stats.ticks % self.ping_interval == 0:
+            parts.append(_KIND_DWORD.pack(MSG_PING, _clock_ms()))
+            count += 1
+
+        for stamp in self._pongs:
+            parts.append(_KIND_DWORD.pack(MSG_PONG, stamp))
+            count += 1
+
+        self._pongs.clear()
+
+        if count or self.decoder.seq != self._acked_peer:
+            self._send(self.encoder.seq if delta else 0, base_seq, b''.join(parts), count)
+            self._acked_peer = self.decoder.seq
+
+    def close(self, timeout=5.0):
+        """
+        Ends the session: stops sending, applies everything the peer still sends until it closes too, then
+        closes the socket.
+
+        :type timeout: float
+        :return: None
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+            self.sock.settimeout(timeout)
+
+            while self._receive(block=True):
+                pass
+
+        except OSError:
+            pass
+
+        self.sock.close()
+
+    def _send(self, seq, base_seq, payload, count):
+        frame = _HEADER.pack(seq, base_seq, self.decoder.seq, count) + payload
+        data = _LENGTH.pack(len(frame)) + frame
+
+        # frames are small, a full socket buffer means the peer is gone or hopelessly behind
+        self.sock.sendall(data)
+        self.stats.frames_sent += 1
+        self.stats.bytes_sent += len(data)
+
+    def _receive(self, block=False):
+        """
+        Reads what is available from the socket and decodes every complete frame.  With block set, waits for
+        one read only.  Returns False once the peer has closed its end.
+
+        :type block: bool
+        :return: bool
+        """
+        open_ = True
+
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+
+            except BlockingIOError:
+                break
+
+            if not chunk:
+                open_ = False
+                break
+
+            self._recv_buffer.extend(chunk)
+            self.stats.bytes_received += len(chunk)
+
+            if block:
+                break
+
+        buf = self._recv_buffer
+        offset = 0
+
+        while len(buf) - offset >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(buf, offset)
+
+            if len(buf) - offset - _LENGTH.size < length:
+                break
+
+            self._decode_frame(bytes(buf[offset + _LENGTH.size:offset + _LENGTH.size + length]))
+            offset += _LENGTH.size + length
+            self.stats.frames_received += 1
+
+        del buf[:offset]
+
+        return open_
+
+    def _decode_frame(self, frame):
+        seq, base_seq, ack, count = _HEADER.unpack_from(frame, 0)
+        offset = _HEADER.size
+        attached = list()
+        removed = list()
+        next_type = None
+        garbage = None
+
+        for _ in range(count):
+            kind = frame[offset]
+
+            if kind == MSG_ATTACH:
+                _, n = _KIND_COUNT.unpack_from(frame, offset)
+                offset += _KIND_COUNT.size
+                attached.extend(_CELL_TYPE.unpack_from(frame, offset + i * _CELL_TYPE.size) for i in range(n))
+                offset += n * _CELL_TYPE.size
+
+            elif kind == MSG_REMOVE:
+                _, n = _KIND_COUNT.unpack_from(frame, offset)
+                offset += _KIND_COUNT.size
+                removed.extend(_CELL.unpack_from(frame, offset + i * _CELL.size)[0] for i in range(n))
+                offset += n * _CELL.size
+
+            elif kind == MSG_NEXT:
+                _, next_type = _KIND_BYTE.unpack_from(frame, offset)
+                offset += _KIND_BYTE.size
+
+            elif kind == MSG_GARBAGE:
+                _, garbage = _KIND_WORD.unpack_from(frame, offset)
+                offset += _KIND_WORD.size
+
+            elif kind == MSG_PING:
+                _, stamp = _KIND_DWORD.unpack_from(frame, offset)
+                offset += _KIND_DWORD.size
+                self._pongs.append(stamp)
+
+            elif kind == MSG_PONG:
+                _, stamp = _KIND_DWORD.unpack_from(frame, offset)
+                offset += _KIND_DWORD.size
+                self.stats.rtt_samples.append((_clock_ms() - stamp) & 0xFFFFFFFF)
+
+            else:
+                raise ValueError('Unknown versus message kind {0}.'.format(kind))
+
+        self.encoder.acknowledge(ack)
+
+        if seq:
+            self.decoder.apply(seq, base_seq, attached, removed, next_type, garbage)
+
+
+def _loopback_player(map_file_path, seed, ticks, sock, results):
+    """
+    One side of a loopback match: a headless playfield driven by a seeded random bot.
+    """
+    import random
+    import pygame
+    from src.headless import init_display
+    from src.playfield import Playfield
+
+    init_display()
+
+    playfield = Playfield(map_file_path, constants.CELL_SIZE, seed=seed)
+    sync = VersusSync(playfield, sock)
+    bot = random.Random(seed)
+
+    for tick in range(ticks):
+        flags = bot.choice((0, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT))
+
+        if tick % 45 == 0:
+            flags |= INPUT_FIRE
+
+        playfield.apply_input(flags)
+        playfield.update()
+        sync.tick()
+
+        # pace the bots so frames actually interleave like in a real match
+        time.sleep(0.001)
+
+    # wait for the peer's last frames before comparing boards
+    sync.close()
+
+    results.put((seed, SyncState.from_playfield(playfield, sync.garbage_sent).board, sync.remote.board,
+                 sync.stats.report()))
+    pygame.quit()
+
+
+def run_loopback_match(map_file_path, ticks=1800, seeds=(1, 2)):
+    """
+    Plays a headless match between two processes connected by a loopback socket and returns each side's
+    bandwidth and latency report, plus whether each side's mirror of its opponent matched the real board.
+
+    :type map_file_path: str
+    :type ticks: int
+    :type seeds: Tuple(int, int)
+    :return: List
+    """
+    import multiprocessing
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+
+    for sock in (client, server):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_loopback_player, args=(map_file_path, seed, ticks, sock, results))
+        for seed, sock in zip(seeds, (server, client))
+    ]
+
+    for proc in procs:
+        proc.start()
+
+    server.close()
+    client.close()
+
+    outcome = dict((r[0], r[1:]) for r in (results.get() for _ in procs))
+
+    for proc in procs:
+        proc.join()
+
+    (a_board, a_mirror, a_report), (b_board, b_mirror, b_report) = outcome[seeds[0]], outcome[seeds[1]]
+    a_report['mirror_in_sync'] = a_mirror == b_board
+    b_report['mirror_in_sync'] = b_mirror == a_board
+
+    return [a_report, b_report]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Runs a headless local versus match over a loopback socket.')
+    parser.add_argument('map', nargs='?', default=os.path.join(os.curdir, 'maps', 'TEST_MAP1.JSON'))
+    parser.add_argument('--ticks', type=int, default=1800)
+    args = parser.parse_args()
+
+    for side, report in enumerate(run_loopback_match(args.map, args.ticks)):
+        print('player {0}: {1}'.format(side + 1, report))
+
+
+if __name__ == "__main__":
+    main()